@@ -0,0 +1,160 @@
+"""
+In-memory stand-in for the MaimConfig API, for benchmarks.
+
+Every response is delayed by FAKE_MAIMCONFIG_LATENCY_MS (+ up to
+FAKE_MAIMCONFIG_JITTER_MS), and FAKE_MAIMCONFIG_ERROR_RATE of requests fail
+with a 503, so resilience and caching behaviour can be measured too.
+
+    python -m uvicorn benchmarks.fake_maimconfig:app --port 8001
+"""
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake MaimConfig")
+    tenants: dict = {}
+    agents: dict = {}
+    keys: dict = {}
+
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        delay = latency_ms + random.uniform(0, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate > 0 and random.random() < error_rate:
+            return JSONResponse({"success": False, "message": "injected failure"}, status_code=503)
+        return await call_next(request)
+
+    def ok(data=None):
+        return {"success": True, "data": data}
+
+    def missing(what: str):
+        return JSONResponse({"success": False, "message": f"{what} not found"}, status_code=404)
+
+    # Tenants
+    @app.post("/api/v2/tenants")
+    async def create_tenant(request: Request):
+        tenant_id = "t_" + uuid.uuid4().hex[:12]
+        tenants[tenant_id] = {"id": tenant_id, **(await request.json()), "created_at": _now()}
+        return ok(tenants[tenant_id])
+
+    @app.get("/api/v2/tenants")
+    async def list_tenants(page: int = 1, size: int = 20):
+        items = list(tenants.values())
+        return ok({"items": items[(page - 1) * size: page * size], "total": len(items)})
+
+    @app.get("/api/v2/tenants/{tenant_id}")
+    async def get_tenant(tenant_id: str):
+        return ok(tenants[tenant_id]) if tenant_id in tenants else missing("Tenant")
+
+    @app.put("/api/v2/tenants/{tenant_id}")
+    async def update_tenant(tenant_id: str, request: Request):
+        if tenant_id not in tenants:
+            return missing("Tenant")
+        tenants[tenant_id].update(await request.json())
+        return ok(tenants[tenant_id])
+
+    @app.delete("/api/v2/tenants/{tenant_id}")
+    async def delete_tenant(tenant_id: str):
+        tenants.pop(tenant_id, None)
+        return ok()
+
+    # Agents
+    @app.post("/api/v2/agents")
+    async def create_agent(request: Request):
+        agent_id = "a_" + uuid.uuid4().hex[:12]
+        now = _now()
+        agents[agent_id] = {
+            "id": agent_id, "status": "active", "config": None,
+            **(await request.json()), "created_at": now, "updated_at": now,
+        }
+        return ok(agents[agent_id])
+
+    @app.get("/api/v2/agents")
+    async def list_agents(tenant_id: str, page: int = 1, page_size: int = 1000):
+        items = sorted(
+            (a for a in agents.values() if a.get("tenant_id") == tenant_id),
+            key=lambda a: (a["created_at"], a["id"]),
+        )
+        return ok({"items": items[(page - 1) * page_size: page * page_size], "total": len(items)})
+
+    @app.get("/api/v2/agents/{agent_id}")
+    async def get_agent(agent_id: str):
+        return ok(agents[agent_id]) if agent_id in agents else missing("Agent")
+
+    @app.put("/api/v2/agents/{agent_id}")
+    async def update_agent(agent_id: str, request: Request):
+        if agent_id not in agents:
+            return missing("Agent")
+        agents[agent_id].update(await request.json(), updated_at=_now())
+        return ok(agents[agent_id])
+
+    # API keys
+    @app.post("/api/v2/api-keys")
+    async def create_api_key(request: Request):
+        key_id = "k_" + uuid.uuid4().hex[:12]
+        keys[key_id] = {
+            "id": key_id, "api_key": "sk-" + uuid.uuid4().hex, "status": "active",
+            "permissions": [], **(await request.json()), "created_at": _now(),
+        }
+        return ok(keys[key_id])
+
+    @app.get("/api/v2/api-keys")
+    async def list_api_keys(tenant_id: str, agent_id: Optional[str] = None, page: int = 1,
+                            page_size: int = 20, status: Optional[str] = None):
+        items = [
+            k for k in keys.values()
+            if k.get("tenant_id") == tenant_id and (agent_id is None or k.get("agent_id") == agent_id)
+            and (status is None or k["status"] == status)
+        ]
+        return ok({"items": items[(page - 1) * page_size: page * page_size], "total": len(items)})
+
+    @app.get("/api/v2/api-keys/{key_id}")
+    async def get_api_key(key_id: str):
+        return ok(keys[key_id]) if key_id in keys else missing("API key")
+
+    @app.put("/api/v2/api-keys/{key_id}")
+    async def update_api_key(key_id: str, request: Request):
+        if key_id not in keys:
+            return missing("API key")
+        keys[key_id].update(await request.json())
+        return ok(keys[key_id])
+
+    @app.delete("/api/v2/api-keys/{key_id}")
+    async def delete_api_key(key_id: str):
+        keys.pop(key_id, None)
+        return ok()
+
+    # Plugins / system
+    @app.post("/api/v1/plugins/settings")
+    async def upsert_plugin_setting(request: Request):
+        return ok({**(await request.json()), **request.query_params})
+
+    @app.get("/api/v2/system/models")
+    async def system_models():
+        return ok([{"id": "gpt-4o", "provider": "openai"}, {"id": "deepseek-chat", "provider": "deepseek"}])
+
+    @app.get("/api/v2/system/bot-defaults")
+    async def bot_defaults():
+        return ok({"model": "gpt-4o", "temperature": 0.7})
+
+    return app
+
+
+app = create_app(
+    latency_ms=float(os.environ.get("FAKE_MAIMCONFIG_LATENCY_MS", "0")),
+    jitter_ms=float(os.environ.get("FAKE_MAIMCONFIG_JITTER_MS", "0")),
+    error_rate=float(os.environ.get("FAKE_MAIMCONFIG_ERROR_RATE", "0")),
+)
@@ -0,0 +1,418 @@
+"""
+Benchmark driver.
+
+Starts the fake MaimConfig and MaimWebBackend as subprocesses against a
+throwaway SQLite database, seeds users/agents/keys, then drives a weighted
+mix of requests and reports p50/p95/p99 latency and throughput per route.
+
+    python -m benchmarks.run --mix default --duration 30 --concurrency 32
+    python -m benchmarks.run --latency-ms 20 --error-rate 0.02 --env MAIMCONFIG_HEDGE_ENABLED=true
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+
+# Relative weights per operation
+MIXES: Dict[str, Dict[str, int]] = {
+    "default": {
+        "login": 2,
+        "agent_list": 30,
+        "agent_detail": 30,
+        "key_list": 15,
+        "key_create": 5,
+        "plugin_upsert": 8,
+        "admin_listing": 10,
+    },
+    "read_heavy": {
+        "agent_list": 40,
+        "agent_detail": 40,
+        "key_list": 15,
+        "admin_listing": 5,
+    },
+    "write_heavy": {
+        "agent_detail": 20,
+        "key_create": 40,
+        "plugin_upsert": 40,
+    },
+    "login": {
+        "login": 1,
+    },
+}
+
+
+@dataclass
+class BenchUser:
+    username: str
+    password: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    agent_ids: List[str] = field(default_factory=list)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.transport_errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies[route].append(seconds)
+        if status is None:
+            self.transport_errors[route] += 1
+        else:
+            self.statuses[route][status] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = np.asarray(self.latencies[route]) * 1000
+            statuses = self.statuses[route]
+            errors = self.transport_errors[route] + sum(n for s, n in statuses.items() if s >= 400)
+            routes[route] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples),
+                "throughput_rps": len(samples) / elapsed,
+                "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)),
+                "p99_ms": float(np.percentile(samples, 99)),
+                "max_ms": float(samples.max()),
+                "statuses": {str(s): n for s, n in sorted(statuses.items())},
+            }
+        everything = np.concatenate([np.asarray(v) for v in self.latencies.values()]) * 1000 if self.latencies else np.zeros(1)
+        total_errors = sum(r["errors"] for r in routes.values())
+        overall = {
+            "requests": int(sum(r["requests"] for r in routes.values())),
+            "errors": total_errors,
+            "throughput_rps": sum(r["requests"] for r in routes.values()) / elapsed,
+            "p50_ms": float(np.percentile(everything, 50)),
+            "p95_ms": float(np.percentile(everything, 95)),
+            "p99_ms": float(np.percentile(everything, 99)),
+        }
+        return {"routes": routes, "overall": overall}
+
+
+# ---------------------------------------------------------------- processes
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _spawn(args: List[str], env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", *args], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} exited with {proc.returncode}, see the logs in the work dir")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _init_database(env: Dict[str, str]) -> None:
+    code = (
+        "import asyncio\n"
+        "from maim_db.maimconfig_models.connection import init_database\n"
+        "from maim_db.maimconfig_models.models import create_tables\n"
+        "async def main():\n"
+        "    await init_database()\n"
+        "    await create_tables()\n"
+        "asyncio.run(main())\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+
+
+# ---------------------------------------------------------------- operations
+
+async def _timed(recorder: Recorder, route: str, call: Callable) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await call()
+    except httpx.TransportError:
+        recorder.record(route, time.perf_counter() - started, None)
+        return None
+    recorder.record(route, time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def op_login(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    await _timed(r, "POST /auth/login", lambda: c.post(
+        f"{API}/auth/login", data={"username": user.username, "password": user.password}))
+
+
+async def op_agent_list(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    await _timed(r, "GET /agents/", lambda: c.get(f"{API}/agents/", headers=user.headers))
+
+
+async def op_agent_detail(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    agent_id = random.choice(user.agent_ids)
+    await _timed(r, "GET /agents/{agent_id}", lambda: c.get(f"{API}/agents/{agent_id}", headers=user.headers))
+
+
+async def op_key_list(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    agent_id = random.choice(user.agent_ids)
+    await _timed(r, "GET /agents/{agent_id}/api_keys", lambda: c.get(
+        f"{API}/agents/{agent_id}/api_keys", headers=user.headers))
+
+
+async def op_key_create(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    agent_id = random.choice(user.agent_ids)
+    await _timed(r, "POST /agents/{agent_id}/api_keys", lambda: c.post(
+        f"{API}/agents/{agent_id}/api_keys", headers=user.headers, json={"name": "bench"}))
+
+
+async def op_plugin_upsert(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    agent_id = random.choice(user.agent_ids)
+    await _timed(r, "POST /plugins/settings", lambda: c.post(
+        f"{API}/plugins/settings", headers=user.headers, params={"agent_id": agent_id},
+        json={"plugin_name": "bench", "enabled": True, "config": {"level": random.randint(1, 5)}}))
+
+
+async def op_admin_listing(c: httpx.AsyncClient, user: BenchUser, r: Recorder) -> None:
+    await _timed(r, "GET /admin/chat-history", lambda: c.get(
+        f"{API}/admin/chat-history", headers=user.headers, params={"size": 50}))
+
+
+OPERATIONS = {
+    "login": op_login,
+    "agent_list": op_agent_list,
+    "agent_detail": op_agent_detail,
+    "key_list": op_key_list,
+    "key_create": op_key_create,
+    "plugin_upsert": op_plugin_upsert,
+    "admin_listing": op_admin_listing,
+}
+
+
+# ---------------------------------------------------------------- run
+
+async def _seed(c: httpx.AsyncClient, users: int, agents_per_user: int) -> List[BenchUser]:
+    async def one() -> BenchUser:
+        user = BenchUser(username="bench_" + uuid.uuid4().hex[:10], password="bench-password")
+        resp = await c.post(f"{API}/auth/register", json={
+            "username": user.username, "password": user.password, "email": f"{user.username}@example.com",
+        })
+        resp.raise_for_status()
+        resp = await c.post(f"{API}/auth/login", data={"username": user.username, "password": user.password})
+        resp.raise_for_status()
+        user.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        # Tenant creation is asynchronous (provisioning outbox)
+        for _ in range(200):
+            resp = await c.get(f"{API}/auth/provisioning", headers=user.headers)
+            if resp.status_code == 404 or resp.json().get("status") == "succeeded":
+                break
+            await asyncio.sleep(0.1)
+
+        for i in range(agents_per_user):
+            resp = await c.post(f"{API}/agents/", headers=user.headers, json={"name": f"bench-{i}"})
+            resp.raise_for_status()
+            agent_id = resp.json()["id"]
+            user.agent_ids.append(agent_id)
+            await c.post(f"{API}/agents/{agent_id}/api_keys", headers=user.headers, json={"name": "seed"})
+        return user
+
+    return await asyncio.gather(*(one() for _ in range(users)))
+
+
+async def _drive(base_url: str, users: List[BenchUser], mix: Dict[str, int], concurrency: int,
+                 duration: float, warmup: float) -> Dict:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    discard = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as c:
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        async def worker() -> None:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                op = OPERATIONS[random.choices(names, weights)[0]]
+                await op(c, random.choice(users), recorder if now >= measure_from else discard)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - measure_from
+    return recorder.summary(elapsed)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    mix = MIXES[args.mix]
+    workdir = Path(tempfile.mkdtemp(prefix="maimweb-bench-"))
+    upstream_port, app_port = _free_port(), _free_port()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'bench.db'}",
+        "MAIMCONFIG_API_URL": f"http://127.0.0.1:{upstream_port}/api/v2",
+        "FAKE_MAIMCONFIG_LATENCY_MS": str(args.latency_ms),
+        "FAKE_MAIMCONFIG_JITTER_MS": str(args.jitter_ms),
+        "FAKE_MAIMCONFIG_ERROR_RATE": str(args.error_rate),
+    }
+    app_env = dict(env)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        app_env[key] = value
+    if args.workers > 1:
+        multiproc = workdir / "prometheus"
+        multiproc.mkdir()
+        app_env.setdefault("PROMETHEUS_MULTIPROC_DIR", str(multiproc))
+
+    _init_database(app_env)
+    processes = [
+        _spawn(["uvicorn", "benchmarks.fake_maimconfig:app", "--port", str(upstream_port), "--log-level", "warning"],
+               env, workdir / "maimconfig.log"),
+        _spawn(["uvicorn", "src.main:app", "--port", str(app_port), "--workers", str(args.workers),
+                "--log-level", "warning"], app_env, workdir / "app.log"),
+    ]
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        await _wait_ready(f"http://127.0.0.1:{upstream_port}/docs", processes[0])
+        await _wait_ready(f"{base_url}/", processes[1])
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as c:
+            users = await _seed(c, args.users, args.agents_per_user)
+        print(f"Seeded {len(users)} users, driving '{args.mix}' for {args.duration}s "
+              f"at concurrency {args.concurrency}...", flush=True)
+        result = await _drive(base_url, users, mix, args.concurrency, args.duration, args.warmup)
+    finally:
+        for proc in processes:
+            proc.terminate()
+        for proc in processes:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workdir": str(workdir),
+            "mix": args.mix,
+            "weights": mix,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "users": args.users,
+            "agents_per_user": args.agents_per_user,
+            "upstream": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate},
+            "env": args.env,
+        },
+        **result,
+    }
+
+
+# ---------------------------------------------------------------- report
+
+def print_report(result: Dict) -> None:
+    header = f"{'route':<36}{'reqs':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["routes"].items()) + [("overall", result["overall"])]
+    for route, stats in rows:
+        err = stats["errors"] / stats["requests"] * 100 if stats["requests"] else 0.0
+        print(f"{route:<36}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{err:>8.2f}")
+
+
+def compare(before: Dict, after: Dict) -> None:
+    print(f"{'route':<36}{'metric':>8}{'before':>10}{'after':>10}{'change':>9}")
+    routes = sorted(set(before["routes"]) | set(after["routes"])) + ["overall"]
+    for route in routes:
+        a = before["overall"] if route == "overall" else before["routes"].get(route)
+        b = after["overall"] if route == "overall" else after["routes"].get(route)
+        if a is None or b is None:
+            print(f"{route:<36}{'only in ' + ('after' if a is None else 'before'):>37}")
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            change = (b[metric] - a[metric]) / a[metric] * 100 if a[metric] else 0.0
+            print(f"{route:<36}{metric[:-3] if metric.endswith('_ms') else 'rps':>8}"
+                  f"{a[metric]:>10.1f}{b[metric]:>10.1f}{change:>+8.1f}%")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds driven but not recorded")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--agents-per-user", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake MaimConfig base latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="extra uniform latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake MaimConfig 503s")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra settings for the app, e.g. BCRYPT_ROUNDS=4")
+    parser.add_argument("--output", type=Path, default=ROOT / "benchmarks" / "results",
+                        help="directory (or .json file) for the results")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BEFORE", "AFTER"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*(json.loads(path.read_text()) for path in args.compare))
+        return
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    output = args.output
+    if output.suffix != ".json":
+        output.mkdir(parents=True, exist_ok=True)
+        output = output / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{args.mix}.json"
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Micro-benchmark: response serialization for agent / API key lists.
+
+Times a minimal ASGI round trip for three variants of the same route:
+FastAPI's response_model path with the stock JSONResponse, the same with
+FastJSONResponse (orjson), and model_response (precompiled TypeAdapter,
+validation and serialization in one pydantic-core pass).
+
+    python -m benchmarks.serialization --items 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from src.core.responses import FastJSONResponse, model_response
+from src.schemas.api_key import ApiKey
+
+
+# Mirrors src.api.routes.agents.AgentOut, kept here so importing the routes
+# (and maim_db) isn't needed to run the benchmark.
+class AgentOut(BaseModel):
+    name: str
+    description: Optional[str] = None
+    config: Optional[dict] = None
+    template_id: Optional[str] = None
+    id: str
+    tenant_id: str
+    status: str
+
+
+def make_agents(n: int) -> List[dict]:
+    return [
+        {
+            "id": f"a_{i:08x}", "agent_id": f"a_{i:08x}", "tenant_id": "t_0001", "name": f"agent {i}",
+            "description": "benchmark agent " * 4, "status": "active", "template_id": None,
+            "config": {"model": "gpt-4o", "temperature": 0.7, "plugins": ["search", "memory"], "persona": "x" * 200},
+            "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+        }
+        for i in range(n)
+    ]
+
+
+def make_keys(n: int) -> List[dict]:
+    created = datetime(2026, 1, 1)
+    return [
+        {
+            "id": f"k_{i:08x}", "tenant_id": "t_0001", "agent_id": "a_0001", "name": f"key {i}",
+            "description": None, "permissions": ["chat", "read"], "api_key": "sk-" + "0" * 48,
+            "status": "active", "created_at": (created + timedelta(seconds=i)).isoformat(),
+            "last_used_at": None, "expires_at": None,
+        }
+        for i in range(n)
+    ]
+
+
+def stdlib_path(adapter: TypeAdapter, data: list) -> bytes:
+    # Reference encoding, used to check the fast path's output
+    validated = adapter.validate_python(data)
+    encoded = jsonable_encoder(adapter.dump_python(validated, mode="json", by_alias=True))
+    return json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(adapter: TypeAdapter, data: list) -> bytes:
+    return model_response(adapter, data).body
+
+
+def build_app(payload: list, model: type) -> FastAPI:
+    adapter = TypeAdapter(List[model])
+    app = FastAPI()
+
+    @app.get("/stock", response_model=List[model], response_class=JSONResponse)
+    async def stock():
+        return payload
+
+    @app.get("/fast", response_model=List[model])
+    async def fast():
+        return model_response(adapter, payload)
+
+    @app.get("/orjson", response_model=List[model], response_class=FastJSONResponse)
+    async def orjson_only():
+        return payload
+
+    return app
+
+
+async def time_routes(app: FastAPI, requests: int) -> dict:
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as c:
+        for route in ("/stock", "/orjson", "/fast"):
+            for _ in range(10):
+                await c.get(route)
+            started = time.perf_counter()
+            for _ in range(requests):
+                await c.get(route)
+            results[route] = (time.perf_counter() - started) / requests
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200, help="ASGI round trips per route")
+    args = parser.parse_args()
+
+    for label, model, factory in (("agents", AgentOut, make_agents), ("api keys", ApiKey, make_keys)):
+        adapter = TypeAdapter(List[model])
+        print(f"\n{label}")
+        print(f"{'items':>7}{'stock us':>11}{'orjson us':>11}{'fast us':>10}{'speedup':>9}")
+        for n in args.items:
+            data = factory(n)
+            # Same bytes on the wire, modulo formatting
+            assert json.loads(stdlib_path(adapter, data)) == json.loads(fast_path(adapter, data))
+            routes = asyncio.run(time_routes(build_app(data, model), max(20, args.requests * 100 // max(n, 100))))
+            stock, orjson_only, fast = (routes[r] * 1e6 for r in ("/stock", "/orjson", "/fast"))
+            print(f"{n:>7}{stock:>11.0f}{orjson_only:>11.0f}{fast:>10.0f}{stock / fast:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
-from typing import Generator, AsyncGenerator
+import time
+from typing import Any, Dict, Generator, AsyncGenerator, List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core import security
+from src.core import metrics, security
+from src.core.agent_mirror import agent_mirror
+from src.core.claim_revocations import claim_revocations
+from src.core.maim_config_client import MaimConfigError, MaimConfigUnavailable, client as maim_config_client
+from src.core.principal_cache import Principal, principal_cache
 from src.core.settings import settings
 from src.schemas import token as token_schema
 from src.schemas import user as user_schema
 
 # Use existing get_db from maimconfig_models
 from maim_db.maimconfig_models.connection import get_db as _get_db
-from maim_db.maimconfig_models.models import User
+from maim_db.maimconfig_models.models import User, Tenant
 
 # OAuth2 方案
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -24,17 +30,38 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     获取数据库会话
     """
+    started = time.perf_counter()
     async for session in _get_db():
-        yield session
+        metrics.DB_SESSION_ACQUIRE.observe(time.perf_counter() - started)
+        metrics.DB_SESSIONS_IN_USE.inc()
+        try:
+            yield session
+        finally:
+            metrics.DB_SESSIONS_IN_USE.dec()
 
 
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> user_schema.CurrentUser:
     """
     根据 Token 获取当前用户
+
+    Resolved principals are cached per token digest (see principal_cache),
+    so repeat requests skip the JWT decode and the database.
     """
+    principal = principal_cache.get(token)
+    if principal is None:
+        principal = await _load_principal(db, token)
+        principal_cache.put(token, principal)
+
+    user = principal.user
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+async def _load_principal(db: AsyncSession, token: str) -> Principal:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -45,16 +72,144 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+
+    # Stateless mode: a trusted tenant claim replaces the User/Tenant queries.
+    # An empty claim (token issued before provisioning finished) is not trusted.
+    if (
+        settings.AUTH_STATELESS
+        and token_data.tid
+        and token_data.name
+        and await claim_revocations.trusted(db, token_data.sub, token_data.iat)
+    ):
+        current_user = user_schema.CurrentUser(
+            id=token_data.sub,
+            username=token_data.name,
+            email=token_data.email,
+            is_active=True,  # inactive users can't log in; deactivation must revoke_user
+            tenant_ids=token_data.tid,
+        )
+        return Principal(payload=payload, user=current_user)
     
     # 从数据库查询用户
     # 注意: User 是我们刚添加到 maimconfig_models 的
-    # 需要使用 select 查询
-    from sqlalchemy import select
     result = await db.execute(select(User).where(User.id == token_data.sub))
     user = result.scalars().first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+
+    result = await db.execute(select(Tenant.id).where(Tenant.owner_id == user.id))
+    current_user = user_schema.CurrentUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        is_active=user.is_active,
+        tenant_ids=list(result.scalars().all()),
+    )
+    return Principal(payload=payload, user=current_user)
+
+
+async def get_owned_tenant_ids(db: AsyncSession, current_user: user_schema.CurrentUser) -> List[str]:
+    """
+    Ids of the tenants the user owns. With AUTH_STATELESS this is the set
+    carried by the principal (token claim or cached load), without a query.
+    """
+    if settings.AUTH_STATELESS:
+        return list(current_user.tenant_ids)
+    result = await db.execute(select(Tenant.id).where(Tenant.owner_id == current_user.id))
+    return list(result.scalars().all())
+
+
+def agent_upstream_error(e: Exception) -> HTTPException:
+    """
+    A failed MaimConfig agent call as an HTTPException: 4xx answers keep
+    their status (a deleted agent is a 404, not an outage), anything else
+    (unreachable, open circuit, 5xx, unexpected) is a 503.
+    """
+    if isinstance(e, MaimConfigError) and not isinstance(e, MaimConfigUnavailable) \
+            and e.status_code is not None and 400 <= e.status_code < 500:
+        detail = "Agent not found" if e.status_code == 404 else str(e)
+        return HTTPException(status_code=e.status_code, detail=detail)
+    return HTTPException(status_code=503, detail=f"Proxy Error: {str(e)}")
+
+
+async def fetch_agent(agent_id: str) -> Dict[str, Any]:
+    """The agent from MaimConfig (no ownership check, no database): 404/503 on failure."""
+    try:
+        resp = await maim_config_client.get_agent(agent_id)
+    except Exception as e:
+        print(f"ERROR read_agent: {e}")
+        raise agent_upstream_error(e)
+    if not resp.get("success"):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return resp["data"]
+
+
+class AgentContext:
+    """
+    Request-scoped memo of agent lookups and ownership checks.
+
+    FastAPI caches dependencies per request, so every handler/helper that
+    asks for `get_agent_context` shares this instance and each agent is
+    fetched from MaimConfig and ownership-checked at most once.
+    """
+
+    def __init__(self, db: AsyncSession, current_user: user_schema.CurrentUser):
+        self.db = db
+        self.current_user = current_user
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._owned_tenants: Dict[str, bool] = {}
+
+    async def get_agent(self, agent_id: str) -> Dict[str, Any]:
+        """Return the agent's data, raising 404/403/503 like `read_agent` does."""
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            agent = await fetch_agent(agent_id)
+            await self.remember(agent_id, agent)
+        await self.check_owner(agent)
+        return agent
+
+    async def check_owner(self, agent: Dict[str, Any]) -> None:
+        if not await self.owns_tenant(agent["tenant_id"]):
+            raise HTTPException(status_code=403, detail="Permission denied")
+
+    async def get_tenant_id(self, agent_id: str) -> str:
+        """
+        The agent's tenant_id, with the same 404/403/503 checks as
+        `get_agent`. Served from the local agent mirror when it has the
+        agent; for routes that only need ownership and the tenant.
+        """
+        if agent_id not in self._agents:
+            mirrored = await agent_mirror.lookup(self.db, agent_id, self.current_user.id)
+            if mirrored is not None:
+                tenant_id, owned = mirrored
+                if settings.AUTH_STATELESS:
+                    owned = tenant_id in self.current_user.tenant_ids
+                self._owned_tenants.setdefault(tenant_id, owned)
+                if not owned:
+                    raise HTTPException(status_code=403, detail="Permission denied")
+                return tenant_id
+        return (await self.get_agent(agent_id))["tenant_id"]
+
+    async def owns_tenant(self, tenant_id: str) -> bool:
+        owned = self._owned_tenants.get(tenant_id)
+        if owned is None and settings.AUTH_STATELESS:
+            owned = tenant_id in self.current_user.tenant_ids
+        elif owned is None:
+            stmt = select(Tenant.id).where(Tenant.id == tenant_id, Tenant.owner_id == self.current_user.id)
+            result = await self.db.execute(stmt)
+            owned = result.scalars().first() is not None
+            self._owned_tenants[tenant_id] = owned
+        return owned
+
+    async def remember(self, agent_id: str, agent: Dict[str, Any]) -> None:
+        """Replace the memoized (and mirrored) agent after a successful write."""
+        self._agents[agent_id] = agent
+        await agent_mirror.record(agent)
+
+
+async def get_agent_context(
+    db: AsyncSession = Depends(get_db),
+    current_user: user_schema.CurrentUser = Depends(get_current_user),
+) -> AgentContext:
+    return AgentContext(db, current_user)
@@ -1,8 +1,25 @@
+import csv
+import io
 import json
+import operator
+import zlib
+from datetime import datetime, timedelta
 from typing import Optional, List
 from fastapi import APIRouter, Query, HTTPException
-from maim_db.core.models.business import ChatHistory, ChatLogs, FileUpload, SystemMetrics
-from maim_db.core.context_manager import set_current_agent_id
+from fastapi.responses import Response, StreamingResponse
+from src.core.agent_mirror import agent_mirror
+from src.core.api_key_cache import api_key_list_cache
+from src.core.cache import TTLCache
+from src.core.db_executor import admin_db_executor
+from src.core.maim_config_client import client as maim_config_client
+from src.core.pagination import decode_cursor, encode_cursor
+from src.core.principal_cache import principal_cache
+from src.core.profiling import request_profiler
+from src.core.provisioning import tenant_provisioner
+from src.core.security import password_hasher
+from src.core.settings import settings
+from src.api.routes.agents import agent_reads
+from src.api.routes.system import catalogue_cache
 
 # We need to temporarily set agent_id to allow querying business models regardless of specific agent constraint if we want full admin view.
 # However, business models enforce agent_id in 'select'. 
@@ -14,6 +31,10 @@ from maim_db.core.context_manager import set_current_agent_id
 # query = query.where(cls.agent_id == current_id) if current_id else query.
 # Yes! So if we don't set the context, we get everything. Good for Admin.
 
+# The peewee business models (and numpy, via metric_rollups) are imported
+# inside the handlers: they are only needed once an admin endpoint is hit,
+# and importing them eagerly dominated the app's import time.
+
 router = APIRouter()
 
 def parse_json(content):
@@ -24,110 +45,399 @@ def parse_json(content):
     except:
         return content
 
+# Totals are expensive on large tables: computed lazily (first page or
+# include_total=true) and cached per table + filter.
+_total_cache = TTLCache(maxsize=1024, ttl=settings.ADMIN_TOTAL_CACHE_TTL)
+
+
+def _estimate_rows(model) -> Optional[int]:
+    """Planner row estimate for an unfiltered table, where the backend has one."""
+    database = model._meta.database
+    backend = type(database).__name__.lower()
+    if "postgres" in backend:
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    elif "mysql" in backend:
+        sql = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s"
+    else:
+        return None
+    row = database.execute_sql(sql, (model._meta.table_name,)).fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _keyset_after(model, after_at: Optional[datetime], after_id, descending: bool):
+    """
+    Rows past (after_at, after_id) in (created_at, id) order, in either
+    direction, with NULL created_at sorting last (`nulls="LAST"`).
+    """
+    past = operator.lt if descending else operator.gt
+    if after_at is None:
+        return model.created_at.is_null() & past(model.id, after_id)
+    return (
+        past(model.created_at, after_at)
+        | ((model.created_at == after_at) & past(model.id, after_id))
+        | model.created_at.is_null()
+    )
+
+
+def _query_page(model, filters: list, page: int, size: int, after: Optional[dict], count: bool) -> dict:
+    """
+    One page of `model` ordered by (created_at, id) descending.
+
+    With `after` (a decoded cursor) the page is fetched by keyset instead of
+    OFFSET, so deep pages cost the same as the first one.
+    """
+    query = model.select()
+    for condition in filters:
+        query = query.where(condition)
+
+    total = None
+    approximate = False
+    if count:
+        if not filters:
+            total = _estimate_rows(model)
+            approximate = total is not None
+        if total is None:
+            total = query.count()
+
+    # Rows without created_at sort last (peewee emulates NULLS LAST where needed)
+    query = query.order_by(model.created_at.desc(nulls="LAST"), model.id.desc())
+    if after:
+        try:
+            after_at = after["created_at"]
+            after_at = None if after_at is None else datetime.fromisoformat(after_at)
+            after_id = after["id"]
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(_keyset_after(model, after_at, after_id, descending=True))
+        rows = list(query.limit(size + 1))
+    else:
+        rows = list(query.offset((page - 1) * size).limit(size + 1))
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        # The field converts the id back on comparison (e.g. int or UUID columns)
+        next_cursor = encode_cursor({
+            "created_at": last.created_at.isoformat() if last.created_at else None,
+            "id": str(last.id),
+        })
+    return {"rows": rows, "total": total, "total_approximate": approximate, "next_cursor": next_cursor}
+
+
+async def _list_page(model, filters: list, filter_key: tuple, page: int, size: int,
+                     cursor: Optional[str], include_total: Optional[bool], serialize) -> dict:
+    after = decode_cursor(cursor) if cursor else None
+    want_total = include_total if include_total is not None else after is None
+    cache_key = (model._meta.table_name,) + filter_key
+    cached_total = _total_cache.get(cache_key) if want_total else None
+
+    def job():
+        result = _query_page(model, filters, page, size, after, want_total and cached_total is None)
+        result["items"] = [serialize(row) for row in result.pop("rows")]
+        return result
+
+    result = await admin_db_executor.run(job, database=model._meta.database)
+    if cached_total is not None:
+        # Possibly a few seconds stale
+        result["total"], result["total_approximate"] = cached_total, True
+    elif result["total"] is not None:
+        _total_cache.set(cache_key, result["total"])
+
+    return {
+        "items": result["items"],
+        "total": result["total"],
+        "total_approximate": result["total_approximate"],
+        "page": page,
+        "size": size,
+        "next_cursor": result["next_cursor"],
+    }
+
+
+def _chat_history_item(log) -> dict:
+    return {
+        "id": str(log.id),
+        "agent_id": log.agent_id,
+        "session_id": log.session_id,
+        "user_message": log.user_message,  # Might be JSON or text
+        "assistant_message": log.assistant_message,
+        "user_id": log.user_id,
+        "created_at": log.created_at.isoformat() if log.created_at else None
+        # Parse messages if needed, but keeping raw is fine for admin list
+    }
+
 @router.get("/chat-history", summary="List Chat History")
 async def list_chat_history(
     page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1),
-    agent_id: Optional[str] = None
+    size: int = Query(20, ge=1, le=settings.ADMIN_MAX_PAGE_SIZE),
+    agent_id: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true on the first page only"),
 ):
+    from maim_db.core.models.business import ChatHistory
+
     try:
         # If agent_id is provided, we can either use context or just filter.
         # Filtering is safer for read-only admin view without messing with global context.
-        query = ChatHistory.select()
-        if agent_id:
-            query = query.where(ChatHistory.agent_id == agent_id)
-            
-        total = query.count()
-        logs = query.order_by(ChatHistory.created_at.desc()).paginate(page, size)
-        
-        items = []
-        for log in logs:
-            items.append({
-                "id": str(log.id),
-                "agent_id": log.agent_id,
-                "session_id": log.session_id,
-                "user_message": log.user_message,  # Might be JSON or text
-                "assistant_message": log.assistant_message,
-                "user_id": log.user_id,
-                "created_at": log.created_at.isoformat() if log.created_at else None
-                # Parse messages if needed, but keeping raw is fine for admin list
-            })
-            
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size
-        }
+        filters = [ChatHistory.agent_id == agent_id] if agent_id else []
+        return await _list_page(
+            ChatHistory, filters, ("agent_id", agent_id), page, size, cursor, include_total, _chat_history_item
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+_EXPORT_FIELDS = ["id", "agent_id", "session_id", "user_id", "user_message", "assistant_message", "created_at"]
+
+
+def _export_batch(filters: list, after: Optional[tuple], limit: int) -> list:
+    from maim_db.core.models.business import ChatHistory
+
+    query = ChatHistory.select()
+    for condition in filters:
+        query = query.where(condition)
+    if after:
+        query = query.where(_keyset_after(ChatHistory, *after, descending=False))
+    query = query.order_by(ChatHistory.created_at.asc(nulls="LAST"), ChatHistory.id.asc()).limit(limit)
+    return [(row.created_at, row.id, _chat_history_item(row)) for row in query]
+
+
+async def _export_chunks(filters: list, fmt: str, compress: bool):
+    """
+    Yield encoded export chunks, one keyset batch at a time.
+
+    Only one batch is held in memory and every batch runs on the admin DB
+    executor, so exports of any size stay off the event loop.
+    """
+    from maim_db.core.models.business import ChatHistory
+
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+    def emit(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(_EXPORT_FIELDS)
+        yield emit(header.getvalue())
+
+    after = None
+    batch_size = settings.ADMIN_EXPORT_BATCH_SIZE
+    while True:
+        rows = await admin_db_executor.run(
+            _export_batch, filters, after, batch_size, database=ChatHistory._meta.database
+        )
+        if not rows:
+            break
+        buf = io.StringIO()
+        if fmt == "csv":
+            writer = csv.writer(buf)
+            for _, _, item in rows:
+                writer.writerow([item[field] for field in _EXPORT_FIELDS])
+        else:
+            for _, _, item in rows:
+                buf.write(json.dumps(item, ensure_ascii=False))
+                buf.write("\n")
+        chunk = emit(buf.getvalue())
+        if chunk:
+            yield chunk
+        if len(rows) < batch_size:
+            break
+        after = rows[-1][:2]
+
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get("/chat-history/export", summary="Export Chat History")
+async def export_chat_history(
+    agent_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="created_at >= start"),
+    end: Optional[datetime] = Query(None, description="created_at < end"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+):
+    """
+    Stream matching chat history as NDJSON or CSV, oldest first.
+    """
+    from maim_db.core.models.business import ChatHistory
+
+    filters = []
+    if agent_id:
+        filters.append(ChatHistory.agent_id == agent_id)
+    if session_id:
+        filters.append(ChatHistory.session_id == session_id)
+    if start:
+        filters.append(ChatHistory.created_at >= start)
+    if end:
+        filters.append(ChatHistory.created_at < end)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"chat-history.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(_export_chunks(filters, format, gzip), media_type=media_type, headers=headers)
+
+def _file_item(f) -> dict:
+    return {
+        "id": str(f.id),
+        "agent_id": f.agent_id,
+        "original_filename": f.original_filename,
+        "file_path": f.file_path,
+        "file_size": f.file_size,
+        "mime_type": f.mime_type,
+        "created_at": f.created_at.isoformat() if f.created_at else None
+    }
+
 @router.get("/files", summary="List Files")
 async def list_files(
     page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1),
-    agent_id: Optional[str] = None
+    size: int = Query(20, ge=1, le=settings.ADMIN_MAX_PAGE_SIZE),
+    agent_id: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true on the first page only"),
 ):
+    from maim_db.core.models.business import FileUpload
+
     try:
-        query = FileUpload.select()
-        if agent_id:
-            query = query.where(FileUpload.agent_id == agent_id)
-            
-        total = query.count()
-        files = query.order_by(FileUpload.created_at.desc()).paginate(page, size)
-        
-        items = []
-        for f in files:
-            items.append({
-                "id": str(f.id),
-                "agent_id": f.agent_id,
-                "original_filename": f.original_filename,
-                "file_path": f.file_path,
-                "file_size": f.file_size,
-                "mime_type": f.mime_type,
-                "created_at": f.created_at.isoformat() if f.created_at else None
-            })
-            
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size
-        }
+        filters = [FileUpload.agent_id == agent_id] if agent_id else []
+        return await _list_page(
+            FileUpload, filters, ("agent_id", agent_id), page, size, cursor, include_total, _file_item
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _metric_item(m) -> dict:
+    return {
+        "id": str(m.id),
+        "agent_id": m.agent_id,
+        "metric_name": m.metric_name,
+        "metric_value": m.metric_value,
+        "metric_unit": m.metric_unit,
+        "tags": parse_json(m.tags),
+        "created_at": m.created_at.isoformat() if m.created_at else None
+    }
+
 @router.get("/metrics", summary="List System Metrics")
 async def list_metrics(
     page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1),
-    metric_name: Optional[str] = None
+    size: int = Query(20, ge=1, le=settings.ADMIN_MAX_PAGE_SIZE),
+    metric_name: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Defaults to true on the first page only"),
 ):
+    from maim_db.core.models.business import SystemMetrics
+
     try:
-        query = SystemMetrics.select()
-        if metric_name:
-            query = query.where(SystemMetrics.metric_name == metric_name)
-            
-        total = query.count()
-        metrics = query.order_by(SystemMetrics.created_at.desc()).paginate(page, size)
-        
-        items = []
-        for m in metrics:
-            items.append({
-                "id": str(m.id),
-                "agent_id": m.agent_id,
-                "metric_name": m.metric_name,
-                "metric_value": m.metric_value,
-                "metric_unit": m.metric_unit,
-                "tags": parse_json(m.tags),
-                "created_at": m.created_at.isoformat() if m.created_at else None
-            })
-            
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size
-        }
+        filters = [SystemMetrics.metric_name == metric_name] if metric_name else []
+        return await _list_page(
+            SystemMetrics, filters, ("metric_name", metric_name), page, size, cursor, include_total, _metric_item
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/metrics/aggregate", summary="Aggregate System Metrics")
+async def aggregate_metrics(
+    metric_name: str,
+    resolution: str = Query("1h", pattern="^(1m|1h|1d)$"),
+    start: Optional[datetime] = Query(None, description="Defaults to 24 buckets before end"),
+    end: Optional[datetime] = Query(None, description="Defaults to now (UTC)"),
+    group_by: Optional[str] = Query(None, pattern="^(agent_id|tag:.+)$"),
+):
+    """
+    Per-bucket count/min/max/avg/p50/p95/p99 for one metric.
+
+    Completed buckets are served from incrementally maintained rollup
+    tables, so repeat queries only scan raw rows for the open tail.
+    """
+    from maim_db.core.models.business import SystemMetrics
+    from src.core import metric_rollups
+
+    seconds = metric_rollups.RESOLUTIONS[resolution]
+    # Stored timestamps are naive UTC; `...Z` / `+08:00` query values are converted
+    end = metric_rollups.naive_utc(end) if end else datetime.utcnow()
+    start = metric_rollups.naive_utc(start) if start else end - timedelta(seconds=seconds * 24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).total_seconds() / seconds > settings.ADMIN_METRIC_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range exceeds {settings.ADMIN_METRIC_MAX_BUCKETS} buckets")
+
+    try:
+        buckets = await admin_db_executor.run(
+            metric_rollups.aggregate, metric_name, resolution, group_by or "", start, end,
+            database=SystemMetrics._meta.database,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "metric_name": metric_name,
+        "resolution": resolution,
+        "group_by": group_by,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": buckets,
+    }
+
+@router.get("/runtime", summary="Runtime Stats")
+async def runtime_stats():
+    """Per-worker runtime counters (connection pools, caches) for capacity sizing."""
+    return {
+        "maimconfig_pool": maim_config_client.pool_stats(),
+        "maimconfig_coalescing": maim_config_client.coalescing_stats(),
+        "maimconfig_resilience": maim_config_client.resilience_stats(),
+        "principal_cache": principal_cache.stats(),
+        "catalogue_cache": catalogue_cache.stats(),
+        "agent_stale_reads": agent_reads.stats(),
+        "api_key_list_cache": api_key_list_cache.stats(),
+        "admin_db_executor": admin_db_executor.stats(),
+        "admin_total_cache": _total_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "tenant_provisioner": tenant_provisioner.stats(),
+        "agent_mirror": agent_mirror.stats(),
+        "profiling": request_profiler.stats(),
+    }
+
+
+@router.get("/profiling", summary="List Request Profiles")
+async def list_profiles():
+    """Profiler state plus stored profiles, slowest first (this worker only)."""
+    return {
+        **request_profiler.stats(),
+        "profiles": request_profiler.store.list(),
+    }
+
+
+@router.put("/profiling", summary="Configure Request Profiling")
+async def configure_profiling(
+    sample_rate: float = Query(..., ge=0, le=1, description="Fraction of requests to profile, e.g. 0.001"),
+    clear: bool = False,
+):
+    """Runtime toggle; applies to the worker serving this request until restart."""
+    if not request_profiler.available and sample_rate > 0:
+        raise HTTPException(status_code=501, detail="pyinstrument is not installed")
+    request_profiler.sample_rate = sample_rate
+    if clear:
+        request_profiler.store.clear()
+    return request_profiler.stats()
+
+
+@router.get("/profiling/{profile_id}", summary="Get Request Profile")
+async def get_profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|html)$")):
+    """speedscope JSON (open in https://www.speedscope.app) or pyinstrument's HTML flamegraph."""
+    profile = request_profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "speedscope" else "text/html"
+    return Response(content=profile.render(format), media_type=media_type)
@@ -1,17 +1,28 @@
-from typing import Any, List, Optional
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
+import heapq
+import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
 from src.api import deps
+from src.core.agent_mirror import agent_mirror
+from src.core.api_key_cache import api_key_list_cache
+from src.core.cache import StaleIfErrorCache
 from src.core.maim_config_client import client as maim_config_client
+from src.core.pagination import decode_cursor, encode_cursor
+from src.core.responses import model_response
+from src.core.settings import settings
 from src.schemas import api_key as api_key_schema
-from maim_db.maimconfig_models.models import User, Tenant
+from src.models.provisioning import ProvisioningStatus, TenantProvisioning
+from maim_db.maimconfig_models.models import User
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Schema definitions (temporary, should be moved to schemas/)
 class AgentBase(BaseModel):
@@ -38,44 +49,190 @@ class AgentOut(AgentBase):
     class Config:
         from_attributes = True
 
+class AgentBatchGet(BaseModel):
+    agent_ids: List[str] = Field(..., min_length=1, max_length=settings.AGENT_BATCH_MAX_IDS)
+
+class AgentBatchError(BaseModel):
+    status_code: int
+    detail: str
+
+class AgentBatchOut(BaseModel):
+    # Keyed by agent ID; every requested ID lands in exactly one of the two
+    agents: Dict[str, AgentOut] = {}
+    errors: Dict[str, AgentBatchError] = {}
+
+
+# Built once; used by model_response to validate + serialize in one pass
+_agent_adapter = TypeAdapter(AgentOut)
+_agent_list_adapter = TypeAdapter(List[AgentOut])
+_api_key_adapter = TypeAdapter(api_key_schema.ApiKey)
+_api_key_list_adapter = TypeAdapter(List[api_key_schema.ApiKey])
+_agent_batch_adapter = TypeAdapter(AgentBatchOut)
+_api_key_bulk_adapter = TypeAdapter(api_key_schema.ApiKeyBulkOut)
+
+
+def _upstream_failed(e: BaseException) -> bool:
+    # 503s (and unexpected errors) mean MaimConfig is degraded; 404/403 are answers
+    return not isinstance(e, HTTPException) or e.status_code >= 500
+
+
+# Per-user last known good reads, served while MaimConfig is down or slow
+agent_reads = StaleIfErrorCache(
+    max_age=settings.AGENT_STALE_IF_ERROR,
+    budget=settings.AGENT_STALE_LATENCY_BUDGET,
+    maxsize=settings.AGENT_STALE_CACHE_SIZE,
+    serve_stale_on=_upstream_failed,
+)
+
+
+def _stale_headers(headers: dict, stale_age: Optional[float]) -> dict:
+    if stale_age is None:
+        return headers
+    return {**headers, "X-Stale-Age": str(int(stale_age))}
+
+
+class _TenantAgentStream:
+    """
+    One tenant's agent listing, fetched from MaimConfig a page at a time
+    starting at `offset` (the number of its agents already returned).
+    """
+
+    def __init__(self, tenant_id: str, offset: int, page_size: int):
+        self.tenant_id = tenant_id
+        self.offset = offset
+        self.page_size = page_size
+        self.buffer: deque = deque()
+        self.exhausted = False
+
+    @property
+    def has_more(self) -> bool:
+        return bool(self.buffer) or not self.exhausted
+
+    async def fetch(self) -> None:
+        # Position of the first item we don't have yet
+        start = self.offset + len(self.buffer)
+        page = start // self.page_size + 1
+        resp = await maim_config_client.get_agents(self.tenant_id, page=page, page_size=self.page_size)
+        if not resp.get("success"):
+            raise Exception(resp.get("message") or "MaimConfig returned success=false")
+        data = resp.get("data", {})
+        items = data.get("items", []) if isinstance(data, dict) else []
+        if len(items) > self.page_size:
+            # Upstream ignored page/page_size and returned the full listing
+            items = items[start:]
+            self.exhausted = True
+        else:
+            items = items[start % self.page_size:]
+            total = data.get("total") if isinstance(data, dict) else None
+            if total is not None:
+                self.exhausted = start + len(items) >= total
+            else:
+                self.exhausted = len(items) + start % self.page_size < self.page_size
+        self.buffer.extend(items)
+
+
+def _agent_sort_key(agent: dict) -> tuple:
+    # Stable global order: creation time, then id. Each tenant's listing is
+    # assumed to come back from MaimConfig in the same order.
+    return (str(agent.get("created_at") or ""), str(agent.get("agent_id") or agent.get("id") or ""))
+
 
 @router.get("/", response_model=List[AgentOut])
 async def read_agents(
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
 ) -> Any:
     """
     Retrieve agents via MaimConfig Proxy.
+
+    Cursor paginated: each tenant's listing is paged upstream and the
+    tenants are k-way merged, so only what the page needs is fetched.
+    The next page's cursor is returned in the `X-Next-Cursor` header;
+    tenants whose upstream call failed are listed in `X-Partial-Failures`
+    and retried by the next page. `skip` is kept for older clients and
+    only applies to the first page; a cursor already points past it.
+
+    While MaimConfig is down or slower than AGENT_STALE_LATENCY_BUDGET,
+    the user's last good copy of the page is returned with `X-Stale-Age`.
     """
     # 1. Get User's Tenants
-    user_tenants_query = select(Tenant.id).where(Tenant.owner_id == current_user.id)
-    result = await db.execute(user_tenants_query)
-    tenant_ids = result.scalars().all()
+    tenant_ids = await deps.get_owned_tenant_ids(db, current_user)
     
     if not tenant_ids:
-        return []
+        return model_response(_agent_list_adapter, [])
 
-    # 2. Fetch Agents for each Tenant from MaimConfig
-    # Note: This could be optimized if MaimConfig supported bulk fetching or list by multiple tenants
-    # For now, we fetch concurrently
-    tasks = [maim_config_client.get_agents(tid) for tid in tenant_ids]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    all_agents = []
-    for res in results:
-        if isinstance(res, dict) and res.get("success"):
-             # data contains {"items": [], "total": ...} or list?
-             # Checking api_docs/agent_api.py: returns items list inside data?
-             # agent_api.py list_agents returns data={"items": [...], ...}
-             data = res.get("data", {})
-             items = data.get("items", []) if isinstance(data, dict) else []
-             all_agents.extend(items)
-        # Identify connection errors? user might want to know
-    
-    # Simple pagination in memory (inefficient for large datasets but ok for now)
-    return all_agents[skip : skip + limit]
+    # Keyed on the tenant set too, so a stale page never outlives a change of ownership
+    (page, headers), stale_age = await agent_reads.get(
+        (current_user.id, "agents", tuple(sorted(tenant_ids)), cursor, skip, limit),
+        lambda: _list_agents(tenant_ids, cursor, skip, limit),
+    )
+    return model_response(_agent_list_adapter, page, headers=_stale_headers(headers, stale_age))
+
+
+async def _list_agents(tenant_ids: List[str], cursor: Optional[str], skip: int, limit: int) -> Tuple[list, dict]:
+    """One page of read_agents and its headers; MaimConfig calls only."""
+    # Per-tenant offsets; None marks a tenant already fully returned
+    offsets = decode_cursor(cursor).get("offsets", {}) if cursor else {}
+    if cursor:
+        skip = 0
+    page_size = skip + limit
+    streams = [
+        _TenantAgentStream(tid, int(offsets.get(tid, 0)), page_size)
+        for tid in tenant_ids
+        if not (tid in offsets and offsets[tid] is None)
+    ]
+
+    # 2. Fetch the first page of every tenant, with bounded fan-out
+    semaphore = asyncio.Semaphore(settings.AGENT_LIST_FANOUT_CONCURRENCY)
+
+    async def fetch(stream: _TenantAgentStream) -> None:
+        async with semaphore:
+            await stream.fetch()
+
+    results = await asyncio.gather(*(fetch(s) for s in streams), return_exceptions=True)
+    failed = []
+    live = []
+    for stream, res in zip(streams, results):
+        if isinstance(res, Exception):
+            logger.warning("Listing agents of tenant %s failed: %s", stream.tenant_id, res)
+            failed.append(stream)
+        else:
+            live.append(stream)
+    if streams and not live:
+        raise HTTPException(status_code=503, detail="Proxy Error: MaimConfig unavailable for all tenants")
+
+    # 3. k-way merge until the page is full, refilling streams lazily
+    heap = [(_agent_sort_key(s.buffer[0]), i) for i, s in enumerate(live) if s.buffer]
+    heapq.heapify(heap)
+    page = []
+    while heap and len(page) < page_size:
+        _, i = heapq.heappop(heap)
+        stream = live[i]
+        page.append(stream.buffer.popleft())
+        stream.offset += 1
+        if not stream.buffer and not stream.exhausted:
+            try:
+                await stream.fetch()
+            except Exception as e:
+                logger.warning("Listing agents of tenant %s failed: %s", stream.tenant_id, e)
+                failed.append(stream)
+                continue
+        if stream.buffer:
+            heapq.heappush(heap, (_agent_sort_key(stream.buffer[0]), i))
+
+    next_offsets = {tid: None for tid, off in offsets.items() if off is None and tid in tenant_ids}
+    for stream in streams:
+        next_offsets[stream.tenant_id] = stream.offset if (stream.has_more or stream in failed) else None
+    headers = {}
+    if any(off is not None for off in next_offsets.values()):
+        headers["X-Next-Cursor"] = encode_cursor({"offsets": next_offsets})
+    if failed:
+        headers["X-Partial-Failures"] = ",".join(s.tenant_id for s in failed)
+
+    return page[skip:], headers
 
 
 @router.post("/", response_model=AgentOut)
@@ -90,15 +247,19 @@ async def create_agent(
     Defaults to the user's first tenant.
     """
     # 1. Get User's First Tenant
-    result = await db.execute(select(Tenant).where(Tenant.owner_id == current_user.id))
-    tenant = result.scalars().first()
+    tenant_ids = await deps.get_owned_tenant_ids(db, current_user)
     
-    if not tenant:
+    if not tenant_ids:
+        result = await db.execute(
+            select(TenantProvisioning.status).where(TenantProvisioning.user_id == current_user.id)
+        )
+        if result.scalars().first() in (ProvisioningStatus.PENDING, ProvisioningStatus.IN_PROGRESS):
+            raise HTTPException(status_code=409, detail="Tenant provisioning in progress, retry shortly")
         raise HTTPException(status_code=400, detail="User has no tenant to create agent in")
         
     # 2. Call MaimConfig
     payload = agent_in.dict()
-    payload["tenant_id"] = tenant.id
+    payload["tenant_id"] = tenant_ids[0]
     
     try:
         resp = await maim_config_client.create_agent(payload)
@@ -108,7 +269,8 @@ async def create_agent(
         # Returns {"data": {"agent_id": "...", ...}}
         # We need to fetch the full object? create_agent usually returns the object?
         # agent_api.py create_agent returns data={agent_id, tenant_id, name...}
-        return resp["data"]
+        await agent_mirror.record(resp["data"])
+        return model_response(_agent_adapter, resp["data"])
         
     except HTTPException:
         raise
@@ -117,59 +279,92 @@ async def create_agent(
          raise HTTPException(status_code=503, detail=f"Proxy Error: {str(e)}")
 
 
+@router.post("/batch-get", response_model=AgentBatchOut)
+async def batch_get_agents(
+    batch_in: AgentBatchGet,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get many agents by ID in one call.
+
+    Ownership is checked against the user's tenant set (one query, none
+    with AUTH_STATELESS) and the
+    agents are fetched from MaimConfig concurrently. Per-ID failures
+    (404/403/503, as `read_agent` would return them) are reported in
+    `errors` instead of failing the whole batch.
+    """
+    tenant_ids = set(await deps.get_owned_tenant_ids(db, current_user))
+
+    semaphore = asyncio.Semaphore(settings.AGENT_BATCH_CONCURRENCY)
+
+    async def resolve(agent_id: str) -> tuple:
+        # (agent, None) or (None, error), mirroring AgentContext.get_agent
+        async with semaphore:
+            try:
+                resp = await maim_config_client.get_agent(agent_id)
+            except Exception as e:
+                logger.warning("batch_get_agents failed for agent %s: %s", agent_id, e)
+                error = deps.agent_upstream_error(e)
+                return None, {"status_code": error.status_code, "detail": error.detail}
+        if not resp.get("success"):
+            return None, {"status_code": 404, "detail": "Agent not found"}
+        if resp["data"].get("tenant_id") not in tenant_ids:
+            return None, {"status_code": 403, "detail": "Permission denied"}
+        return resp["data"], None
+
+    # dict.fromkeys: drop duplicates, keep request order
+    agent_ids = list(dict.fromkeys(batch_in.agent_ids))
+    results = await asyncio.gather(*(resolve(aid) for aid in agent_ids))
+    agents = {}
+    errors = {}
+    for agent_id, (agent, error) in zip(agent_ids, results):
+        if error is None:
+            agents[agent_id] = agent
+        else:
+            errors[agent_id] = error
+    return model_response(_agent_batch_adapter, {"agents": agents, "errors": errors})
+
+
 @router.get("/{agent_id}", response_model=AgentOut)
 async def read_agent(
     agent_id: str,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ) -> Any:
     """
     Get agent by ID via Proxy.
     """
-    try:
-        # 1. Get Agent from MaimConfig
-        resp = await maim_config_client.get_agent(agent_id)
-        if not resp.get("success"):
-            raise HTTPException(status_code=404, detail="Agent not found")
-        
-        agent_data = resp["data"]
-        tenant_id = agent_data["tenant_id"]
-        
-        # 2. Verify Ownership (Check if tenant_id belongs to user)
-        stmt = select(Tenant).where(Tenant.id == tenant_id, Tenant.owner_id == current_user.id)
-        result = await db.execute(stmt)
-        if not result.scalars().first():
-            raise HTTPException(status_code=403, detail="Permission denied")
-            
-        return agent_data
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"ERROR read_agent: {e}")
-        raise HTTPException(status_code=503, detail=f"Proxy Error: {str(e)}")
+    agent, stale_age = await agent_reads.get(
+        (agent_ctx.current_user.id, "agent", agent_id),
+        lambda: deps.fetch_agent(agent_id),
+    )
+    if stale_age is None:
+        await agent_ctx.remember(agent_id, agent)
+    # Verifies the agent's tenant belongs to the user, stale copy or not
+    await agent_ctx.check_owner(agent)
+    return model_response(_agent_adapter, agent, headers=_stale_headers({}, stale_age))
 
 
 @router.put("/{agent_id}", response_model=AgentOut)
 async def update_agent(
     agent_id: str,
     agent_in: AgentUpdate,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ) -> Any:
     """
     Update agent via Proxy.
     """
-    # 1. Check permission first? Or fetch first? Update needs tenant_id to check permission.
-    # MaimConfig update endpoint doesn't return tenant_id in error if not found.
-    # We fetch agent first (read_agent logic)
-    await read_agent(agent_id, db, current_user) # reusing check logic
+    # MaimConfig update endpoint doesn't return tenant_id in error if not found,
+    # so resolve the agent (and its ownership) first.
+    await agent_ctx.get_tenant_id(agent_id)
     
     try:
         resp = await maim_config_client.update_agent(agent_id, agent_in.dict(exclude_unset=True))
         if not resp.get("success"):
             raise HTTPException(status_code=400, detail=resp.get("message"))
-        return resp["data"]
+        await agent_ctx.remember(agent_id, resp["data"])
+        agent_reads.invalidate((agent_ctx.current_user.id, "agent", agent_id))
+        return model_response(_agent_adapter, resp["data"])
     except HTTPException:
         raise
     except Exception as e:
@@ -183,19 +378,18 @@ async def update_agent(
 async def create_agent_api_key(
     agent_id: str,
     api_key_in: api_key_schema.ApiKeyCreate,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ) -> Any:
-    # Verify permission
-    await read_agent(agent_id, db, current_user)
-    
+    # Verify permission; create_api_key in MaimConfig needs tenant_id AND agent_id
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
+    data = await _create_api_key(tenant_id, agent_id, api_key_in)
+    await _api_keys_changed(agent_ctx, agent_id)
+    return model_response(_api_key_adapter, data)
+
+
+async def _create_api_key(tenant_id: str, agent_id: str, api_key_in: api_key_schema.ApiKeyCreate) -> dict:
     try:
         payload = api_key_in.dict()
-        # Need tenant_id? create_api_key in MaimConfig needs tenant_id AND agent_id
-        # We need to fetch agent to get tenant_id first...
-        agent_resp = await maim_config_client.get_agent(agent_id)
-        tenant_id = agent_resp["data"]["tenant_id"]
-        
         payload["tenant_id"] = tenant_id
         payload["agent_id"] = agent_id
         
@@ -214,21 +408,34 @@ async def create_agent_api_key(
         raise HTTPException(status_code=503, detail=str(e))
 
 
+async def _api_keys_changed(agent_ctx: deps.AgentContext, agent_id: str) -> None:
+    agent_reads.invalidate((agent_ctx.current_user.id, "api_keys", agent_id))
+    await api_key_list_cache.invalidate(agent_id)
+
+
 @router.get("/{agent_id}/api_keys", response_model=List[api_key_schema.ApiKey])
 async def read_agent_api_keys(
     agent_id: str,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ) -> Any:
-    # Verify permission
-    await read_agent(agent_id, db, current_user)
-    
-    # Get agent to get tenant_id
-    # Optimization: read_agent already fetches it, we could return it? but simpler to refetch or just assume user owns agent if pass
-    # Actually maim_config_client.get_api_keys needs tenant_id.
-    agent_resp = await maim_config_client.get_agent(agent_id)
-    tenant_id = agent_resp["data"]["tenant_id"]
-    
+    # Verify permission; list_api_keys needs the agent's tenant_id
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
+    if api_key_list_cache.enabled:
+        generation = await api_key_list_cache.generation(agent_ctx.db, agent_id)
+        items = api_key_list_cache.get(agent_id, generation)
+        if items is not None:
+            return model_response(_api_key_list_adapter, items)
+
+    items, stale_age = await agent_reads.get(
+        (agent_ctx.current_user.id, "api_keys", agent_id),
+        lambda: _list_api_keys(tenant_id, agent_id),
+    )
+    if stale_age is None and api_key_list_cache.enabled:
+        api_key_list_cache.put(agent_id, generation, items)
+    return model_response(_api_key_list_adapter, items, headers=_stale_headers({}, stale_age))
+
+
+async def _list_api_keys(tenant_id: str, agent_id: str) -> list:
     try:
         resp = await maim_config_client.list_api_keys(tenant_id, agent_id)
         if not resp.get("success"):
@@ -237,24 +444,162 @@ async def read_agent_api_keys(
         items = resp["data"].get("items", [])
         for item in items:
             item["id"] = item.pop("api_key_id", None) or item.get("id")
-        return items
     except Exception as e:
-        raise HTTPException(status_code=503, detail=str(e))
+        raise deps.agent_upstream_error(e)
+    return items
 
 
 @router.delete("/{agent_id}/api_keys/{key_id}", status_code=204)
 async def delete_agent_api_key(
     agent_id: str,
     key_id: str,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ):
     # Verify permission for agent
-    await read_agent(agent_id, db, current_user)
+    await agent_ctx.get_tenant_id(agent_id)
     
     try:
         await maim_config_client.delete_api_key(key_id)
+        await _api_keys_changed(agent_ctx, agent_id)
         return None
     except Exception as e:
         raise HTTPException(status_code=503, detail=str(e))
 
+
+# Bulk API key operations: one ownership check, bounded upstream fan-out,
+# one result per item instead of failing the whole request
+
+def _bulk_error(key_id: Optional[str], e: Exception) -> dict:
+    if isinstance(e, HTTPException):
+        return {"key_id": key_id, "status_code": e.status_code, "detail": str(e.detail)}
+    return {"key_id": key_id, "status_code": 503, "detail": str(e)}
+
+
+async def _all_api_keys(tenant_id: str, agent_id: str, page_size: int = 100) -> Dict[str, dict]:
+    """Every key of the agent by id, paging through MaimConfig's listing."""
+    keys: Dict[str, dict] = {}
+    page = 1
+    while True:
+        try:
+            resp = await maim_config_client.list_api_keys(tenant_id, agent_id, page=page, page_size=page_size)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        if not resp.get("success"):
+            return keys
+        data = resp.get("data") or {}
+        items = data.get("items", [])
+        before = len(keys)
+        for item in items:
+            item["id"] = item.pop("api_key_id", None) or item.get("id")
+            keys[item["id"]] = item
+        total = data.get("total")
+        # Stop on a short page, the reported total, or an upstream that ignores paging
+        if len(items) < page_size or len(keys) == before or (total is not None and len(keys) >= total):
+            return keys
+        page += 1
+
+
+async def _bulk_run(items: list, run) -> list:
+    semaphore = asyncio.Semaphore(settings.API_KEY_BULK_CONCURRENCY)
+
+    async def bounded(item):
+        async with semaphore:
+            try:
+                return await run(item)
+            except Exception as e:
+                # One bad item must not fail the request and hide the others' results
+                return _bulk_error(item if isinstance(item, str) else None, e)
+
+    return await asyncio.gather(*(bounded(item) for item in items))
+
+
+@router.post("/{agent_id}/api_keys/bulk", response_model=api_key_schema.ApiKeyBulkOut)
+async def bulk_create_agent_api_keys(
+    agent_id: str,
+    bulk_in: api_key_schema.ApiKeyBulkCreate,
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
+) -> Any:
+    """Create several keys for the agent; results are in request order."""
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
+
+    async def create(api_key_in: api_key_schema.ApiKeyCreate) -> dict:
+        try:
+            return {"status_code": 200, "api_key": await _create_api_key(tenant_id, agent_id, api_key_in)}
+        except Exception as e:
+            return _bulk_error(None, e)
+
+    results = await _bulk_run(bulk_in.keys, create)
+    if any(r["status_code"] == 200 for r in results):
+        await _api_keys_changed(agent_ctx, agent_id)
+    return model_response(_api_key_bulk_adapter, {"results": results})
+
+
+@router.post("/{agent_id}/api_keys/bulk-revoke", response_model=api_key_schema.ApiKeyBulkOut)
+async def bulk_revoke_agent_api_keys(
+    agent_id: str,
+    bulk_in: api_key_schema.ApiKeyBulkIds,
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
+) -> Any:
+    """Delete several of the agent's keys; ids that aren't its keys get a 404 result."""
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
+    known = await _all_api_keys(tenant_id, agent_id)
+
+    async def revoke(key_id: str) -> dict:
+        if key_id not in known:
+            return {"key_id": key_id, "status_code": 404, "detail": "API key not found"}
+        try:
+            await maim_config_client.delete_api_key(key_id)
+        except Exception as e:
+            return _bulk_error(key_id, e)
+        return {"key_id": key_id, "status_code": 204}
+
+    results = await _bulk_run(list(dict.fromkeys(bulk_in.key_ids)), revoke)
+    if any(r["status_code"] == 204 for r in results):
+        await _api_keys_changed(agent_ctx, agent_id)
+    return model_response(_api_key_bulk_adapter, {"results": results})
+
+
+@router.post("/{agent_id}/api_keys/rotate", response_model=api_key_schema.ApiKeyBulkOut)
+async def rotate_agent_api_keys(
+    agent_id: str,
+    bulk_in: api_key_schema.ApiKeyBulkIds,
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
+) -> Any:
+    """
+    Replace each key with a new one of the same name, description and
+    permissions. Per key, the new key is created first and the old one
+    revoked after; if the revoke fails the new key is deleted again, so
+    either both happen or neither.
+    """
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
+    known = await _all_api_keys(tenant_id, agent_id)
+
+    async def rotate(key_id: str) -> dict:
+        old = known.get(key_id)
+        if old is None:
+            return {"key_id": key_id, "status_code": 404, "detail": "API key not found"}
+        try:
+            replacement = api_key_schema.ApiKeyCreate(
+                name=old["name"], description=old.get("description"), permissions=old.get("permissions") or [],
+            )
+            new = await _create_api_key(tenant_id, agent_id, replacement)
+        except Exception as e:
+            return _bulk_error(key_id, e)
+        try:
+            await maim_config_client.delete_api_key(key_id)
+        except Exception as e:
+            try:
+                await maim_config_client.delete_api_key(new["id"])
+            except Exception as rollback_error:
+                logger.error("Rotating API key %s: deleting its replacement %s failed: %s",
+                             key_id, new["id"], rollback_error)
+                # Both keys exist now; hand out the new one rather than leak it
+                return {"key_id": key_id, "status_code": 503, "api_key": new,
+                        "detail": f"Revoking old key failed: {e}; new key kept"}
+            return _bulk_error(key_id, e)
+        return {"key_id": key_id, "status_code": 200, "api_key": new}
+
+    results = await _bulk_run(list(dict.fromkeys(bulk_in.key_ids)), rotate)
+    if any("api_key" in r for r in results):
+        await _api_keys_changed(agent_ctx, agent_id)
+    return model_response(_api_key_bulk_adapter, {"results": results})
@@ -1,13 +1,17 @@
 from typing import Optional
 from fastapi import APIRouter, Query, HTTPException, Depends
 from src.core.maim_config_client import client
+from src.core.responses import passthrough_response
 
 router = APIRouter()
 
+# Pure proxies: MaimConfig's response is streamed back untouched (see
+# MaimConfigClient.proxy); upstream errors still become 500s as before.
+
 @router.post("/", summary="Create API Key")
 async def create_api_key(request: dict):
     try:
-        return await client.create_api_key(request)
+        return passthrough_response(await client.proxy("POST", "/api-keys", json=request))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -19,34 +23,33 @@ async def list_api_keys(
     page_size: int = Query(20, ge=1),
     status: Optional[str] = Query(None)
 ):
+    params = {"tenant_id": tenant_id, "page": page, "page_size": page_size}
+    if agent_id:
+        params["agent_id"] = agent_id
+    if status:
+        params["status"] = status
     try:
-        return await client.list_api_keys(
-            tenant_id=tenant_id, 
-            agent_id=agent_id, 
-            page=page, 
-            page_size=page_size,
-            status=status
-        )
+        return passthrough_response(await client.proxy("GET", "/api-keys", params=params))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{api_key_id}", summary="Get API Key")
 async def get_api_key(api_key_id: str):
     try:
-        return await client.get_api_key(api_key_id)
+        return passthrough_response(await client.proxy("GET", f"/api-keys/{api_key_id}"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{api_key_id}", summary="Update API Key")
 async def update_api_key(api_key_id: str, request: dict):
     try:
-        return await client.update_api_key(api_key_id, request)
+        return passthrough_response(await client.proxy("PUT", f"/api-keys/{api_key_id}", json=request))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{api_key_id}", summary="Delete API Key")
 async def delete_api_key(api_key_id: str):
     try:
-        return await client.delete_api_key(api_key_id)
+        return passthrough_response(await client.proxy("DELETE", f"/api-keys/{api_key_id}"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,18 +1,26 @@
 from datetime import datetime, timedelta
 from typing import Any
+import json
+import logging
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_
 from sqlalchemy.future import select
 
 from src.api import deps
 from src.core import security
+from src.core.provisioning import tenant_provisioner
 from src.core.settings import settings
 from src.schemas import token as token_schema
+from src.schemas import provisioning as provisioning_schema
 from src.schemas import user as user_schema
-from maim_db.maimconfig_models.models import User, Tenant, TenantType, TenantStatus
+from src.models.provisioning import ProvisioningStatus, TenantProvisioning
+from maim_db.maimconfig_models.models import User, Tenant, TenantType
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -30,7 +38,7 @@ async def login_access_token(
     result = await db.execute(stmt)
     user = result.scalars().first()
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not await security.password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect username or password"
@@ -38,13 +46,31 @@ async def login_access_token(
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-        
+
     # 2. Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = None
+    if settings.AUTH_STATELESS:
+        # Embed the owned tenant set so requests skip the User/Tenant queries
+        result = await db.execute(select(Tenant.id).where(Tenant.owner_id == user.id))
+        claims = {"tid": list(result.scalars().all()), "name": user.username, "email": user.email}
+    user_id = user.id
+    access_token = security.create_access_token(user_id, expires_delta=access_token_expires, claims=claims)
+
+    # 3. Transparently upgrade hashes made with an old BCRYPT_ROUNDS. Best
+    # effort: the password is already verified, so a busy hasher (429) or a
+    # failed write only postpones the upgrade to a later login.
+    if security.needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await security.password_hasher.hash(form_data.password)
+            user.updated_at = datetime.utcnow()
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning("Password rehash for user %s skipped: %s", user_id, e)
+
     return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
+        "access_token": access_token,
         "token_type": "bearer",
     }
 
@@ -57,84 +83,103 @@ async def register(
 ) -> Any:
     """
     Create new user without the need to be logged in
+
+    The user's default tenant is created in MaimConfig asynchronously;
+    poll GET /auth/provisioning for its state.
     """
-    # 1. Check if user exists
-    stmt = select(User).where(User.username == user_in.username)
-    result = await db.execute(stmt)
-    if result.scalars().first():
-        raise HTTPException(
-            status_code=400,
-            detail="The user with this username already exists in the system.",
-        )
-        
-    # Check if email exists
+    # 1. Check if username or email exists (single query)
+    conditions = [User.username == user_in.username]
     if user_in.email:
-        stmt = select(User).where(User.email == user_in.email)
-        result = await db.execute(stmt)
-        if result.scalars().first():
+        conditions.append(User.email == user_in.email)
+    result = await db.execute(select(User.username, User.email).where(or_(*conditions)))
+    for username, email in result.all():
+        if username == user_in.username:
             raise HTTPException(
                 status_code=400,
-                detail="The user with this email already exists in the system.",
+                detail="The user with this username already exists in the system.",
             )
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
 
     # 2. Create User
     now = datetime.utcnow()
     user_id = f"user_{uuid.uuid4().hex[:12]}"
+    hashed_password = await security.password_hasher.hash(user_in.password)
     user = User(
         id=user_id,
         username=user_in.username,
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         is_active=user_in.is_active,
         created_at=now,
         updated_at=now
     )
     db.add(user)
     
-    # 3. Create Default Tenant (Sync with MaimConfig)
-    from src.core.maim_config_client import client as maim_config_client
-    
-    tenant_name = f"{user_in.username}'s Personal Tenant"
-    description = "Default personal tenant created on registration"
-    
-    try:
-        # Call MaimConfig to create tenant
-        resp = await maim_config_client.create_tenant({
-            "tenant_name": tenant_name,
+    # 3. Queue the default tenant for MaimConfig (transactional outbox).
+    # Committed together with the User; the provisioner creates the tenant
+    # upstream and mirrors it into the local Tenant table.
+    db.add(TenantProvisioning(
+        id=f"prov_{uuid.uuid4().hex[:16]}",
+        user_id=user_id,
+        status=ProvisioningStatus.PENDING,
+        payload=json.dumps({
+            "tenant_name": f"{user_in.username}'s Personal Tenant",
             "tenant_type": TenantType.PERSONAL.value,
-            "description": description,
+            "description": "Default personal tenant created on registration",
             "contact_email": user_in.email,
             "owner_id": user_id  # Pass owner_id so MaimConfig handles the relationship
-        })
-        
-        if not resp.get("success"):
-            raise HTTPException(status_code=500, detail=f"Failed to create tenant in MaimConfig: {resp.get('message')}")
-            
-        real_tenant_id = resp["data"]["id"]
-        
-        # Sync: Also save Tenant in local DB so we can query it
-        local_tenant = Tenant(
-            id=real_tenant_id,
-            tenant_name=tenant_name,
-            owner_id=user_id,
-            tenant_type=TenantType.PERSONAL.value,
-            status=TenantStatus.ACTIVE.value,
-            created_at=now,
-            updated_at=now
-        )
-        db.add(local_tenant)
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"DEBUG AUTH REGISTER ERROR: {e}")
-        # If remote creation fails, we must rollback user creation?
-        # Since we haven't committed yet, raising exception here will rollback the transaction (if db session context manages it).
-        # But db.add(user) was called. We should catch and re-raise.
-        raise HTTPException(status_code=503, detail=f"MaimConfig service unavailable or error: {str(e)}")
-
-    # Commit both User and Tenant
+        }),
+        next_attempt_at=now,
+        created_at=now,
+        updated_at=now,
+    ))
+
+    # Commit both User and provisioning record
     await db.commit()
     await db.refresh(user)
+    tenant_provisioner.wake()
     
     return user
+
+
+@router.get("/provisioning", response_model=provisioning_schema.Provisioning)
+async def read_provisioning(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    State of the current user's default tenant provisioning
+    (pending / in_progress / succeeded / failed).
+    """
+    result = await db.execute(select(TenantProvisioning).where(TenantProvisioning.user_id == current_user.id))
+    provisioning = result.scalars().first()
+    if not provisioning:
+        raise HTTPException(status_code=404, detail="No provisioning record for this user")
+    return provisioning
+
+
+@router.post("/provisioning/retry", response_model=provisioning_schema.Provisioning)
+async def retry_provisioning(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Re-queue a provisioning that exhausted its retries.
+    """
+    result = await db.execute(select(TenantProvisioning).where(TenantProvisioning.user_id == current_user.id))
+    provisioning = result.scalars().first()
+    if not provisioning:
+        raise HTTPException(status_code=404, detail="No provisioning record for this user")
+    if provisioning.status == ProvisioningStatus.FAILED:
+        now = datetime.utcnow()
+        provisioning.status = ProvisioningStatus.PENDING
+        provisioning.attempts = 0
+        provisioning.next_attempt_at = now
+        provisioning.updated_at = now
+        await db.commit()
+        await db.refresh(provisioning)
+        tenant_provisioner.wake()
+    return provisioning
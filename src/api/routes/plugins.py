@@ -1,12 +1,9 @@
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from src.api import deps
 from src.core.maim_config_client import client as maim_config_client
-from maim_db.maimconfig_models.models import User, Tenant
 
 router = APIRouter()
 
@@ -19,28 +16,16 @@ class PluginSettingIn(BaseModel):
 async def upsert_plugin_setting(
     setting: PluginSettingIn,
     agent_id: str = Query(..., description="Agent ID"),
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    agent_ctx: deps.AgentContext = Depends(deps.get_agent_context),
 ) -> Any:
     """
     Upsert plugin setting via Proxy.
     """
-    try:
-        # 1. Get Agent from MaimConfig to find tenant_id
-        agent_resp = await maim_config_client.get_agent(agent_id)
-        if not agent_resp.get("success"):
-            raise HTTPException(status_code=404, detail="Agent not found")
-        
-        agent_data = agent_resp["data"]
-        tenant_id = agent_data["tenant_id"]
-        
-        # 2. Verify Ownership
-        stmt = select(Tenant).where(Tenant.id == tenant_id, Tenant.owner_id == current_user.id)
-        result = await db.execute(stmt)
-        if not result.scalars().first():
-            raise HTTPException(status_code=403, detail="Permission denied")
+    # 1. Find the agent's tenant_id (local mirror, else MaimConfig) and verify ownership
+    tenant_id = await agent_ctx.get_tenant_id(agent_id)
 
-        # 3. Call MaimConfig
+    try:
+        # 2. Call MaimConfig
         resp = await maim_config_client.upsert_plugin_setting(
             tenant_id=tenant_id,
             agent_id=agent_id,
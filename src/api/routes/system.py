@@ -1,40 +1,60 @@
 from typing import Any, List, Dict
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from src.core.cache import SWRCache
+from src.core.etag import JSONSnapshot, snapshot_response
 from src.core.maim_config_client import client as maim_config_client
+from src.core.settings import settings
 from src.api import deps
 from src.schemas.user import User
 
 router = APIRouter()
 
+# System catalogues change rarely; serve them from a per-worker cache and
+# keep serving the last good copy while MaimConfig is unavailable.
+catalogue_cache = SWRCache(
+    ttl=settings.CATALOGUE_CACHE_TTL,
+    stale_if_error=settings.CATALOGUE_STALE_IF_ERROR,
+)
+
+
+async def _load_catalogue(fetch, name: str) -> JSONSnapshot:
+    try:
+        resp = await fetch()
+    except Exception as e:
+        print(f"ERROR {name}: {e}")
+        raise HTTPException(status_code=503, detail=f"MaimConfig service unavailable: {str(e)}")
+    if not resp.get("success"):
+        raise HTTPException(status_code=500, detail=resp.get("message"))
+    return JSONSnapshot.of(resp["data"])
+
+
+async def load_system_models() -> JSONSnapshot:
+    return await _load_catalogue(maim_config_client.get_system_models, "get_system_models")
+
+
+async def load_bot_defaults() -> JSONSnapshot:
+    return await _load_catalogue(maim_config_client.get_bot_defaults, "get_bot_defaults")
+
+
 @router.get("/models")
 async def get_system_models(
+    request: Request,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
-    Get system defined models (Proxy to MaimConfig)
+    Get system defined models (Proxy to MaimConfig, cached, supports If-None-Match)
     """
-    try:
-        resp = await maim_config_client.get_system_models()
-        if not resp.get("success"):
-            raise HTTPException(status_code=500, detail=resp.get("message"))
-        return resp["data"]
-    except Exception as e:
-        print(f"ERROR get_system_models: {e}")
-        raise HTTPException(status_code=503, detail=f"MaimConfig service unavailable: {str(e)}")
+    snapshot = await catalogue_cache.get("models", load_system_models)
+    return snapshot_response(request, snapshot)
 
 
 @router.get("/bot-defaults")
 async def get_bot_defaults(
+    request: Request,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
-    Get bot default configuration (Proxy to MaimConfig)
+    Get bot default configuration (Proxy to MaimConfig, cached, supports If-None-Match)
     """
-    try:
-        resp = await maim_config_client.get_bot_defaults()
-        if not resp.get("success"):
-            raise HTTPException(status_code=500, detail=resp.get("message"))
-        return resp["data"]
-    except Exception as e:
-        print(f"ERROR get_bot_defaults: {e}")
-        raise HTTPException(status_code=503, detail=f"MaimConfig service unavailable: {str(e)}")
+    snapshot = await catalogue_cache.get("bot-defaults", load_bot_defaults)
+    return snapshot_response(request, snapshot)
@@ -1,13 +1,21 @@
 from typing import Optional
 from fastapi import APIRouter, Query, HTTPException, Depends
 from src.core.maim_config_client import client
+from src.core.claim_revocations import claim_revocations
+from src.core.responses import passthrough_response
 
 router = APIRouter()
 
+# Pure proxies: MaimConfig's response is streamed back untouched (see
+# MaimConfigClient.proxy); upstream errors still become 500s as before.
+
 @router.post("/", summary="Create Tenant")
 async def create_tenant(request: dict):
     try:
-        return await client.create_tenant(request)
+        upstream = await client.proxy("POST", "/tenants", json=request)
+        if request.get("owner_id"):
+            await claim_revocations.revoke_user(request["owner_id"])
+        return passthrough_response(upstream)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -17,27 +25,33 @@ async def list_tenants(
     size: int = Query(20, ge=1)
 ):
     try:
-        return await client.list_tenants(page=page, size=size)
+        return passthrough_response(await client.proxy("GET", "/tenants", params={"page": page, "size": size}))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{tenant_id}", summary="Get Tenant")
 async def get_tenant(tenant_id: str):
     try:
-        return await client.get_tenant(tenant_id)
+        return passthrough_response(await client.proxy("GET", f"/tenants/{tenant_id}"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{tenant_id}", summary="Update Tenant")
 async def update_tenant(tenant_id: str, request: dict):
     try:
-        return await client.update_tenant(tenant_id, request)
+        upstream = await client.proxy("PUT", f"/tenants/{tenant_id}", json=request)
+        if "owner_id" in request:
+            # Ownership moved; the previous owner is unknown here
+            await claim_revocations.revoke_all()
+        return passthrough_response(upstream)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{tenant_id}", summary="Delete Tenant")
 async def delete_tenant(tenant_id: str):
     try:
-        return await client.delete_tenant(tenant_id)
+        upstream = await client.proxy("DELETE", f"/tenants/{tenant_id}")
+        await claim_revocations.revoke_all()
+        return passthrough_response(upstream)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.maim_config_client import MaimConfigError, MaimConfigUnavailable, client as maim_config_client
+from src.core.settings import settings
+from src.models.agent_mirror import AgentMirror
+from src.models.base import db_session, upsert_in_own_session
+from maim_db.maimconfig_models.models import Tenant
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class AgentMirrorService:
+    """
+    Read-through mirror of agent metadata in the shared database.
+
+    `lookup` answers "which tenant is this agent in, and does the user own
+    it" with one indexed query; `record` upserts what MaimConfig returned
+    whenever an agent is fetched, created or updated here, but only writes
+    when the metadata changed or the row wasn't synced for
+    AGENT_MIRROR_TOUCH_INTERVAL. A background loop (one per worker) claims
+    rows not synced for AGENT_MIRROR_REFRESH_INTERVAL, re-fetches them and
+    drops agents MaimConfig no longer has.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        # agent id -> metadata this worker recorded within the touch interval
+        self._recorded = TTLCache(maxsize=10000, ttl=settings.AGENT_MIRROR_TOUCH_INTERVAL)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.skipped_writes = 0
+        self.refreshed = 0
+        self.removed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AGENT_MIRROR_ENABLED
+
+    async def lookup(self, db: AsyncSession, agent_id: str, owner_id: str) -> Optional[Tuple[str, bool]]:
+        """(tenant_id, owned by `owner_id`), or None if the agent isn't mirrored."""
+        if not self.enabled:
+            return None
+        result = await db.execute(
+            select(AgentMirror.tenant_id, Tenant.owner_id)
+            .outerjoin(Tenant, Tenant.id == AgentMirror.tenant_id)
+            .where(AgentMirror.id == agent_id)
+        )
+        row = result.first()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row.tenant_id, row.owner_id == owner_id
+
+    async def record(self, agent: Dict[str, Any]) -> None:
+        """Upsert an agent payload from MaimConfig; failures are logged, never raised."""
+        if not self.enabled:
+            return
+        agent_id = self._agent_id(agent)
+        if not agent_id or not agent.get("tenant_id"):
+            return
+        if self._recorded.get(agent_id) == self._metadata(agent):
+            self.skipped_writes += 1
+            return
+        try:
+            written = await upsert_in_own_session(lambda db: self._write(db, agent_id, agent))
+        except Exception as e:
+            logger.warning("Agent mirror write failed for %s: %s", agent_id, e)
+            return
+        if written:
+            self.writes += 1
+        else:
+            self.skipped_writes += 1
+        self._recorded.set(agent_id, self._metadata(agent))
+
+    async def _write(self, db: AsyncSession, agent_id: str, agent: Dict[str, Any]) -> bool:
+        row = await db.get(AgentMirror, agent_id)
+        if not self._apply(row, db, agent, touch_after=settings.AGENT_MIRROR_TOUCH_INTERVAL):
+            return False
+        await db.commit()
+        return True
+
+    @staticmethod
+    def _agent_id(agent: Dict[str, Any]) -> Optional[str]:
+        return agent.get("agent_id") or agent.get("id")
+
+    @staticmethod
+    def _metadata(agent: Dict[str, Any]) -> Tuple[str, str, str]:
+        return agent.get("tenant_id"), str(agent.get("name") or ""), str(agent.get("status") or "")
+
+    def _apply(self, row: Optional[AgentMirror], db: AsyncSession, agent: Dict[str, Any],
+               touch_after: float = 0) -> bool:
+        """
+        Stage the upsert on `db`; False if nothing needed writing, i.e. the
+        metadata is unchanged and the row was synced within `touch_after` seconds.
+        """
+        agent_id = self._agent_id(agent)
+        if not agent_id or not agent.get("tenant_id"):
+            return False
+        now = datetime.utcnow()
+        tenant_id, name, status = self._metadata(agent)
+        updated_at = _parse_timestamp(agent.get("updated_at")) or now
+        if row is None:
+            db.add(AgentMirror(
+                id=agent_id, tenant_id=tenant_id, name=name, status=status,
+                version=1, updated_at=updated_at, synced_at=now,
+            ))
+            return True
+        if (row.tenant_id, row.name, row.status) != (tenant_id, name, status):
+            row.tenant_id, row.name, row.status = tenant_id, name, status
+            row.version += 1
+            row.updated_at = updated_at
+        elif row.synced_at is not None and (now - row.synced_at).total_seconds() < touch_after:
+            return False
+        row.synced_at = now
+        return True
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Agent mirror refresh failed")
+            await asyncio.sleep(settings.AGENT_MIRROR_POLL_INTERVAL)
+
+    async def _claim(self) -> List[str]:
+        """
+        Take one batch of stale rows for this worker by advancing their
+        synced_at, so other workers' loops move on to the next batch instead
+        of fetching the same agents. SKIP LOCKED (where the database has it)
+        keeps two concurrent claims from picking the same rows.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.AGENT_MIRROR_REFRESH_INTERVAL)
+        async with db_session() as db:
+            result = await db.execute(
+                select(AgentMirror.id)
+                .where(AgentMirror.synced_at < cutoff)
+                .order_by(AgentMirror.synced_at)
+                .limit(settings.AGENT_MIRROR_REFRESH_BATCH)
+                .with_for_update(skip_locked=True)
+            )
+            ids = list(result.scalars().all())
+            if ids:
+                await db.execute(
+                    update(AgentMirror)
+                    .where(AgentMirror.id.in_(ids), AgentMirror.synced_at < cutoff)
+                    .values(synced_at=now)
+                )
+            await db.commit()
+        return ids
+
+    async def run_once(self) -> int:
+        """Re-sync one batch of stale rows; returns how many were fetched."""
+        ids = await self._claim()
+        if not ids:
+            return 0
+
+        semaphore = asyncio.Semaphore(settings.AGENT_MIRROR_REFRESH_CONCURRENCY)
+
+        async def fetch(agent_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await maim_config_client.get_agent(agent_id)
+
+        results = await asyncio.gather(*(fetch(agent_id) for agent_id in ids), return_exceptions=True)
+        gone = []
+        async with db_session() as db:
+            for agent_id, resp in zip(ids, results):
+                if isinstance(resp, Exception):
+                    # A 404 means the agent is gone; anything else is retried
+                    # once the claimed row goes stale again
+                    if isinstance(resp, MaimConfigError) and not isinstance(resp, MaimConfigUnavailable) \
+                            and resp.status_code == 404:
+                        gone.append(agent_id)
+                    continue
+                if not resp.get("success"):
+                    gone.append(agent_id)
+                    continue
+                self._apply(await db.get(AgentMirror, agent_id), db, resp["data"])
+                self.refreshed += 1
+            if gone:
+                await db.execute(delete(AgentMirror).where(AgentMirror.id.in_(gone)))
+                self.removed += len(gone)
+            await db.commit()
+        return len(ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+            "refreshed": self.refreshed,
+            "removed": self.removed,
+        }
+
+
+agent_mirror = AgentMirrorService()
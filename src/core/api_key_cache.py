@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.settings import settings
+from src.models.api_key_cache import ApiKeyListGeneration
+from src.models.base import upsert_in_own_session
+
+logger = logging.getLogger(__name__)
+
+
+class ApiKeyListCache:
+    """
+    Per-worker cache of each agent's API key list.
+
+    Entries are tagged with the agent's generation from the shared
+    database. Writes through this service bump it (`invalidate`), so every
+    worker sees the change on its next read at the cost of one primary-key
+    query instead of a MaimConfig call. The TTL bounds staleness for keys
+    changed elsewhere (MaimConfig directly, the /api_keys proxy).
+
+    Protocol: a reader takes the generation *before* loading and tags the
+    list with it, so a bump that lands during the load leaves the entry
+    tagged with an outdated generation and the next read misses. Rows not
+    bumped for API_KEY_GENERATION_RETENTION are deleted; reading 0 again
+    is safe because every entry tagged 0 has long expired by then.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.enabled = ttl > 0
+
+    async def generation(self, db: AsyncSession, agent_id: str) -> int:
+        result = await db.execute(
+            select(ApiKeyListGeneration.generation).where(ApiKeyListGeneration.agent_id == agent_id)
+        )
+        return result.scalars().first() or 0
+
+    def get(self, agent_id: str, generation: int) -> Optional[List[Dict[str, Any]]]:
+        entry = self._cache.get(agent_id)
+        if entry is None or entry[0] != generation:
+            return None
+        return entry[1]
+
+    def put(self, agent_id: str, generation: int, items: List[Dict[str, Any]]) -> None:
+        self._cache.set(agent_id, (generation, items))
+
+    async def invalidate(self, agent_id: str) -> None:
+        """Drop the local entry and bump the shared generation; failures are logged, never raised."""
+        self._cache.pop(agent_id)
+        try:
+            await upsert_in_own_session(lambda db: self._bump(db, agent_id))
+        except Exception as e:
+            logger.warning("API key list invalidation failed for %s: %s", agent_id, e)
+
+    @staticmethod
+    async def _bump(db: AsyncSession, agent_id: str) -> None:
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(ApiKeyListGeneration)
+            .where(ApiKeyListGeneration.agent_id == agent_id)
+            .values(generation=ApiKeyListGeneration.generation + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.add(ApiKeyListGeneration(agent_id=agent_id, generation=1, updated_at=now))
+        horizon = now - timedelta(seconds=settings.API_KEY_GENERATION_RETENTION)
+        await db.execute(delete(ApiKeyListGeneration).where(ApiKeyListGeneration.updated_at < horizon))
+        await db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+api_key_list_cache = ApiKeyListCache(
+    maxsize=settings.API_KEY_LIST_CACHE_SIZE,
+    ttl=settings.API_KEY_LIST_CACHE_TTL,
+)
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry expiry.
+
+    Only used from the event loop thread, so no locking is done.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class SWRCache:
+    """
+    TTL cache with stale-while-revalidate and stale-if-error.
+
+    - younger than `ttl`: served as is
+    - older than `ttl`: the stale value is served while a single background
+      refresh runs; if refreshes keep failing the stale value is served for
+      up to `stale_if_error` more seconds
+    - missing or older than that: loaded inline, concurrent callers share one load
+    """
+
+    def __init__(self, ttl: float, stale_if_error: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.stale_if_error = stale_if_error
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._loading: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.ttl + self.stale_if_error:
+                self.stale_hits += 1
+                self._load(key, loader)
+                return value
+        self.misses += 1
+        return await asyncio.shield(self._load(key, loader))
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_loader(key, loader))
+            self._loading[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, t))
+        return task
+
+    def _loaded(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        self._loading.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # background refreshes have no awaiter to retrieve it
+
+    async def _run_loader(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except Exception:
+            self.refresh_failures += 1
+            if key in self._entries:
+                logger.warning("Refreshing cache entry %r failed", key, exc_info=True)
+            raise
+        self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._loading),
+        }
+
+
+class StaleIfErrorCache:
+    """
+    Last known good value per key, for reads that must keep working while
+    the upstream is degraded. Every call still goes upstream:
+
+    - no stored value: the live call's result or error is returned as is
+    - live call fails with an error `serve_stale_on` accepts, or takes
+      longer than `budget` seconds: the stored value is returned right away,
+      with its age; a slow call keeps running and refreshes the entry
+    - other errors (e.g. 404/403) drop the stored value and propagate
+
+    Values older than `max_age` are never served. Concurrent calls for one
+    key share a single live call.
+    """
+
+    def __init__(self, max_age: float, budget: float, maxsize: int = 1024,
+                 serve_stale_on: Callable[[BaseException], bool] = lambda e: True):
+        self.max_age = max_age
+        self.budget = budget
+        self.maxsize = maxsize
+        self.serve_stale_on = serve_stale_on
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._loading: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.live = 0
+        self.stale_errors = 0
+        self.stale_timeouts = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[float]]:
+        """(value, age in seconds if it is a stale copy, else None)."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] > self.max_age:
+            del self._entries[key]
+            entry = None
+        task = self._load(key, loader)
+        if entry is None or self.max_age <= 0:
+            value = await asyncio.shield(task)
+            self.live += 1
+            return value, None
+        try:
+            value = await asyncio.wait_for(asyncio.shield(task), self.budget)
+            self.live += 1
+            return value, None
+        except asyncio.TimeoutError:
+            self.stale_timeouts += 1
+        except Exception as e:
+            if not self.serve_stale_on(e):
+                self._entries.pop(key, None)
+                raise
+            self.stale_errors += 1
+        value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget the stored value; a live call already running won't store its result."""
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._loading[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, t))
+        return task
+
+    def _loaded(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._loading.get(key) is not task:
+            if not task.cancelled():
+                task.exception()
+            return  # invalidated while running
+        del self._loading[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.max_age > 0:
+            self._entries[key] = (task.result(), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "live": self.live,
+            "stale_errors": self.stale_errors,
+            "stale_timeouts": self.stale_timeouts,
+            "refreshing": len(self._loading),
+        }
@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.principal_cache import PrincipalCache, principal_cache
+from src.core.settings import settings
+from src.models.base import upsert_in_own_session
+from src.models.claim_revocation import ClaimRevocation
+
+logger = logging.getLogger(__name__)
+
+ALL_USERS = "*"
+
+
+class ClaimRevocations:
+    """
+    Cross-worker revocation of the tenant claims carried by tokens.
+
+    `principal_cache.invalidate_user` only reaches the worker that made the
+    change, so revocations are also recorded in the shared database; a
+    claim is trusted only if its token was issued after the user's (and
+    the global) revocation. Trusted principals are cached per worker, so
+    the lookup costs one primary-key query per token per PRINCIPAL_CACHE_TTL.
+    """
+
+    def __init__(self, principals: PrincipalCache):
+        self.principals = principals
+
+    async def trusted(self, db: AsyncSession, user_id: str, issued_at: Optional[float]) -> bool:
+        if not self.principals.claims_trusted(user_id, issued_at):
+            return False
+        result = await db.execute(
+            select(func.max(ClaimRevocation.revoked_at))
+            .where(ClaimRevocation.user_id.in_([user_id, ALL_USERS]))
+        )
+        revoked_at = result.scalar()
+        # Strict, as in PrincipalCache.claims_trusted
+        return revoked_at is None or issued_at > revoked_at.replace(tzinfo=timezone.utc).timestamp()
+
+    async def revoke_user(self, user_id: str) -> None:
+        """The user's tenant set changed: drop cached principals and revoke their claims."""
+        self.principals.invalidate_user(user_id)
+        await self._record(user_id)
+
+    async def revoke_all(self) -> None:
+        """Tenants changed for users unknown here: drop every principal and claim."""
+        self.principals.clear()
+        await self._record(ALL_USERS)
+
+    async def _record(self, user_id: str) -> None:
+        """Failures are logged, never raised; the claim max age still bounds staleness."""
+        if not settings.AUTH_STATELESS:
+            return
+        try:
+            await upsert_in_own_session(lambda db: self._upsert(db, user_id))
+        except Exception as e:
+            logger.warning("Recording claim revocation for %s failed: %s", user_id, e)
+
+    @staticmethod
+    async def _upsert(db: AsyncSession, user_id: str) -> None:
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(ClaimRevocation).where(ClaimRevocation.user_id == user_id).values(revoked_at=now)
+        )
+        if result.rowcount == 0:
+            db.add(ClaimRevocation(user_id=user_id, revoked_at=now))
+        # Same horizon as PrincipalCache.invalidate_user prunes at
+        horizon = now - timedelta(seconds=settings.AUTH_TENANT_CLAIM_MAX_AGE)
+        await db.execute(delete(ClaimRevocation).where(ClaimRevocation.revoked_at < horizon))
+        await db.commit()
+
+
+claim_revocations = ClaimRevocations(principal_cache)
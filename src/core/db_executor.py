@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from src.core.settings import settings
+
+
+class _JobState:
+    """Whoever sets `claimed` first (worker thread or caller) owns the queue slot."""
+    __slots__ = ("claimed",)
+
+    def __init__(self):
+        self.claimed = False
+
+
+class BlockingDBExecutor:
+    """
+    Runs synchronous (peewee) queries on a dedicated, bounded thread pool so
+    they never block the event loop.
+
+    Each job gets its own connection for the duration of the call and, where
+    the backend supports it, a server-side statement timeout matching
+    `timeout`. Callers waiting longer than `timeout` get a 504; when more than
+    `max_queue` jobs are waiting new ones are rejected with a 503.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, timeout: float, name: str = "db"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-executor")
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, database: Any = None, timeout: Optional[float] = None) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Database busy, try again later")
+            self.queued += 1
+
+        submitted = time.perf_counter()
+        job = _JobState()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor(), self._job, job, fn, args, database, timeout, submitted)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise HTTPException(status_code=504, detail="Database query timed out")
+        finally:
+            with self._lock:
+                # Timed out or cancelled (caller or shutdown) before a worker
+                # picked it up: leave the queue here, and don't let it run later
+                if not job.claimed:
+                    job.claimed = True
+                    self.queued -= 1
+
+    def _job(self, job: "_JobState", fn: Callable[..., Any], args: tuple, database: Any, timeout: float,
+             submitted: float) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            if job.claimed:
+                return None  # abandoned while queued; nobody is waiting for it
+            job.claimed = True
+            self.queued -= 1
+            self.active += 1
+            wait = started - submitted
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+        ok = False
+        try:
+            if database is None:
+                result = fn(*args)
+            else:
+                with database.connection_context():
+                    _apply_statement_timeout(database, timeout)
+                    result = fn(*args)
+            ok = True
+            return result
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.active -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.duration_total += duration
+                self.duration_max = max(self.duration_max, duration)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            submitted = finished + self.active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "query_duration_avg_ms": (self.duration_total / finished * 1000) if finished else 0.0,
+                "query_duration_max_ms": self.duration_max * 1000,
+                "queue_wait_avg_ms": (self.queue_wait_total / submitted * 1000) if submitted else 0.0,
+                "queue_wait_max_ms": self.queue_wait_max * 1000,
+            }
+
+
+def _apply_statement_timeout(database: Any, timeout: float) -> None:
+    # Stop the query server-side too; otherwise a timed-out job keeps its
+    # worker thread busy until the database finishes.
+    ms = int(timeout * 1000)
+    backend = type(database).__name__.lower()
+    if "postgres" in backend:
+        database.execute_sql(f"SET statement_timeout = {ms}")
+    elif "mysql" in backend:
+        database.execute_sql(f"SET SESSION max_execution_time = {ms}")
+
+
+admin_db_executor = BlockingDBExecutor(
+    max_workers=settings.ADMIN_DB_WORKERS,
+    max_queue=settings.ADMIN_DB_MAX_QUEUE,
+    timeout=settings.ADMIN_DB_QUERY_TIMEOUT,
+    name="admin-db",
+)
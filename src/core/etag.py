@@ -0,0 +1,50 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from src.core.responses import dumps
+
+
+@dataclass(frozen=True)
+class JSONSnapshot:
+    """A JSON payload encoded once, together with its strong ETag."""
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, data: Any) -> "JSONSnapshot":
+        body = dumps(data, sort_keys=True)
+        return cls(body=body, etag=make_etag(body))
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 If-None-Match comparison (weak, as required for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def snapshot_response(request: Request, snapshot: JSONSnapshot, max_age: int = 0) -> Response:
+    """Serve a snapshot, answering 304 with no body if the client already has it."""
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"private, max-age={max_age}, must-revalidate",
+    }
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
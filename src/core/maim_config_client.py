@@ -1,31 +1,464 @@
+import asyncio
+import re
+import time
 import httpx
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+from src.core import metrics
+from src.core.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, RetryBudget, backoff_delay
 from src.core.settings import settings
 
+# Gateway-style statuses worth retrying for idempotent requests
+RETRYABLE_STATUSES = {502, 503, 504}
+
+_ID_SEGMENT = re.compile(r"\d")
+
+
+class MaimConfigError(Exception):
+    """MaimConfig answered with an error status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MaimConfigUnavailable(MaimConfigError):
+    """MaimConfig could not be reached: connection error, timeout or open circuit."""
+
+
+def endpoint_template(method: str, endpoint: str) -> str:
+    """"GET /agents/a_1f3c" -> "GET /agents/{id}", so breakers/metrics are per route."""
+    parts = ["{id}" if _ID_SEGMENT.search(part) else part for part in endpoint.strip("/").split("/")]
+    return f"{method.upper()} /" + "/".join(parts)
+
+
+def _cap_timeout(timeout: httpx.Timeout, remaining: float) -> httpx.Timeout:
+    """`timeout` with every phase limited to the `remaining` seconds of the call's deadline."""
+    remaining = max(remaining, 0.001)
+
+    def cap(value: Optional[float]) -> float:
+        return remaining if value is None else min(value, remaining)
+
+    return httpx.Timeout(
+        connect=cap(timeout.connect), read=cap(timeout.read), write=cap(timeout.write), pool=cap(timeout.pool)
+    )
+
+
+class PoolStats:
+    """Occupancy / wait-time counters for the shared connection pool."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        self.pool_waits = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.pool_waits += 1
+        self.pool_wait_total += seconds
+        if seconds > self.pool_wait_max:
+            self.pool_wait_max = seconds
+
+
+class CoalesceStats:
+    """How many callers were collapsed into each upstream call."""
+
+    # Upper bounds of the "followers per upstream call" histogram
+    BUCKETS = (0, 1, 2, 5, 10, 50, 100, float("inf"))
+
+    def __init__(self):
+        self.flights = 0
+        self.collapsed = 0
+        self.max_collapsed = 0
+        self.histogram = [0] * len(self.BUCKETS)
+
+    def record_flight(self, followers: int) -> None:
+        self.flights += 1
+        self.collapsed += followers
+        if followers > self.max_collapsed:
+            self.max_collapsed = followers
+        for i, bound in enumerate(self.BUCKETS):
+            if followers <= bound:
+                self.histogram[i] += 1
+                break
+
+
+class _Flight:
+    __slots__ = ("task", "followers")
+
+    def __init__(self, task: "asyncio.Task[httpx.Response]"):
+        self.task = task
+        self.followers = 0
+
+
 class MaimConfigClient:
     def __init__(self, base_url: str = settings.MAIMCONFIG_API_URL):
         self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self.stats = PoolStats()
+        self.coalesce_stats = CoalesceStats()
+        self._inflight: Dict[Tuple, _Flight] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.retry_budget = RetryBudget(
+            ratio=settings.MAIMCONFIG_RETRY_BUDGET_RATIO,
+            min_per_second=settings.MAIMCONFIG_RETRY_BUDGET_MIN_PER_SECOND,
+            max_tokens=settings.MAIMCONFIG_RETRY_BUDGET_MAX_TOKENS,
+        )
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def start(self) -> None:
+        """Create the shared client. Called once per worker from the app lifespan."""
+        self._ensure_client()
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        if self._client is not None:
+            return self._client
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.MAIMCONFIG_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MAIMCONFIG_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.MAIMCONFIG_KEEPALIVE_EXPIRY,
+            ),
+            http2=settings.MAIMCONFIG_HTTP2,
+        )
+        self._client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=self._timeout_for(""),
+        )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._transport = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Lazily created so scripts that never run the lifespan still work
+        return self._ensure_client()
+
+    def _timeout_for(self, endpoint: str) -> httpx.Timeout:
+        # Longest matching prefix wins, so "/agents/x/keys" can override "/agents"
+        read = settings.MAIMCONFIG_TIMEOUT
+        best = -1
+        for prefix, value in settings.MAIMCONFIG_ENDPOINT_TIMEOUTS.items():
+            if endpoint.startswith(prefix) and len(prefix) > best:
+                read, best = value, len(prefix)
+        return httpx.Timeout(
+            read,
+            connect=settings.MAIMCONFIG_CONNECT_TIMEOUT,
+            pool=settings.MAIMCONFIG_POOL_TIMEOUT,
+        )
 
-    async def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+    def pool_stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy, used to size MAIMCONFIG_MAX_CONNECTIONS."""
+        connections = []
+        pool = getattr(self._transport, "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+        stats = self.stats
+        return {
+            "started": self._client is not None,
+            "http2": settings.MAIMCONFIG_HTTP2,
+            "max_connections": settings.MAIMCONFIG_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.MAIMCONFIG_MAX_KEEPALIVE_CONNECTIONS,
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "in_flight": stats.in_flight,
+            "requests_total": stats.requests,
+            "pool_wait_avg_ms": (stats.pool_wait_total / stats.pool_waits * 1000) if stats.pool_waits else 0.0,
+            "pool_wait_max_ms": stats.pool_wait_max * 1000,
+        }
+
+    async def _send(self, method: str, url: str, endpoint: str, attempt: str = "first", **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        assigned = False
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            # httpcore emits its first trace event once a connection has been
+            # assigned from the pool, so the gap since `started` is the pool wait.
+            nonlocal assigned
+            if not assigned:
+                assigned = True
+                self.stats.record_wait(time.perf_counter() - started)
+
+        stream = kwargs.pop("stream", False)
+        kwargs.setdefault("timeout", self._timeout_for(endpoint))
+        key = endpoint_template(method, endpoint)
+        self.stats.in_flight += 1
+        self.stats.requests += 1
+        try:
+            if stream:
+                # Body left unread; the caller owns (and must close) the response
+                request = self.http.build_request(method, url, extensions={"trace": trace}, **kwargs)
+                response = await self.http.send(request, stream=True)
+            else:
+                response = await self.http.request(method, url, extensions={"trace": trace}, **kwargs)
+        except httpx.TransportError as e:
+            metrics.UPSTREAM_ERRORS.labels(key, type(e).__name__).inc()
+            raise
+        finally:
+            self.stats.in_flight -= 1
+            metrics.UPSTREAM_DURATION.labels(key, attempt).observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            metrics.UPSTREAM_ERRORS.labels(key, f"http_{response.status_code // 100}xx").inc()
+        return response
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        stats = self.coalesce_stats
+        return {
+            "methods": [m.upper() for m in settings.MAIMCONFIG_COALESCE_METHODS],
+            "upstream_calls": stats.flights,
+            "collapsed_callers": stats.collapsed,
+            "max_collapsed_per_call": stats.max_collapsed,
+            "collapsed_per_call_histogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(stats.BUCKETS, stats.histogram)
+            },
+            "in_flight_keys": len(self._inflight),
+        }
+
+    def _should_coalesce(self, method: str, kwargs: Dict[str, Any]) -> bool:
+        if method.upper() not in {m.upper() for m in settings.MAIMCONFIG_COALESCE_METHODS}:
+            return False
+        # Only bodiless, header-less calls are safe to treat as identical
+        return not any(kwargs.get(k) is not None for k in ("json", "content", "data", "files", "headers"))
+
+    async def _coalesced_send(self, method: str, url: str, endpoint: str, **kwargs) -> httpx.Response:
+        """
+        Single-flight: identical concurrent requests share one upstream call.
+
+        The shared object is the raw response, so every caller decodes its own
+        copy of the body and can mutate the result freely.
+        """
+        params = kwargs.get("params") or {}
+        key = (method.upper(), url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        flight = self._inflight.get(key)
+        if flight is not None:
+            flight.followers += 1
+        else:
+            # Run the upstream call in its own task so a cancelled leader
+            # (client disconnect) doesn't fail the followers.
+            task = asyncio.ensure_future(self._send_resilient(method, url, endpoint, **kwargs))
+            flight = _Flight(task)
+            self._inflight[key] = flight
+
+            def _done(t: "asyncio.Task[httpx.Response]", key=key, flight=flight) -> None:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                self.coalesce_stats.record_flight(flight.followers)
+                if not t.cancelled():
+                    t.exception()  # mark retrieved even if every waiter went away
+
+            task.add_done_callback(_done)
+        return await asyncio.shield(flight.task)
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        return {
+            "breakers": {key: breaker.stats() for key, breaker in self._breakers.items()},
+            "retry_budget": self.retry_budget.stats(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_ms": {
+                key: tracker.p95 * 1000 for key, tracker in self._latencies.items() if tracker.p95 is not None
+            },
+        }
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            gauge = metrics.UPSTREAM_BREAKER_STATE.labels(key)
+            breaker = self._breakers[key] = CircuitBreaker(
+                failure_threshold=settings.MAIMCONFIG_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.MAIMCONFIG_BREAKER_RESET_TIMEOUT,
+                on_state_change=lambda state: gauge.set(metrics.BREAKER_STATE_VALUES[state]),
+            )
+            gauge.set(metrics.BREAKER_STATE_VALUES[breaker.state])
+        return breaker
+
+    def _latency(self, key: str) -> LatencyTracker:
+        tracker = self._latencies.get(key)
+        if tracker is None:
+            tracker = self._latencies[key] = LatencyTracker()
+        return tracker
+
+    async def _timed_send(
+        self, key: str, method: str, url: str, endpoint: str, attempt: str = "first", **kwargs
+    ) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self._send(method, url, endpoint, attempt, **kwargs)
+        if response.status_code < 500:
+            self._latency(key).record(time.perf_counter() - started)
+        return response
+
+    async def _hedged_send(
+        self, key: str, method: str, url: str, endpoint: str, attempt: str = "first", **kwargs
+    ) -> httpx.Response:
+        """
+        Send a second copy of the request if the first is slower than the
+        endpoint's recent p95; whichever answers successfully first wins.
+        """
+        p95 = self._latency(key).p95
+        if p95 is None:
+            return await self._timed_send(key, method, url, endpoint, attempt, **kwargs)
+
+        first = asyncio.ensure_future(self._timed_send(key, method, url, endpoint, attempt, **kwargs))
+        done, _ = await asyncio.wait({first}, timeout=max(p95, settings.MAIMCONFIG_HEDGE_MIN_DELAY))
+        if done or not self.retry_budget.try_spend():
+            return await first
+
+        self.hedges += 1
+        second = asyncio.ensure_future(self._timed_send(key, method, url, endpoint, "hedge", **kwargs))
+        tasks = (first, second)
+        for task in tasks:
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed: prefer an error response over a transport error
+            for task in tasks:
+                if task.exception() is None:
+                    return task.result()
+            raise first.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _send_resilient(self, method: str, url: str, endpoint: str, **kwargs) -> httpx.Response:
+        """
+        _send behind a per-endpoint circuit breaker. Idempotent methods are
+        retried with jittered backoff under the global retry budget and,
+        optionally, hedged.
+        """
+        key = endpoint_template(method, endpoint)
+        breaker = self._breaker(key)
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            metrics.UPSTREAM_ERRORS.labels(key, "circuit_open").inc()
+            raise
+        retryable = method.upper() in {m.upper() for m in settings.MAIMCONFIG_RETRY_METHODS}
+        stream = kwargs.get("stream", False)
+        # A streamed loser can't be cancelled cleanly mid-body, so no hedging
+        hedged = retryable and settings.MAIMCONFIG_HEDGE_ENABLED and not stream
+        self.retry_budget.deposit()
+
+        response: Optional[httpx.Response] = None
+        error: Optional[Exception] = None
+        deadline = time.monotonic() + settings.MAIMCONFIG_RETRY_DEADLINE
+        timeout = httpx.Timeout(kwargs.pop("timeout", None) or self._timeout_for(endpoint))
+        settled = False
+        try:
+            attempts = settings.MAIMCONFIG_RETRY_MAX_ATTEMPTS if retryable else 1
+            for attempt in range(attempts):
+                if attempt:
+                    delay = backoff_delay(
+                        attempt - 1, settings.MAIMCONFIG_RETRY_BACKOFF_BASE, settings.MAIMCONFIG_RETRY_BACKOFF_MAX
+                    )
+                    # Not worth retrying if the backoff alone eats what's left
+                    if deadline - time.monotonic() <= delay or not self.retry_budget.try_spend():
+                        break
+                    self.retries += 1
+                    if stream and response is not None:
+                        await response.aclose()
+                    await asyncio.sleep(delay)
+                kwargs["timeout"] = _cap_timeout(timeout, deadline - time.monotonic())
+                kind = "retry" if attempt else "first"
+                try:
+                    if hedged:
+                        response = await self._hedged_send(key, method, url, endpoint, kind, **kwargs)
+                    else:
+                        response = await self._timed_send(key, method, url, endpoint, kind, **kwargs)
+                    error = None
+                except httpx.TransportError as e:
+                    response, error = None, e
+                    continue
+                if response.status_code not in RETRYABLE_STATUSES:
+                    break
+
+            settled = True
+            if response is not None and response.status_code < 500:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if response is not None:
+                return response
+            raise error
+        finally:
+            # Cancelled, or an unexpected error: no verdict on the upstream,
+            # but a half-open probe must not stay claimed forever
+            if not settled:
+                breaker.cancel_probe()
+
+    async def _request(self, method: str, endpoint: str, base_url: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        url = f"{base_url or self.base_url}{endpoint}"
+        try:
+            if self._should_coalesce(method, kwargs):
+                response = await self._coalesced_send(method, url, endpoint, **kwargs)
+            else:
+                response = await self._send_resilient(method, url, endpoint, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise self._status_error(e)
+        except CircuitOpenError as e:
+            raise MaimConfigUnavailable(f"MaimConfig Circuit Open: {endpoint_template(method, endpoint)} ({e})")
+        except Exception as e:
+            raise MaimConfigUnavailable(f"MaimConfig Connection Error: {str(e)}")
+
+    @staticmethod
+    def _status_error(e: httpx.HTTPStatusError) -> MaimConfigError:
+        # Try to get error details from response
+        try:
+            message = e.response.json().get("message", str(e))
+        except Exception:
+            message = str(e)
+        return MaimConfigError(f"MaimConfig Error: {message}", status_code=e.response.status_code)
+
+    async def proxy(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """
+        Send a request for raw passthrough: the successful response comes back
+        with its body unread, to be streamed to the client as-is (see
+        responses.passthrough_response, which also closes it). Error statuses
+        raise MaimConfigError exactly like _request does.
+        """
         url = f"{self.base_url}{endpoint}"
-        async with httpx.AsyncClient() as client:
+        headers = {**(kwargs.pop("headers", None) or {}), "Accept-Encoding": "identity"}
+        try:
+            response = await self._send_resilient(method, url, endpoint, headers=headers, stream=True, **kwargs)
+        except CircuitOpenError as e:
+            raise MaimConfigUnavailable(f"MaimConfig Circuit Open: {endpoint_template(method, endpoint)} ({e})")
+        except Exception as e:
+            raise MaimConfigUnavailable(f"MaimConfig Connection Error: {str(e)}")
+        if response.is_error:
             try:
-                response = await client.request(method, url, **kwargs)
+                await response.aread()
                 response.raise_for_status()
-                return response.json()
             except httpx.HTTPStatusError as e:
-                # Try to get error details from response
-                try:
-                    error_data = e.response.json()
-                    raise Exception(f"MaimConfig Error: {error_data.get('message', str(e))}")
-                except Exception:
-                    raise Exception(f"MaimConfig Error: {str(e)}")
-            except Exception as e:
-                raise Exception(f"MaimConfig Connection Error: {str(e)}")
-
-    async def create_tenant(self, tenant_data: Dict[str, Any]) -> Dict[str, Any]:
+                raise self._status_error(e)
+            except httpx.TransportError as e:
+                raise MaimConfigUnavailable(f"MaimConfig Connection Error: {str(e)}")
+            finally:
+                await response.aclose()
+        return response
+
+    async def create_tenant(self, tenant_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """Create a tenant in MaimConfig"""
-        return await self._request("POST", "/tenants", json=tenant_data)
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return await self._request("POST", "/tenants", json=tenant_data, headers=headers)
 
     async def list_tenants(self, page: int = 1, size: int = 20) -> Dict[str, Any]:
         """List tenants"""
@@ -47,9 +480,14 @@ class MaimConfigClient:
         """Create an agent in MaimConfig"""
         return await self._request("POST", "/agents", json=agent_data)
 
-    async def get_agents(self, tenant_id: str) -> Dict[str, Any]:
+    async def get_agents(self, tenant_id: str, page: Optional[int] = None, page_size: Optional[int] = None) -> Dict[str, Any]:
         """List agents for a tenant"""
-        return await self._request("GET", "/agents", params={"tenant_id": tenant_id})
+        params = {"tenant_id": tenant_id}
+        if page is not None:
+            params["page"] = page
+        if page_size is not None:
+            params["page_size"] = page_size
+        return await self._request("GET", "/agents", params=params)
 
     async def get_agent(self, agent_id: str) -> Dict[str, Any]:
         """Get agent details"""
@@ -89,24 +527,13 @@ class MaimConfigClient:
         # POST /api/v1/plugins/settings
         # Hack to switch version since base_url defaults to v2
         base_v1 = self.base_url.replace("/v2", "/v1")
-        url = f"{base_v1}/plugins/settings"
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, params={"tenant_id": tenant_id, "agent_id": agent_id}, json=setting_data)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                try:
-                    error_data = e.response.json()
-                    raise Exception(f"MaimConfig Error: {error_data.get('message', str(e))}")
-                except Exception:
-                    raise Exception(f"MaimConfig Error: {str(e)}")
-            except Exception as e:
-                raise Exception(f"MaimConfig Connection Error: {str(e)}")
-
-            except Exception as e:
-                raise Exception(f"MaimConfig Connection Error: {str(e)}")
+        return await self._request(
+            "POST",
+            "/plugins/settings",
+            base_url=base_v1,
+            params={"tenant_id": tenant_id, "agent_id": agent_id},
+            json=setting_data,
+        )
 
     async def get_bot_defaults(self) -> Dict[str, Any]:
         """Get bot default configuration"""
@@ -0,0 +1,234 @@
+"""
+Time-bucketed aggregation over SystemMetrics.
+
+Completed buckets are summarised once into `web_metric_rollups` and served
+from there; only the still-open tail of a query range is computed from raw
+rows. All functions here are blocking and meant to run on the admin DB
+executor.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from peewee import IntegrityError
+from maim_db.core.models.business import SystemMetrics
+
+from src.core.settings import settings
+from src.models.metric_rollup import MetricRollup, MetricRollupWatermark
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+_EPOCH = datetime(1970, 1, 1)
+_tables_ready = False
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; convert aware values to match."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def floor_time(dt: datetime, seconds: int) -> datetime:
+    offset = int((naive_utc(dt) - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def summarize(timestamps: np.ndarray, values: np.ndarray, groups: List[str], seconds: int) -> List[Dict[str, Any]]:
+    """
+    count/min/max/avg/percentiles per (group, bucket), fully vectorised.
+
+    Rows are sorted by (group, bucket, value) once; every statistic is then
+    read off segment boundaries, with percentiles linearly interpolated the
+    same way as numpy.percentile's default.
+    """
+    if len(values) == 0:
+        return []
+    buckets = np.floor_divide(timestamps, seconds).astype(np.int64)
+    group_names, group_codes = np.unique(np.asarray(groups, dtype=object), return_inverse=True)
+
+    order = np.lexsort((values, buckets, group_codes))
+    v, b, g = values[order], buckets[order], group_codes[order]
+
+    boundaries = np.flatnonzero((np.diff(b) != 0) | (np.diff(g) != 0)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(v)]))
+    counts = ends - starts
+    avgs = np.add.reduceat(v, starts) / counts
+
+    stats = {}
+    for name, q in PERCENTILES.items():
+        pos = starts + q * (counts - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        stats[name] = v[lo] + (v[hi] - v[lo]) * (pos - lo)
+
+    return [
+        {
+            "bucket_start": _EPOCH + timedelta(seconds=int(b[s]) * seconds),
+            "group": group_names[g[s]],
+            "count": int(counts[i]),
+            "min": float(v[s]),
+            "max": float(v[ends[i] - 1]),
+            "avg": float(avgs[i]),
+            **{name: float(values_[i]) for name, values_ in stats.items()},
+        }
+        for i, s in enumerate(starts)
+    ]
+
+
+def _group_of(group_key: str, agent_id: Optional[str], tags: Optional[str]) -> str:
+    if group_key == "agent_id":
+        return agent_id or ""
+    if group_key.startswith("tag:"):
+        try:
+            value = json.loads(tags).get(group_key[4:]) if tags else None
+        except (ValueError, AttributeError):
+            value = None
+        return "" if value is None else str(value)
+    return ""
+
+
+def _summarize_raw(metric_name: str, resolution: str, group_key: str,
+                   start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    query = (
+        SystemMetrics
+        .select(SystemMetrics.created_at, SystemMetrics.metric_value, SystemMetrics.agent_id, SystemMetrics.tags)
+        .where(
+            (SystemMetrics.metric_name == metric_name)
+            & (SystemMetrics.created_at >= start)
+            & (SystemMetrics.created_at < end)
+        )
+        .tuples()
+    )
+    timestamps, values, groups = [], [], []
+    for created_at, value, agent_id, tags in query.iterator():
+        if value is None:
+            continue
+        timestamps.append((created_at - _EPOCH).total_seconds())
+        values.append(value)
+        groups.append(_group_of(group_key, agent_id, tags))
+    return summarize(
+        np.asarray(timestamps, dtype=np.float64),
+        np.asarray(values, dtype=np.float64),
+        groups,
+        RESOLUTIONS[resolution],
+    )
+
+
+def _roll_up(metric_name: str, resolution: str, group_key: str, start: datetime, end: datetime) -> None:
+    rows = [
+        {
+            "metric_name": metric_name,
+            "resolution": resolution,
+            "group_key": group_key,
+            "group_value": bucket.pop("group"),
+            **bucket,
+        }
+        for bucket in _summarize_raw(metric_name, resolution, group_key, start, end)
+    ]
+    for i in range(0, len(rows), 500):
+        # Another worker may have rolled up the same buckets concurrently
+        MetricRollup.insert_many(rows[i:i + 500]).on_conflict_ignore().execute()
+
+
+def _watermark(metric_name: str, resolution: str, group_key: str) -> Optional[MetricRollupWatermark]:
+    return MetricRollupWatermark.get_or_none(
+        (MetricRollupWatermark.metric_name == metric_name)
+        & (MetricRollupWatermark.resolution == resolution)
+        & (MetricRollupWatermark.group_key == group_key)
+    )
+
+
+def _ensure_rolled_up(metric_name: str, resolution: str, group_key: str, start: datetime, end: datetime) -> None:
+    """
+    Extend the contiguous rolled-up range so it covers [start, end).
+
+    The gap is rolled up ADMIN_ROLLUP_CHUNK_BUCKETS buckets at a time, each
+    chunk in its own transaction together with the watermark, so a long gap
+    never sits in one transaction or in memory at once, and an interrupted
+    catch-up resumes where it stopped.
+    """
+    database = MetricRollup._meta.database
+    step = timedelta(seconds=RESOLUTIONS[resolution] * max(1, settings.ADMIN_ROLLUP_CHUNK_BUCKETS))
+
+    with database.atomic():
+        if _watermark(metric_name, resolution, group_key) is None:
+            seed_end = min(end, start + step)
+            _roll_up(metric_name, resolution, group_key, start, seed_end)
+            try:
+                # Savepoint: a failed insert mustn't abort the outer transaction (Postgres)
+                with database.atomic():
+                    MetricRollupWatermark.create(
+                        metric_name=metric_name, resolution=resolution, group_key=group_key,
+                        rolled_from=start, rolled_until=seed_end,
+                    )
+            except IntegrityError:
+                pass  # another worker seeded it; extended from there below
+
+    # The watermark is re-read per chunk, as other workers may move it too
+    while True:
+        with database.atomic():
+            mark = _watermark(metric_name, resolution, group_key)
+            if start < mark.rolled_from:
+                chunk_start = max(start, mark.rolled_from - step)
+                _roll_up(metric_name, resolution, group_key, chunk_start, mark.rolled_from)
+                mark.rolled_from = chunk_start
+            elif end > mark.rolled_until:
+                chunk_end = min(end, mark.rolled_until + step)
+                _roll_up(metric_name, resolution, group_key, mark.rolled_until, chunk_end)
+                mark.rolled_until = chunk_end
+            else:
+                return
+            mark.updated_at = datetime.utcnow()
+            mark.save()
+
+
+def aggregate(metric_name: str, resolution: str, group_key: str,
+              start: datetime, end: datetime, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    global _tables_ready
+    if not _tables_ready:
+        MetricRollup._meta.database.create_tables([MetricRollup, MetricRollupWatermark], safe=True)
+        _tables_ready = True
+
+    seconds = RESOLUTIONS[resolution]
+    now = naive_utc(now or datetime.utcnow())
+    start, end = floor_time(start, seconds), naive_utc(end)
+    # Buckets that can no longer receive (late) writes
+    complete_until = floor_time(now - timedelta(seconds=settings.ADMIN_ROLLUP_GRACE_SECONDS), seconds)
+    rolled_until = max(start, min(floor_time(end, seconds), complete_until))
+
+    buckets: List[Dict[str, Any]] = []
+    if start < rolled_until:
+        _ensure_rolled_up(metric_name, resolution, group_key, start, rolled_until)
+        query = (
+            MetricRollup.select()
+            .where(
+                (MetricRollup.metric_name == metric_name)
+                & (MetricRollup.resolution == resolution)
+                & (MetricRollup.group_key == group_key)
+                & (MetricRollup.bucket_start >= start)
+                & (MetricRollup.bucket_start < rolled_until)
+            )
+            .order_by(MetricRollup.bucket_start, MetricRollup.group_value)
+        )
+        for row in query:
+            buckets.append({
+                "bucket_start": row.bucket_start,
+                "group": row.group_value,
+                "count": row.count,
+                "min": row.min,
+                "max": row.max,
+                "avg": row.avg,
+                **{name: getattr(row, name) for name in PERCENTILES},
+            })
+    if rolled_until < end:
+        buckets.extend(_summarize_raw(metric_name, resolution, group_key, rolled_until, end))
+
+    buckets.sort(key=lambda bucket: (bucket["bucket_start"], bucket["group"]))
+    for bucket in buckets:
+        bucket["bucket_start"] = bucket["bucket_start"].isoformat()
+        bucket["group"] = (bucket["group"] or None) if group_key else None
+    return buckets
@@ -0,0 +1,190 @@
+"""
+Prometheus metrics.
+
+With several uvicorn workers each process has its own registry, so set
+PROMETHEUS_MULTIPROC_DIR (an empty, writable directory, wiped before the
+server starts) in the environment: values are then written to per-process
+mmap files and `/metrics` aggregates them across workers. Without it the
+endpoint reports the serving worker only.
+"""
+import asyncio
+import os
+import time
+from typing import Any, List, Optional, Pattern, Set, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.routing import Route, compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.settings import settings
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_DURATION = Histogram(
+    "maimconfig_request_duration_seconds",
+    "MaimConfig request duration per attempt (first, retry or hedge)",
+    ["endpoint", "attempt"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "maimconfig_request_errors_total",
+    "Failed MaimConfig requests",
+    ["endpoint", "reason"],
+)
+# closed=0, half_open=1, open=2; across workers the worst state is reported
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+UPSTREAM_BREAKER_STATE = Gauge(
+    "maimconfig_circuit_breaker_state",
+    "MaimConfig circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)",
+    ["endpoint"],
+    multiprocess_mode="livemax",
+)
+DB_SESSION_ACQUIRE = Histogram(
+    "db_session_acquire_seconds",
+    "Time to obtain a database session in deps.get_db",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+DB_SESSIONS_IN_USE = Gauge(
+    "db_sessions_in_use",
+    "Database sessions handed out by deps.get_db and not yet closed",
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke a periodic probe",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def render() -> tuple[bytes, str]:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    # Drops this worker's live gauges from the aggregated view
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled by route template ("/api/v1/agents/{agent_id}"),
+    never by raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[List[Tuple[Pattern, Set[str], str]]] = None
+
+    def _route_table(self, app: Any) -> List[Tuple[Pattern, Set[str], str]]:
+        # Built from the OpenAPI paths, which are the full templates however
+        # the routers were nested, plus plain routes hidden from the schema.
+        table = []
+        try:
+            paths = app.openapi().get("paths", {})
+        except Exception:
+            paths = {}
+        for path, operations in paths.items():
+            table.append((compile_path(path)[0], {method.upper() for method in operations}, path))
+        for route in app.routes:
+            if isinstance(route, Route):
+                table.append((route.path_regex, set(route.methods or ()), route.path))
+        return table
+
+    def _route_of(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = self._route_table(scope["app"])
+        path, method = scope["path"], scope["method"]
+        fallback = UNMATCHED_ROUTE
+        for regex, methods, template in self._routes:
+            if regex.match(path):
+                if method in methods or (method == "HEAD" and "GET" in methods):
+                    return template
+                fallback = template
+        return fallback
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_of(scope)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            in_progress.dec()
+
+
+class EventLoopLagMonitor:
+    """Sleeps for a fixed interval and records how late it was woken up."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - expected))
+
+
+loop_lag_monitor = EventLoopLagMonitor(settings.METRICS_LOOP_LAG_INTERVAL)
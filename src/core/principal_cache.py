@@ -0,0 +1,96 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from src.core.cache import TTLCache
+from src.core.settings import settings
+from src.schemas.user import CurrentUser
+
+
+@dataclass(frozen=True)
+class Principal:
+    payload: Dict[str, Any]
+    user: CurrentUser
+
+
+class PrincipalCache:
+    """
+    Token digest -> Principal, so authenticated requests skip the JWT decode
+    and the User/Tenant queries.
+
+    The cache is per worker. Call `claim_revocations.revoke_user` (which
+    calls `invalidate_user`) whenever a user's active flag or tenant set
+    changes; other workers converge within the TTL.
+
+    Invalidation also revokes the tenant claim of that user's tokens issued
+    so far (AUTH_STATELESS): they fall back to the database until re-login.
+    `claims_trusted` is this worker's view; claim_revocations adds the
+    revocations recorded by other workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._by_user: Dict[str, Set[str]] = {}
+        # user id -> time; tenant claims issued at or before it aren't trusted
+        self._claims_revoked: Dict[str, float] = {}
+        self._all_claims_revoked = 0.0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        return self._cache.get(self.digest(token))
+
+    def put(self, token: str, principal: Principal) -> None:
+        ttl = self._cache.ttl
+        exp = principal.payload.get("exp")
+        if exp is not None:
+            # Never serve a principal past its token's own expiry
+            ttl = min(ttl, float(exp) - time.time())
+        key = self.digest(token)
+        self._cache.set(key, principal, ttl=ttl)
+        if len(self._by_user) > self._cache.maxsize:
+            self._reindex()
+        self._by_user.setdefault(principal.user.id, set()).add(key)
+
+    def invalidate_user(self, user_id: str) -> None:
+        for key in self._by_user.pop(user_id, ()):
+            self._cache.pop(key)
+        now = time.time()
+        if len(self._claims_revoked) >= self._cache.maxsize:
+            # Claims older than the max age aren't trusted anyway
+            horizon = now - settings.AUTH_TENANT_CLAIM_MAX_AGE
+            self._claims_revoked = {u: t for u, t in self._claims_revoked.items() if t >= horizon}
+        self._claims_revoked[user_id] = now
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._by_user.clear()
+        self._claims_revoked.clear()
+        self._all_claims_revoked = time.time()
+
+    def claims_trusted(self, user_id: str, issued_at: Optional[float]) -> bool:
+        """Whether a token's embedded tenant claim can stand in for the database."""
+        if issued_at is None or time.time() - issued_at > settings.AUTH_TENANT_CLAIM_MAX_AGE:
+            return False
+        revoked = max(self._claims_revoked.get(user_id, 0.0), self._all_claims_revoked)
+        # iat has one-second resolution: a token from the revoking second is not trusted
+        return issued_at > revoked
+
+    def _reindex(self) -> None:
+        # Drop index entries whose cache entries were evicted or expired
+        index: Dict[str, Set[str]] = {}
+        for key, (principal, _) in self._cache._data.items():
+            index.setdefault(principal.user.id, set()).add(key)
+        self._by_user = index
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
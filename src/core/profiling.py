@@ -0,0 +1,172 @@
+"""
+On-demand request profiling with pyinstrument (optional dependency).
+
+A request is profiled when it carries `X-Profile: <PROFILING_TOKEN>` or is
+picked by the global sample rate. Explicitly requested profiles are kept in
+a small recent list (their id is returned in `X-Profile-Id`); sampled ones
+compete for a bounded ring of the slowest. Both are fetched through
+/admin/profiling as speedscope JSON or pyinstrument HTML.
+"""
+import heapq
+import importlib.util
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.settings import settings
+
+PROFILE_HEADER = b"x-profile"
+FORMATS = ("speedscope", "html")
+
+
+@dataclass(order=True)
+class StoredProfile:
+    duration: float
+    id: str = field(compare=False)
+    method: str = field(compare=False)
+    path: str = field(compare=False)
+    status: int = field(compare=False)
+    trigger: str = field(compare=False)
+    started_at: float = field(compare=False)
+    session: Any = field(compare=False, repr=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "duration_ms": self.duration * 1000,
+            "started_at": self.started_at,
+        }
+
+    def render(self, fmt: str) -> str:
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+        renderer = SpeedscopeRenderer() if fmt == "speedscope" else HTMLRenderer()
+        return renderer.render(self.session)
+
+
+class ProfileStore:
+    """The N slowest sampled profiles plus the N most recent requested ones."""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._slowest: List[StoredProfile] = []  # min-heap on duration
+        self._requested: "OrderedDict[str, StoredProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: StoredProfile) -> None:
+        with self._lock:
+            if profile.trigger == "header":
+                self._requested[profile.id] = profile
+                while len(self._requested) > self.keep:
+                    self._requested.popitem(last=False)
+            elif len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, profile)
+            elif profile.duration > self._slowest[0].duration:
+                heapq.heapreplace(self._slowest, profile)
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        with self._lock:
+            if profile_id in self._requested:
+                return self._requested[profile_id]
+            return next((p for p in self._slowest if p.id == profile_id), None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._requested.values()) + self._slowest
+        return [p.summary() for p in sorted(profiles, key=lambda p: p.duration, reverse=True)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._requested.clear()
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.store = ProfileStore(settings.PROFILING_KEEP)
+        self.profiled = 0
+        # pyinstrument itself is only imported once a request is profiled
+        self.available = importlib.util.find_spec("pyinstrument") is not None
+
+    def trigger_for(self, scope: Scope) -> Optional[str]:
+        if not self.available:
+            return None
+        if settings.PROFILING_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if secrets.compare_digest(value, settings.PROFILING_TOKEN.encode()):
+                        return "header"
+                    break
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "header_enabled": bool(settings.PROFILING_TOKEN),
+            "sample_rate": self.sample_rate,
+            "keep": self.store.keep,
+            "profiled": self.profiled,
+        }
+
+
+request_profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; requests that aren't profiled pay one header scan."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = request_profiler.trigger_for(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profile_id = uuid.uuid4().hex[:16]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trigger == "header":
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        started_at = time.time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            request_profiler.profiled += 1
+            request_profiler.store.add(StoredProfile(
+                duration=session.duration,
+                id=profile_id,
+                method=scope["method"],
+                path=scope["path"],
+                status=status,
+                trigger=trigger,
+                started_at=started_at,
+                session=session,
+            ))
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_, select, update
+
+from src.core.maim_config_client import client as maim_config_client
+from src.core.claim_revocations import claim_revocations
+from src.core.settings import settings
+from src.models.base import db_session
+from src.models.provisioning import ProvisioningStatus, TenantProvisioning
+from maim_db.maimconfig_models.models import Tenant, TenantType, TenantStatus
+
+logger = logging.getLogger(__name__)
+
+
+class TenantProvisioner:
+    """
+    Background worker draining the TenantProvisioning outbox.
+
+    Every worker process runs one; rows are claimed with a conditional
+    UPDATE on `locked_until`, so each row is processed by one process at a
+    time. Failed attempts back off exponentially up to
+    PROVISIONING_MAX_ATTEMPTS, after which the row is marked failed.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Process new outbox rows now instead of at the next poll."""
+        self._wake.set()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Tenant provisioning pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.PROVISIONING_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_once(self) -> int:
+        """Process every due row; returns how many were attempted."""
+        now = datetime.utcnow()
+        async with db_session() as db:
+            result = await db.execute(
+                select(TenantProvisioning.id)
+                .where(
+                    TenantProvisioning.status.in_([ProvisioningStatus.PENDING, ProvisioningStatus.IN_PROGRESS]),
+                    TenantProvisioning.next_attempt_at <= now,
+                    or_(TenantProvisioning.locked_until.is_(None), TenantProvisioning.locked_until < now),
+                )
+                .order_by(TenantProvisioning.next_attempt_at)
+                .limit(settings.PROVISIONING_BATCH_SIZE)
+            )
+            ids = result.scalars().all()
+
+        attempted = 0
+        for provisioning_id in ids:
+            if await self._claim(provisioning_id):
+                attempted += 1
+                await self._process(provisioning_id)
+        return attempted
+
+    async def _claim(self, provisioning_id: str) -> bool:
+        now = datetime.utcnow()
+        async with db_session() as db:
+            # Re-check everything the listing filtered on: the id list may be
+            # stale, and a finished or backing-off row must not be reset
+            result = await db.execute(
+                update(TenantProvisioning)
+                .where(
+                    TenantProvisioning.id == provisioning_id,
+                    TenantProvisioning.status.in_([ProvisioningStatus.PENDING, ProvisioningStatus.IN_PROGRESS]),
+                    or_(TenantProvisioning.next_attempt_at.is_(None), TenantProvisioning.next_attempt_at <= now),
+                    or_(TenantProvisioning.locked_until.is_(None), TenantProvisioning.locked_until < now),
+                )
+                .values(
+                    status=ProvisioningStatus.IN_PROGRESS,
+                    locked_until=now + timedelta(seconds=settings.PROVISIONING_LEASE_SECONDS),
+                )
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def _process(self, provisioning_id: str) -> None:
+        async with db_session() as db:
+            row = await db.get(TenantProvisioning, provisioning_id)
+            if row is None or row.status == ProvisioningStatus.SUCCEEDED:
+                return
+            now = datetime.utcnow()
+            user_id, payload = row.user_id, json.loads(row.payload)
+            row.attempts += 1
+            row.updated_at = now
+            try:
+                tenant_id = row.tenant_id or await self._create_remote_tenant(provisioning_id, payload)
+            except Exception as e:
+                row.last_error = str(e)[:2000]
+                row.locked_until = None
+                if row.attempts >= settings.PROVISIONING_MAX_ATTEMPTS:
+                    row.status = ProvisioningStatus.FAILED
+                    self.failed += 1
+                else:
+                    row.status = ProvisioningStatus.PENDING
+                    delay = min(settings.PROVISIONING_BACKOFF_BASE * 2 ** (row.attempts - 1), settings.PROVISIONING_BACKOFF_MAX)
+                    row.next_attempt_at = now + timedelta(seconds=delay)
+                    self.retried += 1
+                logger.warning("Provisioning %s attempt %s failed: %s", provisioning_id, row.attempts, e)
+                await db.commit()
+                return
+
+            # Remember the remote id first, so a crash below never creates a second tenant
+            row.tenant_id = tenant_id
+            await db.commit()
+
+            # Reconcile the local Tenant row used for ownership checks
+            if await db.get(Tenant, tenant_id) is None:
+                db.add(Tenant(
+                    id=tenant_id,
+                    tenant_name=payload["tenant_name"],
+                    owner_id=user_id,
+                    tenant_type=TenantType.PERSONAL.value,
+                    status=TenantStatus.ACTIVE.value,
+                    created_at=now,
+                    updated_at=now,
+                ))
+            await db.execute(
+                update(TenantProvisioning)
+                .where(TenantProvisioning.id == provisioning_id)
+                .values(status=ProvisioningStatus.SUCCEEDED, last_error=None, locked_until=None, updated_at=now)
+            )
+            await db.commit()
+        await claim_revocations.revoke_user(user_id)
+        self.succeeded += 1
+
+    async def _create_remote_tenant(self, provisioning_id: str, payload: Dict[str, Any]) -> str:
+        # The outbox id doubles as the idempotency key, so a retry after a
+        # lost response doesn't create a second tenant upstream.
+        resp = await maim_config_client.create_tenant(payload, idempotency_key=provisioning_id)
+        if not resp.get("success"):
+            raise Exception(f"Failed to create tenant in MaimConfig: {resp.get('message')}")
+        return resp["data"]["id"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+tenant_provisioner = TenantProvisioner()
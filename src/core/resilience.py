@@ -0,0 +1,154 @@
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` consecutive failures; open fails
+    fast for `reset_timeout` seconds, then half_open lets a single probe
+    through: success closes the circuit, failure re-opens it.
+    `on_state_change` is called with the new state on every transition.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        on_state_change: Optional[Callable[[str], None]] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self.on_state_change is not None:
+                self.on_state_change(state)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach the upstream."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError("circuit open")
+            self._set_state(self.HALF_OPEN)
+            self.probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError("circuit half-open, probe in flight")
+            self.probe_in_flight = True
+
+    def cancel_probe(self) -> None:
+        """The call was abandoned before an outcome; let another probe through."""
+        self.probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._set_state(self.CLOSED)
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self._set_state(self.OPEN)
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """
+    Global token bucket capping retries (and hedges) to a fraction of
+    traffic, so a degraded upstream doesn't get multiplied load.
+
+    Every original request deposits `ratio` tokens, and `min_per_second`
+    tokens trickle in so low-traffic periods can still retry. A retry
+    spends one token.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._last = time.monotonic()
+        self.spent = 0
+        self.exhausted = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last) * self.min_per_second)
+        self._last = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.spent += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {"tokens": round(self.tokens, 2), "spent": self.spent, "exhausted": self.exhausted}
+
+
+class LatencyTracker:
+    """Recent latencies of one endpoint; p95 is recomputed every few samples."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples: deque = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._p95: Optional[float] = None
+        self._since_update = 0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._since_update += 1
+        if len(self.samples) >= self.min_samples and (self._p95 is None or self._since_update >= 20):
+            ordered = sorted(self.samples)
+            self._p95 = ordered[int(0.95 * (len(ordered) - 1))]
+            self._since_update = 0
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self._p95
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
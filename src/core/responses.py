@@ -0,0 +1,69 @@
+import json
+from typing import Any, AsyncIterator, Mapping, Optional
+
+import httpx
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+def dumps(data: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON, via orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """App-wide default response class: JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(adapter: TypeAdapter, data: Any, status_code: int = 200,
+                   headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    Validate `data` with a precompiled TypeAdapter and serialize it in the
+    same pass (pydantic-core), instead of FastAPI's response_model
+    validation + jsonable_encoder + json.dumps. Keep `response_model` on the
+    route for the OpenAPI schema; returning a Response bypasses it at runtime.
+    """
+    body = adapter.dump_json(adapter.validate_python(data), by_alias=True)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+# Hop-by-hop headers (RFC 9110 7.6.1) plus those the server sets itself
+_NOT_FORWARDED = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "date", "server",
+}
+
+
+def passthrough_response(upstream: httpx.Response) -> StreamingResponse:
+    """
+    Pipe an unread upstream response (MaimConfigClient.proxy) to the client:
+    status, end-to-end headers and body chunks as received, never decoded.
+    """
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _NOT_FORWARDED}
+    return StreamingResponse(
+        body(),
+        status_code=upstream.status_code,
+        headers=headers,
+        # Also closes the upstream if the body is never iterated
+        background=BackgroundTask(upstream.aclose),
+    )
@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Dict, List, Union
 
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,10 +10,86 @@ class Settings(BaseSettings):
     
     # MaimConfig Service
     MAIMCONFIG_API_URL: str = "http://127.0.0.1:8000/api/v2"
-    
+    # 连接池 (每个 worker 一个共享的 httpx.AsyncClient)
+    MAIMCONFIG_MAX_CONNECTIONS: int = 100
+    MAIMCONFIG_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    MAIMCONFIG_KEEPALIVE_EXPIRY: float = 30.0
+    MAIMCONFIG_HTTP2: bool = False  # requires the `h2` package (httpx[http2])
+    # 超时 (秒). 按 endpoint 前缀覆盖, e.g. {"/system": 3, "/plugins": 15}
+    MAIMCONFIG_CONNECT_TIMEOUT: float = 5.0
+    MAIMCONFIG_TIMEOUT: float = 10.0
+    MAIMCONFIG_POOL_TIMEOUT: float = 5.0
+    MAIMCONFIG_ENDPOINT_TIMEOUTS: Dict[str, float] = {}
+    # 熔断: 同一 endpoint 连续失败 N 次后快速失败, 冷却后放行一个探测请求
+    MAIMCONFIG_BREAKER_FAILURE_THRESHOLD: int = 5
+    MAIMCONFIG_BREAKER_RESET_TIMEOUT: float = 30.0
+    # 幂等请求重试 (指数退避 + jitter), 全局重试预算约为请求量的 RATIO
+    MAIMCONFIG_RETRY_METHODS: List[str] = ["GET"]
+    MAIMCONFIG_RETRY_MAX_ATTEMPTS: int = 3
+    MAIMCONFIG_RETRY_BACKOFF_BASE: float = 0.1
+    MAIMCONFIG_RETRY_BACKOFF_MAX: float = 1.0
+    MAIMCONFIG_RETRY_BUDGET_RATIO: float = 0.2
+    MAIMCONFIG_RETRY_BUDGET_MIN_PER_SECOND: float = 5.0
+    MAIMCONFIG_RETRY_BUDGET_MAX_TOKENS: float = 50.0
+    # 一次调用 (含全部重试与退避) 的总时限, 每次尝试的超时不超过剩余时间
+    MAIMCONFIG_RETRY_DEADLINE: float = 15.0
+    # 对冲请求: GET 超过该 endpoint 近期 p95 仍未返回时再发一份
+    MAIMCONFIG_HEDGE_ENABLED: bool = False
+    MAIMCONFIG_HEDGE_MIN_DELAY: float = 0.05
+    # 相同的并发幂等请求合并为一次上游调用 (single-flight), [] 关闭
+    MAIMCONFIG_COALESCE_METHODS: List[str] = ["GET"]
+    # GET /agents/ 每个请求对 MaimConfig 的最大并发 (按租户扇出)
+    AGENT_LIST_FANOUT_CONCURRENCY: int = 8
+    # POST /agents/batch-get 单次最多 ID 数, 及对 MaimConfig 的最大并发
+    AGENT_BATCH_MAX_IDS: int = 200
+    AGENT_BATCH_CONCURRENCY: int = 16
+    # 本地 agent 元数据镜像 (归属校验 / tenant_id 查询不再调用 get_agent)
+    AGENT_MIRROR_ENABLED: bool = True
+    AGENT_MIRROR_REFRESH_INTERVAL: int = 600  # 超过该时间未同步的行由后台重新拉取
+    AGENT_MIRROR_TOUCH_INTERVAL: int = 60  # 元数据未变时, 读路径最多每隔该时间刷新一次 synced_at
+    AGENT_MIRROR_POLL_INTERVAL: float = 30.0
+    AGENT_MIRROR_REFRESH_BATCH: int = 100
+    AGENT_MIRROR_REFRESH_CONCURRENCY: int = 8
+    # GET /agents/, /agents/{id}, /agents/{id}/api_keys: MaimConfig 故障或超过延迟预算时,
+    # 返回该用户最近一次成功的结果 (带 X-Stale-Age 头), 0 关闭
+    AGENT_STALE_IF_ERROR: int = 3600
+    AGENT_STALE_LATENCY_BUDGET: float = 2.0
+    AGENT_STALE_CACHE_SIZE: int = 10000
+    # GET /agents/{id}/api_keys 列表缓存; 本服务内的创建/删除经共享库中的代数跨 worker 失效,
+    # TTL 兜底其他途径的修改, 0 关闭
+    API_KEY_LIST_CACHE_TTL: int = 60
+    API_KEY_LIST_CACHE_SIZE: int = 10000
+    # 超过该时间未变更的代数行被清理 (读作 0); 须远大于 TTL 与一次上游加载的耗时
+    API_KEY_GENERATION_RETENTION: int = 86400
+    # /agents/{id}/api_keys 批量创建 / 吊销 / 轮换: 单次最多条目数, 及对 MaimConfig 的最大并发
+    API_KEY_BULK_MAX_ITEMS: int = 100
+    API_KEY_BULK_CONCURRENCY: int = 8
+    # /system/models, /system/bot-defaults 缓存 (秒)
+    CATALOGUE_CACHE_TTL: int = 300
+    CATALOGUE_STALE_IF_ERROR: int = 3600  # MaimConfig 故障时继续返回旧值的最长时间
+
     # 秘钥配置
     SECRET_KEY: str = "CHANGE_THIS_TO_A_SECURE_SECRET_KEY_IN_PRODUCTION"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    # 密码哈希 (bcrypt) 在独立线程池中执行, 排队超过上限时返回 429
+    BCRYPT_ROUNDS: int = 12  # 修改后, 旧哈希会在用户下次登录时自动升级
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    # 注册时的默认租户由后台 worker 异步在 MaimConfig 创建 (outbox)
+    PROVISIONING_POLL_INTERVAL: float = 5.0
+    PROVISIONING_BATCH_SIZE: int = 50
+    PROVISIONING_LEASE_SECONDS: int = 60
+    PROVISIONING_MAX_ATTEMPTS: int = 10
+    PROVISIONING_BACKOFF_BASE: float = 2.0
+    PROVISIONING_BACKOFF_MAX: float = 600.0
+    # 已认证用户缓存 (token digest -> user/tenants), 0 TTL 关闭
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    # 无状态鉴权: token 内携带用户拥有的租户集合, 鉴权与归属校验不再查库.
+    # 租户变更时记录到共享库 (web_claim_revocations), 各 worker 最迟在 PRINCIPAL_CACHE_TTL 后回退查库;
+    # 超过 CLAIM_MAX_AGE 的 token 一律查库
+    AUTH_STATELESS: bool = False
+    AUTH_TENANT_CLAIM_MAX_AGE: int = 3600
     
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -26,6 +102,31 @@ class Settings(BaseSettings):
             return v
         raise ValueError(v)
 
+    # /admin 下的同步 (peewee) 查询在独立线程池中执行
+    ADMIN_DB_WORKERS: int = 4
+    ADMIN_DB_MAX_QUEUE: int = 32
+    ADMIN_DB_QUERY_TIMEOUT: float = 15.0
+    ADMIN_MAX_PAGE_SIZE: int = 200
+    ADMIN_TOTAL_CACHE_TTL: int = 30  # 列表 total 按过滤条件缓存 (秒)
+    ADMIN_EXPORT_BATCH_SIZE: int = 1000
+    ADMIN_METRIC_MAX_BUCKETS: int = 2000
+    ADMIN_ROLLUP_GRACE_SECONDS: int = 120  # 超过该时间的 bucket 视为已完成, 写入 rollup 表
+    ADMIN_ROLLUP_CHUNK_BUCKETS: int = 500  # 补齐 rollup 时每个事务处理的 bucket 数
+
+    # 启动预热: 建立数据库 / MaimConfig 连接并预取系统目录缓存
+    STARTUP_WARMUP: bool = True
+    STARTUP_WARMUP_TIMEOUT: float = 5.0
+
+    # Prometheus /metrics (多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR)
+    METRICS_ENABLED: bool = True
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5
+
+    # 请求采样分析 (需要 pyinstrument): 带 X-Profile: <TOKEN> 的请求必定采样
+    PROFILING_TOKEN: str = ""
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_KEEP: int = 20
+
     # Database (Reuse maim_db connection logic, but can config here if needed)
     # For now we use the ENV vars that maim_db uses.
 
@@ -2,17 +2,89 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-print("Starting MaimWebBackend...", flush=True)
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from sqlalchemy import text
 from starlette.middleware.cors import CORSMiddleware
 
 from src.api.routes import auth, agents, plugins, tenants, api_keys, admin, system
 from src.core.settings import settings
-from maim_db.maimconfig_models.models import create_tables
+from src.core import metrics
+from src.core.agent_mirror import agent_mirror
+from src.core.profiling import ProfilingMiddleware
+from src.core.responses import FastJSONResponse
+from src.core.db_executor import admin_db_executor
+from src.core.maim_config_client import client as maim_config_client
+from src.core.provisioning import tenant_provisioner
+from src.core.security import password_hasher
+from src.models.base import create_local_tables, db_session
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """
+    Open the DB and MaimConfig connection pools and prime the catalogue
+    cache, so the first requests after start don't pay for it. Failures
+    are logged, not fatal: everything also initialises on first use.
+    """
+    async def database():
+        async with db_session() as db:
+            await db.execute(text("SELECT 1"))
+
+    steps = {
+        "database": database(),
+        "system models": system.catalogue_cache.get("models", system.load_system_models),
+        "bot defaults": system.catalogue_cache.get("bot-defaults", system.load_bot_defaults),
+    }
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*steps.values(), return_exceptions=True),
+            timeout=settings.STARTUP_WARMUP_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Startup warm-up timed out after %ss", settings.STARTUP_WARMUP_TIMEOUT)
+        return
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning("Startup warm-up of %s failed: %s", name, getattr(result, "detail", result))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 自动创建表 (User, Tenant等)
+    # in production might want to use alembic, but for now auto-create is fine as per plan
+    # await create_tables()
+    await create_local_tables()
+
+    # One pooled MaimConfig client per worker, reused by every request
+    await maim_config_client.start()
+    if settings.STARTUP_WARMUP:
+        await warm_up()
+    tenant_provisioner.start()
+    agent_mirror.start()
+    if settings.METRICS_ENABLED:
+        metrics.loop_lag_monitor.start()
+    try:
+        yield
+    finally:
+        await metrics.loop_lag_monitor.stop()
+        metrics.mark_process_dead()
+        await agent_mirror.stop()
+        await tenant_provisioner.stop()
+        await maim_config_client.close()
+        admin_db_executor.shutdown()
+        password_hasher.shutdown()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME, 
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -23,8 +95,13 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor", "X-Partial-Failures", "X-Stale-Age"],
     )
 
+app.add_middleware(ProfilingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.PrometheusMiddleware)
+
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(agents.router, prefix=f"{settings.API_V1_STR}/agents", tags=["agents"])
 app.include_router(plugins.router, prefix=f"{settings.API_V1_STR}/plugins", tags=["plugins"])
@@ -34,12 +111,11 @@ app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["a
 app.include_router(system.router, prefix=f"{settings.API_V1_STR}/system", tags=["system"])
 
 
-@app.on_event("startup")
-async def startup_event():
-    # 自动创建表 (User, Tenant等)
-    # in production might want to use alembic, but for now auto-create is fine as per plan
-    # await create_tables()
-    pass
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        body, content_type = metrics.render()
+        return Response(content=body, media_type=content_type)
 
 
 @app.get("/")
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from src.models.base import Base
+
+
+class AgentMirror(Base):
+    """
+    Local copy of an agent's metadata; MaimConfig stays the source of truth.
+
+    Written when agents are fetched, created or updated through this service
+    and re-synced by the mirror refresher, so ownership checks and tenant_id
+    lookups don't need a `get_agent` round trip.
+    """
+    __tablename__ = "web_agent_mirror"
+
+    id = Column(String(64), primary_key=True)
+    tenant_id = Column(String(64), nullable=False, index=True)
+    name = Column(String(255), nullable=False, default="")
+    status = Column(String(32), nullable=False, default="")
+    version = Column(Integer, nullable=False, default=1)  # bumped when the metadata changes
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    synced_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
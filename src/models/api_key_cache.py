@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from src.models.base import Base
+
+
+class ApiKeyListGeneration(Base):
+    """
+    Bumped whenever an agent's API keys are created or deleted here.
+
+    Workers tag their cached key lists with the generation they were
+    fetched under; a different value in this table means the list changed.
+    """
+    __tablename__ = "web_api_key_generations"
+
+    agent_id = Column(String(64), primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,47 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import declarative_base
+
+from maim_db.maimconfig_models.connection import get_db
+
+# Tables owned by MaimWebBackend itself (User/Tenant live in maim_db)
+Base = declarative_base()
+
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """A session outside of a request (background workers, startup)."""
+    sessions = get_db()
+    session = await sessions.__anext__()
+    try:
+        yield session
+    finally:
+        await sessions.aclose()
+
+
+async def upsert_in_own_session(upsert: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Run `upsert` (update-or-insert, then commit) in a session of its own, so
+    the caller's transaction is left alone. If another worker inserted the
+    row first, roll back and run it once more to update theirs. Other
+    errors propagate; callers on a best-effort path log them instead.
+    """
+    async with db_session() as db:
+        try:
+            return await upsert(db)
+        except IntegrityError:
+            await db.rollback()
+            return await upsert(db)
+
+
+async def create_local_tables() -> None:
+    """Create this service's own tables in the shared database if missing."""
+    async with db_session() as session:
+        conn = await session.connection()
+        await conn.run_sync(Base.metadata.create_all)
+        await session.commit()
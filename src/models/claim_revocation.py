@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from src.models.base import Base
+
+
+class ClaimRevocation(Base):
+    """
+    When a user's tenant claims were last revoked (AUTH_STATELESS).
+
+    Tokens issued at or before `revoked_at` no longer stand in for the
+    User/Tenant queries on any worker. The "*" row revokes every user's.
+    """
+    __tablename__ = "web_claim_revocations"
+
+    user_id = Column(String(64), primary_key=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from peewee import CharField, DateTimeField, FloatField, IntegerField, Model
+from maim_db.core.models.business import SystemMetrics
+
+
+class _RollupModel(Model):
+    class Meta:
+        # Rollups live next to the raw metrics they summarise
+        database = SystemMetrics._meta.database
+
+
+class MetricRollup(_RollupModel):
+    """Summary of one completed (metric, resolution, bucket, group)."""
+    metric_name = CharField(max_length=255)
+    resolution = CharField(max_length=8)
+    group_key = CharField(max_length=255, default="")  # "", "agent_id" or "tag:<key>"
+    group_value = CharField(max_length=255, default="")
+    bucket_start = DateTimeField()
+    count = IntegerField()
+    min = FloatField()
+    max = FloatField()
+    avg = FloatField()
+    p50 = FloatField()
+    p95 = FloatField()
+    p99 = FloatField()
+
+    class Meta:
+        table_name = "web_metric_rollups"
+        indexes = (
+            (("metric_name", "resolution", "group_key", "bucket_start", "group_value"), True),
+        )
+
+
+class MetricRollupWatermark(_RollupModel):
+    """Buckets in [rolled_from, rolled_until) are fully rolled up."""
+    metric_name = CharField(max_length=255)
+    resolution = CharField(max_length=8)
+    group_key = CharField(max_length=255, default="")
+    rolled_from = DateTimeField()
+    rolled_until = DateTimeField()
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    class Meta:
+        table_name = "web_metric_rollup_watermarks"
+        indexes = (
+            (("metric_name", "resolution", "group_key"), True),
+        )
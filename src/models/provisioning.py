@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from src.models.base import Base
+
+
+class ProvisioningStatus:
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class TenantProvisioning(Base):
+    """
+    Outbox row: a user's default tenant still to be created in MaimConfig.
+
+    Written in the same transaction as the User; the provisioning worker
+    picks it up, creates the tenant and mirrors it into the local Tenant table.
+    """
+    __tablename__ = "web_tenant_provisioning"
+
+    id = Column(String(64), primary_key=True)
+    user_id = Column(String(64), nullable=False, unique=True, index=True)
+    status = Column(String(16), nullable=False, default=ProvisioningStatus.PENDING, index=True)
+    payload = Column(Text, nullable=False)  # JSON body for MaimConfig create_tenant
+    tenant_id = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,8 @@
 from typing import Optional, List
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.core.settings import settings
 
 class ApiKeyBase(BaseModel):
     name: str
@@ -31,3 +33,21 @@ class ApiKeyInDBBase(ApiKeyBase):
 
 class ApiKey(ApiKeyInDBBase):
     pass
+
+
+# Bulk operations under /agents/{agent_id}/api_keys
+class ApiKeyBulkCreate(BaseModel):
+    keys: List[ApiKeyCreate] = Field(..., min_length=1, max_length=settings.API_KEY_BULK_MAX_ITEMS)
+
+class ApiKeyBulkIds(BaseModel):
+    key_ids: List[str] = Field(..., min_length=1, max_length=settings.API_KEY_BULK_MAX_ITEMS)
+
+class ApiKeyBulkResult(BaseModel):
+    key_id: Optional[str] = None  # the revoked / rotated key
+    status_code: int
+    detail: Optional[str] = None
+    api_key: Optional[ApiKey] = None  # the created key
+
+class ApiKeyBulkOut(BaseModel):
+    # One result per requested item, in request order
+    results: List[ApiKeyBulkResult]
@@ -0,0 +1,15 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class Provisioning(BaseModel):
+    status: str
+    tenant_id: Optional[str] = None
+    attempts: int
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -9,3 +9,8 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
+    iat: Optional[int] = None
+    # AUTH_STATELESS claims: owned tenant ids, username, email
+    tid: Optional[List[str]] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -29,3 +29,9 @@ class User(UserInDBBase):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+class CurrentUser(UserBase):
+    """Authenticated principal, as cached by deps.get_current_user."""
+    id: str
+    tenant_ids: List[str] = []
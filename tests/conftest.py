@@ -0,0 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """
+    A throwaway SQLite database with this service's tables, as a
+    `db_session()` stand-in for the module under test to be patched with.
+    """
+    pytest.importorskip("maim_db")
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from src.models.base import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def db_session():
+        async with sessions() as session:
+            yield session
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield db_session
+    asyncio.run(engine.dispose())
@@ -0,0 +1,69 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("maim_db")
+
+from peewee import AutoField, CharField, DateTimeField, Model, SqliteDatabase, TextField
+
+import maim_db.core.models.business as business
+from src.api.routes import admin
+from src.core.settings import settings
+
+
+@pytest.fixture
+def chat_history(tmp_path, monkeypatch):
+    """A ChatHistory stand-in whose created_at may be NULL."""
+    db = SqliteDatabase(str(tmp_path / "chat.db"))
+
+    class ChatHistory(Model):
+        id = AutoField()
+        agent_id = CharField(default="a_1")
+        session_id = CharField(default="s_1")
+        user_id = CharField(default="u_1")
+        user_message = TextField(default="hi")
+        assistant_message = TextField(default="hello")
+        created_at = DateTimeField(null=True)
+
+        class Meta:
+            database = db
+
+    db.create_tables([ChatHistory])
+    monkeypatch.setattr(business, "ChatHistory", ChatHistory)
+    monkeypatch.setattr(settings, "ADMIN_EXPORT_BATCH_SIZE", 3)
+    return ChatHistory
+
+
+def _export(fmt: str = "ndjson", compress: bool = True) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in admin._export_chunks([], fmt, compress)])
+    return asyncio.run(collect())
+
+
+def test_export_includes_rows_without_created_at_across_batches(chat_history):
+    for i in range(10):
+        # Six dated rows, then four NULL ones; the third batch ends on a NULL row
+        chat_history.create(created_at=None if i % 2 and i > 2 else datetime(2024, 1, 1, 0, 0, i))
+    lines = gzip.decompress(_export()).decode().splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert sorted(ids, key=int) == [str(i) for i in range(1, 11)]
+    assert len(set(ids)) == 10
+    assert [json.loads(line)["created_at"] for line in lines][-1] is None
+
+
+def test_export_orders_by_created_at_then_id(chat_history):
+    for second in (5, 1, 5, 3):
+        chat_history.create(created_at=datetime(2024, 1, 1, 0, 0, second))
+    lines = _export(compress=False).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["2", "4", "1", "3"]
+
+
+def test_csv_export_has_a_header_and_every_row(chat_history):
+    for i in range(4):
+        chat_history.create(created_at=None)
+    lines = _export("csv", compress=False).decode().splitlines()
+    assert lines[0].split(",") == admin._EXPORT_FIELDS
+    assert len(lines) == 5
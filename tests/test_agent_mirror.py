@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("maim_db")
+pytest.importorskip("aiosqlite")
+
+from src.core import agent_mirror as agent_mirror_module
+from src.core.settings import settings
+from src.models import base
+from src.models.agent_mirror import AgentMirror
+
+
+@pytest.fixture
+def mirror(db_session, monkeypatch):
+    """An AgentMirrorService on a throwaway SQLite database and a fake MaimConfig."""
+    monkeypatch.setattr(agent_mirror_module, "db_session", db_session)
+    monkeypatch.setattr(base, "db_session", db_session)
+    monkeypatch.setattr(settings, "AGENT_MIRROR_ENABLED", True)
+    service = agent_mirror_module.AgentMirrorService()
+    service.fetched = []
+
+    async def get_agent(agent_id):
+        service.fetched.append(agent_id)
+        return {"success": True, "data": {"agent_id": agent_id, "tenant_id": "t_1", "name": "fresh"}}
+
+    monkeypatch.setattr(agent_mirror_module.maim_config_client, "get_agent", get_agent)
+    return service
+
+
+def _agent(name: str = "A", agent_id: str = "a_1") -> dict:
+    return {"agent_id": agent_id, "tenant_id": "t_1", "name": name, "status": "active"}
+
+
+def _row(db_session, agent_id: str = "a_1"):
+    async def get():
+        async with db_session() as db:
+            return await db.get(AgentMirror, agent_id)
+    return asyncio.run(get())
+
+
+def _age(db_session, seconds: float, agent_id: str = "a_1") -> None:
+    async def age():
+        async with db_session() as db:
+            row = await db.get(AgentMirror, agent_id)
+            row.synced_at = datetime.utcnow() - timedelta(seconds=seconds)
+            await db.commit()
+    asyncio.run(age())
+
+
+def test_record_inserts_then_skips_unchanged_metadata(mirror, db_session):
+    asyncio.run(mirror.record(_agent()))
+    assert _row(db_session).version == 1
+    mirror._recorded.clear()
+    asyncio.run(mirror.record(_agent()))
+    assert (mirror.writes, mirror.skipped_writes) == (1, 1)
+
+
+def test_record_skips_without_a_query_when_recently_recorded(mirror, monkeypatch):
+    asyncio.run(mirror.record(_agent()))
+
+    def no_session():
+        raise AssertionError("should not open a session")
+
+    monkeypatch.setattr(base, "db_session", no_session)
+    asyncio.run(mirror.record(_agent()))
+    assert mirror.skipped_writes == 1
+
+
+def test_record_writes_changed_metadata(mirror, db_session):
+    asyncio.run(mirror.record(_agent("A")))
+    asyncio.run(mirror.record(_agent("B")))
+    row = _row(db_session)
+    assert (row.name, row.version) == ("B", 2)
+
+
+def test_record_touches_rows_synced_long_ago(mirror, db_session):
+    asyncio.run(mirror.record(_agent()))
+    _age(db_session, settings.AGENT_MIRROR_TOUCH_INTERVAL + 1)
+    mirror._recorded.clear()
+    asyncio.run(mirror.record(_agent()))
+    assert datetime.utcnow() - _row(db_session).synced_at < timedelta(seconds=5)
+    assert mirror.writes == 2
+
+
+def test_claim_advances_synced_at_so_other_loops_skip_the_batch(mirror, db_session):
+    for agent_id in ("a_1", "a_2"):
+        asyncio.run(mirror.record(_agent(agent_id=agent_id)))
+        _age(db_session, settings.AGENT_MIRROR_REFRESH_INTERVAL + 1, agent_id)
+
+    async def claim_twice():
+        return await mirror._claim(), await mirror._claim()
+
+    first, second = asyncio.run(claim_twice())
+    assert sorted(first) == ["a_1", "a_2"]
+    assert second == []
+
+
+def test_run_once_refreshes_claimed_rows(mirror, db_session):
+    asyncio.run(mirror.record(_agent()))
+    _age(db_session, settings.AGENT_MIRROR_REFRESH_INTERVAL + 1)
+    assert asyncio.run(mirror.run_once()) == 1
+    assert mirror.fetched == ["a_1"]
+    assert _row(db_session).name == "fresh"
+    assert asyncio.run(mirror.run_once()) == 0
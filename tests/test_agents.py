@@ -0,0 +1,277 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("maim_db")
+
+from src.api import deps
+from src.api.routes import agents
+from fastapi import HTTPException
+
+from src.core.cache import StaleIfErrorCache
+from src.core.maim_config_client import MaimConfigError, MaimConfigUnavailable
+from src.schemas.user import CurrentUser
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """read_agents over a fake tenant lookup and a fake MaimConfig listing."""
+    state = {"tenants": ["t_1", "t_2"], "down": False}
+
+    async def owned_tenant_ids(db, current_user):
+        return list(state["tenants"])
+
+    async def list_agents(tenant_ids, cursor, skip, limit):
+        if state["down"]:
+            raise RuntimeError("MaimConfig down")
+        return [{"id": f"a_{t}", "tenant_id": t, "name": t, "status": "active"} for t in tenant_ids], {}
+
+    monkeypatch.setattr(deps, "get_owned_tenant_ids", owned_tenant_ids)
+    monkeypatch.setattr(agents, "_list_agents", list_agents)
+    monkeypatch.setattr(agents, "agent_reads", StaleIfErrorCache(max_age=60, budget=1.0))
+    return state
+
+
+def _read(user: CurrentUser):
+    response = asyncio.run(agents.read_agents(db=None, current_user=user, cursor=None, skip=0, limit=10))
+    return [agent["tenant_id"] for agent in json.loads(response.body)], response.headers.get("X-Stale-Age")
+
+
+def test_stale_agent_list_is_served_while_upstream_is_down(upstream):
+    user = CurrentUser(id="u1", username="u1")
+    assert _read(user) == (["t_1", "t_2"], None)
+    upstream["down"] = True
+    tenants, stale_age = _read(user)
+    assert tenants == ["t_1", "t_2"] and stale_age is not None
+
+
+def test_stale_agent_list_does_not_outlive_a_lost_tenant(upstream):
+    user = CurrentUser(id="u1", username="u1")
+    _read(user)
+    upstream["tenants"], upstream["down"] = ["t_1"], True
+    with pytest.raises(RuntimeError):
+        _read(user)
+
+
+@pytest.fixture
+def agent_upstream(monkeypatch):
+    """read_agent over a fake MaimConfig get_agent that fails with `state["error"]`."""
+    state = {"error": None}
+
+    async def get_agent(agent_id):
+        if state["error"] is not None:
+            raise state["error"]
+        return {"success": True, "data": {"id": agent_id, "tenant_id": "t_1", "name": "A", "status": "active"}}
+
+    monkeypatch.setattr(deps.maim_config_client, "get_agent", get_agent)
+    monkeypatch.setattr(agents, "agent_reads", StaleIfErrorCache(
+        max_age=60, budget=1.0, serve_stale_on=agents._upstream_failed,
+    ))
+    return state
+
+
+class _ReadContext:
+    current_user = CurrentUser(id="u1", username="u1")
+
+    async def remember(self, agent_id, agent):
+        pass
+
+    async def check_owner(self, agent):
+        pass
+
+
+def _read_agent():
+    response = asyncio.run(agents.read_agent("a_1", _ReadContext()))
+    return json.loads(response.body)["id"], response.headers.get("X-Stale-Age")
+
+
+def test_stale_agent_is_served_while_upstream_is_unavailable(agent_upstream):
+    assert _read_agent() == ("a_1", None)
+    agent_upstream["error"] = MaimConfigUnavailable("MaimConfig Connection Error: refused")
+    agent_id, stale_age = _read_agent()
+    assert agent_id == "a_1" and stale_age is not None
+
+
+def test_deleted_agent_is_a_404_not_a_stale_copy(agent_upstream):
+    _read_agent()
+    agent_upstream["error"] = MaimConfigError("MaimConfig Error: Agent not found", status_code=404)
+    with pytest.raises(HTTPException) as exc:
+        _read_agent()
+    assert exc.value.status_code == 404
+    # The stale copy is gone too, so a later outage can't bring it back
+    agent_upstream["error"] = MaimConfigUnavailable("MaimConfig Connection Error: refused")
+    with pytest.raises(HTTPException) as exc:
+        _read_agent()
+    assert exc.value.status_code == 503
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (MaimConfigError("MaimConfig Error: nope", status_code=403), 403),
+    (MaimConfigError("MaimConfig Error: boom", status_code=500), 503),
+    (MaimConfigUnavailable("MaimConfig Circuit Open", status_code=None), 503),
+    (RuntimeError("bug"), 503),
+])
+def test_agent_upstream_error_keeps_client_errors_only(error, status_code):
+    assert deps.agent_upstream_error(error).status_code == status_code
+
+
+class _AgentContext:
+    current_user = CurrentUser(id="u1", username="u1")
+
+    async def get_tenant_id(self, agent_id):
+        return "t_1"
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    """rotate_agent_api_keys over a fake MaimConfig key store."""
+    state = {
+        "keys": {
+            "k1": {"id": "k1", "name": "one", "permissions": ["read"]},
+            "k2": {"id": "k2", "name": "two"},
+        },
+        "created": [],
+        "deleted": [],
+        "fail_delete": set(),
+        "changed": 0,
+    }
+
+    async def all_api_keys(tenant_id, agent_id):
+        return {key_id: dict(key) for key_id, key in state["keys"].items()}
+
+    async def create_api_key(tenant_id, agent_id, api_key_in):
+        new_id = f"new_{len(state['created']) + 1}"
+        state["created"].append(new_id)
+        return {"id": new_id, "tenant_id": tenant_id, "agent_id": agent_id, "api_key": "secret",
+                "status": "active", "created_at": "2024-01-01T00:00:00", **api_key_in.dict()}
+
+    async def delete_api_key(key_id):
+        if key_id in state["fail_delete"]:
+            raise RuntimeError(f"delete {key_id} failed")
+        state["deleted"].append(key_id)
+
+    async def api_keys_changed(agent_ctx, agent_id):
+        state["changed"] += 1
+
+    monkeypatch.setattr(agents, "_all_api_keys", all_api_keys)
+    monkeypatch.setattr(agents, "_create_api_key", create_api_key)
+    monkeypatch.setattr(agents.maim_config_client, "delete_api_key", delete_api_key)
+    monkeypatch.setattr(agents, "_api_keys_changed", api_keys_changed)
+    return state
+
+
+def _rotate(*key_ids):
+    bulk_in = agents.api_key_schema.ApiKeyBulkIds(key_ids=list(key_ids))
+    response = asyncio.run(agents.rotate_agent_api_keys("a_1", bulk_in, _AgentContext()))
+    assert response.status_code == 200
+    return {r["key_id"]: r for r in json.loads(response.body)["results"]}
+
+
+def test_rotate_replaces_each_key(keys):
+    results = _rotate("k1", "k2", "missing")
+    assert results["k1"]["status_code"] == 200 and results["k1"]["api_key"]["permissions"] == ["read"]
+    assert results["k2"]["status_code"] == 200
+    assert results["missing"]["status_code"] == 404
+    assert sorted(keys["deleted"]) == ["k1", "k2"]
+    assert keys["changed"] == 1
+
+
+def test_rotate_reports_a_malformed_key_without_losing_the_others(keys):
+    del keys["keys"]["k2"]["name"]
+    results = _rotate("k1", "k2")
+    assert results["k1"]["status_code"] == 200
+    assert results["k2"]["status_code"] == 503 and results["k2"]["api_key"] is None
+    assert keys["deleted"] == ["k1"]
+
+
+def test_rotate_rolls_back_the_new_key_when_revoking_the_old_fails(keys):
+    keys["fail_delete"].add("k1")
+    results = _rotate("k1")
+    assert results["k1"]["status_code"] == 503 and results["k1"]["api_key"] is None
+    assert keys["deleted"] == keys["created"] == ["new_1"]
+    assert keys["changed"] == 0
+
+
+def test_rotate_hands_out_the_new_key_when_the_rollback_fails(keys, caplog):
+    keys["fail_delete"].update({"k1", "new_1"})
+    results = _rotate("k1")
+    assert results["k1"]["status_code"] == 503
+    assert results["k1"]["api_key"]["id"] == "new_1"
+    assert keys["changed"] == 1
+    assert "new_1" in caplog.text
+
+
+def test_bulk_run_turns_unexpected_errors_into_results():
+    async def run(item):
+        if item == "bad":
+            raise RuntimeError("boom")
+        return {"key_id": item, "status_code": 204}
+
+    results = asyncio.run(agents._bulk_run(["ok", "bad"], run))
+    assert results == [{"key_id": "ok", "status_code": 204},
+                       {"key_id": "bad", "status_code": 503, "detail": "boom"}]
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    """Per-tenant agent listings behind a fake, paging MaimConfig."""
+    state = {
+        "agents": {
+            "t_a": [{"id": f"a{i}", "tenant_id": "t_a", "name": "a", "status": "active",
+                     "created_at": f"2024-01-0{i}"} for i in (1, 3, 5, 7)],
+            "t_b": [{"id": f"b{i}", "tenant_id": "t_b", "name": "b", "status": "active",
+                     "created_at": f"2024-01-0{i}"} for i in (2, 4, 6)],
+        },
+        "down": set(),
+        "calls": 0,
+    }
+
+    async def get_agents(tenant_id, page=None, page_size=None):
+        state["calls"] += 1
+        if tenant_id in state["down"]:
+            raise RuntimeError("MaimConfig down")
+        items = state["agents"][tenant_id]
+        start = (page - 1) * page_size
+        return {"success": True, "data": {"items": items[start:start + page_size], "total": len(items)}}
+
+    monkeypatch.setattr(agents.maim_config_client, "get_agents", get_agents)
+    return state
+
+
+def _pages(tenant_ids, skip=0, limit=2):
+    async def walk():
+        ids, cursor = [], None
+        while True:
+            page, headers = await agents._list_agents(tenant_ids, cursor, skip, limit)
+            ids.append([agent["id"] for agent in page])
+            cursor = headers.get("X-Next-Cursor")
+            if cursor is None:
+                return ids
+    return asyncio.run(walk())
+
+
+def test_list_agents_merges_tenants_in_creation_order(listings):
+    assert _pages(["t_a", "t_b"], limit=10) == [["a1", "b2", "a3", "b4", "a5", "b6", "a7"]]
+
+
+def test_list_agents_cursor_walks_every_agent_once(listings):
+    pages = _pages(["t_a", "t_b"], limit=2)
+    assert pages == [["a1", "b2"], ["a3", "b4"], ["a5", "b6"], ["a7"]]
+
+
+def test_list_agents_skip_only_applies_to_the_first_page(listings):
+    pages = _pages(["t_a", "t_b"], skip=1, limit=2)
+    assert pages == [["b2", "a3"], ["b4", "a5"], ["b6", "a7"]]
+
+
+def test_list_agents_reports_and_retries_failed_tenants(listings):
+    listings["down"].add("t_b")
+    page, headers = asyncio.run(agents._list_agents(["t_a", "t_b"], None, 0, 10))
+    assert [agent["id"] for agent in page] == ["a1", "a3", "a5", "a7"]
+    assert headers["X-Partial-Failures"] == "t_b"
+
+    listings["down"].clear()
+    page, headers = asyncio.run(agents._list_agents(["t_a", "t_b"], headers["X-Next-Cursor"], 0, 10))
+    assert [agent["id"] for agent in page] == ["b2", "b4", "b6"]
+    assert "X-Next-Cursor" not in headers
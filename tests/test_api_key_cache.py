@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("maim_db")
+pytest.importorskip("aiosqlite")
+
+from src.core.api_key_cache import ApiKeyListCache
+from src.core.settings import settings
+from src.models import base
+from src.models.api_key_cache import ApiKeyListGeneration
+
+
+@pytest.fixture
+def sessions(db_session, monkeypatch):
+    """A throwaway SQLite database shared by every ApiKeyListCache (worker) in the test."""
+    monkeypatch.setattr(base, "db_session", db_session)
+    return db_session
+
+
+def _generation(sessions, cache: ApiKeyListCache, agent_id: str = "a_1") -> int:
+    async def read():
+        async with sessions() as db:
+            return await cache.generation(db, agent_id)
+    return asyncio.run(read())
+
+
+def test_generation_starts_at_zero_and_invalidate_bumps_it(sessions):
+    cache = ApiKeyListCache(maxsize=10, ttl=60)
+    assert _generation(sessions, cache) == 0
+    asyncio.run(cache.invalidate("a_1"))
+    asyncio.run(cache.invalidate("a_1"))
+    assert _generation(sessions, cache) == 2
+    assert _generation(sessions, cache, "a_2") == 0
+
+
+def test_entries_only_match_their_generation(sessions):
+    cache = ApiKeyListCache(maxsize=10, ttl=60)
+    cache.put("a_1", 0, [{"id": "k1"}])
+    assert cache.get("a_1", 0) == [{"id": "k1"}]
+    assert cache.get("a_1", 1) is None
+
+
+def test_bump_on_another_worker_invalidates_this_workers_entry(sessions):
+    reader, writer = ApiKeyListCache(maxsize=10, ttl=60), ApiKeyListCache(maxsize=10, ttl=60)
+    reader.put("a_1", _generation(sessions, reader), [{"id": "k1"}])
+    asyncio.run(writer.invalidate("a_1"))
+    assert reader.get("a_1", _generation(sessions, reader)) is None
+
+
+def test_bump_during_a_load_is_not_masked_by_the_loaded_list(sessions):
+    reader, writer = ApiKeyListCache(maxsize=10, ttl=60), ApiKeyListCache(maxsize=10, ttl=60)
+    # Reader takes the generation, then loads; the writer changes keys meanwhile
+    generation = _generation(sessions, reader)
+    asyncio.run(writer.invalidate("a_1"))
+    reader.put("a_1", generation, [{"id": "k1"}])
+    assert reader.get("a_1", _generation(sessions, reader)) is None
+
+
+def test_invalidate_drops_the_local_entry(sessions):
+    cache = ApiKeyListCache(maxsize=10, ttl=60)
+    cache.put("a_1", 5, [{"id": "k1"}])
+    asyncio.run(cache.invalidate("a_1"))
+    assert cache.get("a_1", 5) is None
+
+
+def test_invalidate_prunes_rows_past_the_retention(sessions):
+    cache = ApiKeyListCache(maxsize=10, ttl=60)
+    old = datetime.utcnow() - timedelta(seconds=settings.API_KEY_GENERATION_RETENTION + 1)
+
+    async def seed():
+        async with sessions() as db:
+            db.add(ApiKeyListGeneration(agent_id="a_old", generation=7, updated_at=old))
+            await db.commit()
+
+    asyncio.run(seed())
+    asyncio.run(cache.invalidate("a_1"))
+    assert _generation(sessions, cache, "a_old") == 0
+    assert _generation(sessions, cache) == 1
+
+
+def test_invalidate_failure_is_logged_not_raised(sessions, monkeypatch, caplog):
+    @asynccontextmanager
+    async def broken_session():
+        raise RuntimeError("database down")
+        yield
+
+    monkeypatch.setattr(base, "db_session", broken_session)
+    cache = ApiKeyListCache(maxsize=10, ttl=60)
+    asyncio.run(cache.invalidate("a_1"))
+    assert "invalidation failed" in caplog.text
@@ -0,0 +1,255 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import cache
+from src.core.cache import StaleIfErrorCache, SWRCache, TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=fake))
+    return fake
+
+
+def test_ttl_cache_expires_entries(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") == 1
+    clock.now += 5
+    assert ttl_cache.get("a", "gone") == "gone"
+    assert len(ttl_cache) == 0
+    assert (ttl_cache.hits, ttl_cache.misses) == (1, 1)
+
+
+def test_ttl_cache_per_entry_ttl_and_non_positive_ttl(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("short", 1, ttl=1)
+    ttl_cache.set("never", 2, ttl=0)
+    clock.now += 2
+    assert ttl_cache.get("short") is None
+    assert ttl_cache.get("never") is None
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    ttl_cache = TTLCache(maxsize=2, ttl=5)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_pop_and_clear(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.pop("a") == 1
+    assert ttl_cache.pop("a", "missing") == "missing"
+    ttl_cache.set("b", 2)
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
+
+
+def _counting_loader(results):
+    calls = []
+
+    async def loader():
+        calls.append(None)
+        await asyncio.sleep(0)
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return loader, calls
+
+
+def test_swr_cache_shares_one_load_between_concurrent_callers(clock):
+    swr = SWRCache(ttl=10, stale_if_error=10)
+    loader, calls = _counting_loader(["v1"])
+
+    async def main():
+        return await asyncio.gather(*(swr.get("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["v1"] * 5
+    assert len(calls) == 1
+    assert swr.stats()["misses"] == 5
+
+
+def test_swr_cache_serves_stale_while_refreshing(clock):
+    swr = SWRCache(ttl=10, stale_if_error=10)
+    loader, calls = _counting_loader(["v1", "v2"])
+
+    async def main():
+        await swr.get("k", loader)
+        assert await swr.get("k", loader) == "v1"
+        clock.now += 11
+        stale = await swr.get("k", loader)
+        await asyncio.sleep(0.01)
+        return stale, await swr.get("k", loader)
+
+    assert asyncio.run(main()) == ("v1", "v2")
+    assert len(calls) == 2
+    assert (swr.hits, swr.stale_hits) == (2, 1)
+
+
+def test_swr_cache_keeps_stale_value_when_refresh_fails(clock):
+    swr = SWRCache(ttl=10, stale_if_error=10)
+    loader, calls = _counting_loader(["v1", RuntimeError("down")])
+
+    async def main():
+        await swr.get("k", loader)
+        clock.now += 11
+        first = await swr.get("k", loader)
+        await asyncio.sleep(0.01)
+        second = await swr.get("k", loader)
+        await asyncio.sleep(0.01)
+        clock.now += 10
+        with pytest.raises(RuntimeError):
+            await swr.get("k", loader)
+        return first, second
+
+    assert asyncio.run(main()) == ("v1", "v1")
+    assert swr.refresh_failures >= 2
+
+
+def test_swr_cache_invalidate_forces_a_reload(clock):
+    swr = SWRCache(ttl=10, stale_if_error=10)
+    loader, calls = _counting_loader(["v1", "v2"])
+
+    async def main():
+        await swr.get("k", loader)
+        swr.invalidate("k")
+        return await swr.get("k", loader)
+
+    assert asyncio.run(main()) == "v2"
+
+
+class _NotFound(Exception):
+    pass
+
+
+def _stale_cache(**kwargs) -> StaleIfErrorCache:
+    options = {"max_age": 60, "budget": 0.05, "serve_stale_on": lambda e: not isinstance(e, _NotFound)}
+    options.update(kwargs)
+    return StaleIfErrorCache(**options)
+
+
+def _loader(value=None, error=None, delay=0.0):
+    async def load():
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+    return load
+
+
+def test_stale_if_error_without_a_stored_value_propagates():
+    stale = _stale_cache()
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await stale.get("k", _loader(error=RuntimeError("down")))
+        return await stale.get("k", _loader("v1"))
+
+    assert asyncio.run(main()) == ("v1", None)
+
+
+def test_stale_if_error_serves_last_good_value_on_upstream_error():
+    stale = _stale_cache()
+
+    async def main():
+        await stale.get("k", _loader("v1"))
+        await asyncio.sleep(0)
+        return await stale.get("k", _loader(error=RuntimeError("down")))
+
+    value, age = asyncio.run(main())
+    assert value == "v1" and age is not None and age >= 0
+    assert stale.stats()["stale_errors"] == 1
+
+
+def test_stale_if_error_drops_the_value_on_a_definitive_answer():
+    stale = _stale_cache()
+
+    async def main():
+        await stale.get("k", _loader("v1"))
+        await asyncio.sleep(0)
+        with pytest.raises(_NotFound):
+            await stale.get("k", _loader(error=_NotFound()))
+        with pytest.raises(RuntimeError):
+            await stale.get("k", _loader(error=RuntimeError("down")))
+
+    asyncio.run(main())
+    assert stale.stats()["size"] == 0
+
+
+def test_stale_if_error_answers_slow_calls_from_the_stored_value():
+    stale = _stale_cache(budget=0.02)
+
+    async def main():
+        await stale.get("k", _loader("v1"))
+        await asyncio.sleep(0)
+        slow = await stale.get("k", _loader("v2", delay=0.1))
+        await asyncio.sleep(0.15)
+        return slow, await stale.get("k", _loader("v3"))
+
+    slow, fresh = asyncio.run(main())
+    assert slow[0] == "v1" and slow[1] is not None
+    assert fresh == ("v3", None)
+    assert stale.stats()["stale_timeouts"] == 1
+
+
+def test_stale_if_error_never_serves_past_max_age(clock):
+    stale = _stale_cache(max_age=10)
+
+    async def main():
+        await stale.get("k", _loader("v1"))
+        await asyncio.sleep(0)
+        clock.now += 11
+        with pytest.raises(RuntimeError):
+            await stale.get("k", _loader(error=RuntimeError("down")))
+
+    asyncio.run(main())
+
+
+def test_stale_if_error_shares_one_live_call():
+    stale = _stale_cache()
+    calls = []
+
+    async def load():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "v1"
+
+    async def main():
+        return await asyncio.gather(*(stale.get("k", load) for _ in range(3)))
+
+    assert asyncio.run(main()) == [("v1", None)] * 3
+    assert len(calls) == 1
+
+
+def test_stale_if_error_invalidate_discards_a_running_load():
+    stale = _stale_cache()
+
+    async def main():
+        task = asyncio.ensure_future(stale.get("k", _loader("old", delay=0.02)))
+        await asyncio.sleep(0)
+        stale.invalidate("k")
+        await task
+        await asyncio.sleep(0)
+        assert stale.stats()["size"] == 0
+        return await stale.get("k", _loader("new"))
+
+    assert asyncio.run(main()) == ("new", None)
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("maim_db")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import update
+
+from src.core.claim_revocations import ALL_USERS, ClaimRevocations
+from src.core.principal_cache import PrincipalCache
+from src.core.settings import settings
+from src.models import base
+from src.models.claim_revocation import ClaimRevocation
+
+
+@pytest.fixture
+def sessions(db_session, monkeypatch):
+    """Two workers' views: separate principal caches over one SQLite database."""
+    monkeypatch.setattr(base, "db_session", db_session)
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    monkeypatch.setattr(settings, "AUTH_TENANT_CLAIM_MAX_AGE", 3600)
+    return db_session
+
+
+def _worker() -> ClaimRevocations:
+    # Each worker has its own principal cache
+    return ClaimRevocations(PrincipalCache(maxsize=10, ttl=60))
+
+
+def _trusted(db_session, worker, user_id, issued_at) -> bool:
+    async def check():
+        async with db_session() as db:
+            return await worker.trusted(db, user_id, issued_at)
+    return asyncio.run(check())
+
+
+def test_revocation_on_one_worker_reaches_the_others(sessions):
+    first, second = _worker(), _worker()
+    issued = int(time.time()) - 5
+    assert _trusted(sessions, second, "u1", issued)
+    asyncio.run(first.revoke_user("u1"))
+    assert not _trusted(sessions, second, "u1", issued)
+    assert _trusted(sessions, second, "u2", issued)
+    assert _trusted(sessions, second, "u1", time.time() + 1)
+
+
+def test_revoke_all_reaches_every_user(sessions):
+    first, second = _worker(), _worker()
+    issued = int(time.time()) - 5
+    asyncio.run(first.revoke_all())
+    assert not _trusted(sessions, second, "u1", issued)
+    assert not _trusted(sessions, second, "u2", issued)
+
+
+def test_claims_past_the_max_age_are_not_trusted(sessions):
+    worker = _worker()
+    assert not _trusted(sessions, worker, "u1", time.time() - 3601)
+
+
+def test_revoking_again_updates_the_row_and_prunes_old_ones(sessions):
+    worker = _worker()
+
+    async def seed_old():
+        async with sessions() as db:
+            db.add(ClaimRevocation(user_id="old", revoked_at=datetime.utcnow() - timedelta(seconds=3601)))
+            await db.commit()
+
+    async def rows():
+        async with sessions() as db:
+            return {row.user_id for row in (await db.execute(ClaimRevocation.__table__.select())).all()}
+
+    asyncio.run(seed_old())
+    asyncio.run(worker.revoke_user("u1"))
+    asyncio.run(worker.revoke_user("u1"))
+    asyncio.run(worker.revoke_all())
+    assert asyncio.run(rows()) == {"u1", ALL_USERS}
+
+
+def test_nothing_is_recorded_without_stateless_auth(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", False)
+    first, second = _worker(), _worker()
+    issued = int(time.time()) - 5
+    asyncio.run(first.revoke_user("u1"))
+    assert _trusted(sessions, second, "u1", issued)
+
+
+def test_upsert_retries_when_another_worker_inserted_first(sessions):
+    earlier = datetime.utcnow() - timedelta(seconds=60)
+    calls = []
+
+    async def seed():
+        async with sessions() as db:
+            db.add(ClaimRevocation(user_id="u1", revoked_at=earlier))
+            await db.commit()
+
+    async def upsert(db):
+        # The first attempt still believes the row is missing
+        calls.append(db)
+        if len(calls) == 1:
+            db.add(ClaimRevocation(user_id="u1", revoked_at=datetime.utcnow()))
+        else:
+            await db.execute(update(ClaimRevocation).values(revoked_at=datetime.utcnow()))
+        await db.commit()
+
+    async def revoked_at():
+        async with sessions() as db:
+            return (await db.get(ClaimRevocation, "u1")).revoked_at
+
+    asyncio.run(seed())
+    asyncio.run(base.upsert_in_own_session(upsert))
+    assert len(calls) == 2
+    assert asyncio.run(revoked_at()) > earlier
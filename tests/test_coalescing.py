@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+
+from src.core.maim_config_client import MaimConfigClient
+
+URL = "http://maimconfig.test/system/plugins"
+
+
+def _client(handler) -> MaimConfigClient:
+    client = MaimConfigClient("http://maimconfig.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _slow_upstream(calls: list, delay: float = 0.05):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url)
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"success": True, "data": [1, 2, 3]})
+    return handler
+
+
+def test_concurrent_identical_gets_share_one_upstream_call():
+    calls = []
+    client = _client(_slow_upstream(calls))
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                *(client._coalesced_send("GET", URL, "/system/plugins") for _ in range(5))
+            )
+        finally:
+            await client.close()
+
+    responses = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r.json() == {"success": True, "data": [1, 2, 3]} for r in responses)
+    stats = client.coalescing_stats()
+    assert (stats["upstream_calls"], stats["collapsed_callers"], stats["in_flight_keys"]) == (1, 4, 0)
+
+
+def test_different_params_are_not_coalesced():
+    calls = []
+    client = _client(_slow_upstream(calls))
+
+    async def main():
+        try:
+            await asyncio.gather(
+                client._coalesced_send("GET", URL, "/system/plugins", params={"page": 1}),
+                client._coalesced_send("GET", URL, "/system/plugins", params={"page": 2}),
+            )
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_does_not_fail_the_followers():
+    calls = []
+    client = _client(_slow_upstream(calls))
+
+    async def main():
+        try:
+            leader = asyncio.ensure_future(client._coalesced_send("GET", URL, "/system/plugins"))
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(client._coalesced_send("GET", URL, "/system/plugins"))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            response = await follower
+            return leader.cancelled(), response
+        finally:
+            await client.close()
+
+    leader_cancelled, response = asyncio.run(main())
+    assert leader_cancelled
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+
+def test_sequential_calls_are_not_served_from_a_finished_flight():
+    calls = []
+    client = _client(_slow_upstream(calls, delay=0))
+
+    async def main():
+        try:
+            await client._coalesced_send("GET", URL, "/system/plugins")
+            await client._coalesced_send("GET", URL, "/system/plugins")
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    assert len(calls) == 2
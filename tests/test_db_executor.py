@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.db_executor import BlockingDBExecutor
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _executor(**kwargs) -> BlockingDBExecutor:
+    options = {"max_workers": 1, "max_queue": 8, "timeout": 5.0, "name": "test-db"}
+    options.update(kwargs)
+    return BlockingDBExecutor(**options)
+
+
+def test_runs_job_and_counts_it():
+    executor = _executor()
+    try:
+        assert asyncio.run(executor.run(_sleep, 0)) == 0
+        stats = executor.stats()
+        assert (stats["queue_depth"], stats["active"], stats["completed"]) == (0, 0, 1)
+    finally:
+        executor.shutdown()
+
+
+def test_timed_out_jobs_release_their_queue_slot():
+    executor = _executor(timeout=0.2)
+
+    async def main():
+        results = await asyncio.gather(*(executor.run(_sleep, 0.5) for _ in range(3)), return_exceptions=True)
+        await asyncio.sleep(0.6)  # let the job that did start finish
+        return results
+
+    try:
+        results = asyncio.run(main())
+        assert all(isinstance(r, HTTPException) and r.status_code == 504 for r in results)
+        stats = executor.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["active"] == 0
+        assert stats["timeouts"] == 3
+        # Only the job a worker had already picked up ran; the queued ones were dropped
+        assert stats["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_cancelled_caller_releases_queue_slot():
+    executor = _executor()
+
+    async def main():
+        blocker = asyncio.ensure_future(executor.run(_sleep, 0.3))
+        queued = asyncio.ensure_future(executor.run(_sleep, 0.3))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await blocker
+
+    try:
+        asyncio.run(main())
+        assert executor.stats()["queue_depth"] == 0
+        assert executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_shutdown_releases_queued_jobs():
+    executor = _executor()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(_sleep, 0.3))
+        queued = asyncio.ensure_future(executor.run(_sleep, 0.3))
+        await asyncio.sleep(0.05)
+        executor.shutdown()
+        results = await asyncio.gather(running, queued, return_exceptions=True)
+        assert isinstance(results[1], asyncio.CancelledError)
+
+    asyncio.run(main())
+    assert executor.stats()["queue_depth"] == 0
+
+
+def test_full_queue_rejects_with_503():
+    executor = _executor(max_queue=1)
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(_sleep, 0.2))
+        await asyncio.sleep(0.05)  # picked up by the only worker
+        queued = asyncio.ensure_future(executor.run(_sleep, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await executor.run(_sleep, 0)
+        assert exc.value.status_code == 503
+        await asyncio.gather(running, queued)
+
+    try:
+        asyncio.run(main())
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["queue_depth"] == 0
+    finally:
+        executor.shutdown()
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("maim_db")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds for a cold `import src.main`. Wall-clock time depends on the
+# machine, so the budget check only runs when one is set for it
+BUDGET = os.environ.get("IMPORT_TIME_BUDGET")
+
+# Only needed once the matching endpoint is used
+LAZY_MODULES = ["maim_db.core.models.business", "numpy", "pyinstrument", "src.core.metric_rollups"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _import_src_main() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_heavy_subsystems_are_imported_lazily():
+    assert _import_src_main()["loaded"] == []
+
+
+@pytest.mark.skipif(BUDGET is None, reason="set IMPORT_TIME_BUDGET (seconds) to check import time")
+def test_import_time_budget():
+    # Best of three, so one noisy run doesn't fail the build
+    elapsed = min(_import_src_main()["elapsed"] for _ in range(3))
+    assert elapsed < float(BUDGET), f"import src.main took {elapsed:.3f}s (budget {BUDGET}s)"
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+pytest.importorskip("maim_db")
+
+from peewee import SqliteDatabase
+
+from maim_db.core.models.business import SystemMetrics
+from src.api.routes import admin
+from src.core import metric_rollups
+from src.core.settings import settings
+from src.models.metric_rollup import MetricRollup, MetricRollupWatermark
+
+T0 = datetime(2024, 1, 1)
+NOW = T0 + timedelta(hours=1)
+
+
+@pytest.fixture
+def metrics_db(tmp_path, monkeypatch):
+    """SystemMetrics and the rollup tables bound to a throwaway SQLite file."""
+    db = SqliteDatabase(str(tmp_path / "metrics.db"))
+    models = [SystemMetrics, MetricRollup, MetricRollupWatermark]
+    with db.bind_ctx(models):
+        db.create_tables([SystemMetrics])
+        monkeypatch.setattr(metric_rollups, "_tables_ready", False)
+        monkeypatch.setattr(settings, "ADMIN_ROLLUP_GRACE_SECONDS", 120)
+        yield db
+
+
+def _add(minute: float, value: float, agent_id: str = "a_1") -> None:
+    SystemMetrics.create(metric_name="latency", metric_value=value, agent_id=agent_id,
+                         created_at=T0 + timedelta(minutes=minute))
+
+
+def _aggregate(start: datetime, end: datetime, group_key: str = "") -> list:
+    return metric_rollups.aggregate("latency", "1m", group_key, start, end, now=NOW)
+
+
+def _watermark():
+    mark = metric_rollups._watermark("latency", "1m", "")
+    return mark.rolled_from, mark.rolled_until
+
+
+def test_bucket_statistics_match_numpy():
+    values = [5.0, 1.0, 3.0, 2.0, 4.0]
+    timestamps = np.asarray([0, 10, 20, 30, 59], dtype=np.float64)
+    [bucket] = metric_rollups.summarize(timestamps, np.asarray(values), [""] * 5, 60)
+    assert (bucket["count"], bucket["min"], bucket["max"], bucket["avg"]) == (5, 1.0, 5.0, 3.0)
+    for name, q in metric_rollups.PERCENTILES.items():
+        assert bucket[name] == pytest.approx(np.percentile(values, q * 100))
+
+
+def test_completed_buckets_are_rolled_up_and_the_open_tail_is_live(metrics_db):
+    for minute in range(50, 60):
+        _add(minute + 0.5, float(minute))
+    buckets = _aggregate(T0 + timedelta(minutes=50), NOW)
+    assert [b["count"] for b in buckets] == [1] * 10
+    # 00:58 and later are within the grace period and computed from raw rows
+    assert _watermark() == (T0 + timedelta(minutes=50), T0 + timedelta(minutes=58))
+    assert MetricRollup.select().count() == 8
+
+
+def test_rolled_up_buckets_are_served_from_the_rollup_table(metrics_db):
+    _add(10.5, 1.0)
+    _aggregate(T0 + timedelta(minutes=10), T0 + timedelta(minutes=20))
+    _add(10.6, 100.0)  # a late write into a completed bucket is not re-read
+    [bucket] = _aggregate(T0 + timedelta(minutes=10), T0 + timedelta(minutes=20))
+    assert (bucket["count"], bucket["max"]) == (1, 1.0)
+
+
+def test_partial_buckets_at_both_ends_of_the_range(metrics_db):
+    for minute in (10.1, 10.9, 11.2, 11.8):
+        _add(minute, minute)
+    buckets = _aggregate(T0 + timedelta(minutes=10, seconds=30), T0 + timedelta(minutes=11, seconds=30))
+    # The start is floored to its bucket; rows at or past `end` are left out
+    assert [(b["bucket_start"], b["count"]) for b in buckets] == [
+        ((T0 + timedelta(minutes=10)).isoformat(), 2),
+        ((T0 + timedelta(minutes=11)).isoformat(), 1),
+    ]
+    assert _watermark() == (T0 + timedelta(minutes=10), T0 + timedelta(minutes=11))
+
+
+def test_watermark_extends_in_chunks_in_both_directions(metrics_db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_ROLLUP_CHUNK_BUCKETS", 2)
+    for minute in range(0, 40):
+        _add(minute + 0.5, float(minute))
+    _aggregate(T0 + timedelta(minutes=20), T0 + timedelta(minutes=25))
+    assert _watermark() == (T0 + timedelta(minutes=20), T0 + timedelta(minutes=25))
+
+    buckets = _aggregate(T0 + timedelta(minutes=5), T0 + timedelta(minutes=35))
+    assert _watermark() == (T0 + timedelta(minutes=5), T0 + timedelta(minutes=35))
+    assert [b["avg"] for b in buckets] == [float(m) for m in range(5, 35)]
+    assert MetricRollup.select().count() == 30
+
+
+def test_group_by_agent_and_aware_bounds(metrics_db):
+    _add(10.5, 1.0, "a_1")
+    _add(10.6, 3.0, "a_2")
+    start = (T0 + timedelta(minutes=10)).replace(tzinfo=timezone.utc)
+    buckets = _aggregate(start, start + timedelta(minutes=1), group_key="agent_id")
+    assert [(b["group"], b["avg"]) for b in buckets] == [("a_1", 1.0), ("a_2", 3.0)]
+
+
+def test_aggregate_endpoint_validates_and_converts_the_range(metrics_db):
+    _add(10.5, 2.0)
+    start = datetime(2024, 1, 1, 8, 10, tzinfo=timezone(timedelta(hours=8)))
+    result = asyncio.run(admin.aggregate_metrics(
+        metric_name="latency", resolution="1m", start=start, end=start + timedelta(minutes=1), group_by=None,
+    ))
+    assert result["start"] == (T0 + timedelta(minutes=10)).isoformat()
+    assert [b["count"] for b in result["buckets"]] == [1]
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(admin.aggregate_metrics(
+            metric_name="latency", resolution="1m", start=start, end=start, group_by=None,
+        ))
+    assert exc.value.status_code == 400
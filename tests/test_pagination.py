@@ -0,0 +1,36 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    state = {"offset": 40, "tenant": "t_1", "after": None}
+    cursor = encode_cursor(state)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == state
+
+
+def test_cursor_is_stable_for_equal_state():
+    assert encode_cursor({"a": 1, "b": 2}) == encode_cursor({"b": 2, "a": 1})
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "@@@@",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    base64.urlsafe_b64encode(b"{broken").decode(),
+    "é",
+])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_must_hold_an_object():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(base64.urlsafe_b64encode(b"[1, 2]").decode())
+    assert exc.value.status_code == 400
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import principal_cache as principal_cache_module
+from src.core.principal_cache import Principal, PrincipalCache
+from src.core.settings import settings
+from src.schemas.user import CurrentUser
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(principal_cache_module, "time", SimpleNamespace(time=fake))
+    return fake
+
+
+def _principal(user_id: str, **payload) -> Principal:
+    return Principal(payload={"sub": user_id, **payload}, user=CurrentUser(id=user_id, username=user_id))
+
+
+def test_put_and_get_by_token():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    principal = _principal("u1")
+    cache.put("token-1", principal)
+    assert cache.get("token-1") is principal
+    assert cache.get("token-2") is None
+
+
+def test_principal_is_not_served_past_token_expiry(clock):
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put("expired", _principal("u1", exp=clock.now - 1))
+    assert cache.get("expired") is None
+
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put("a", _principal("u1"))
+    cache.put("b", _principal("u1"))
+    cache.put("c", _principal("u2"))
+    cache.invalidate_user("u1")
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_invalidate_user_still_works_after_reindex():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for i in range(5):
+        cache.put(f"t{i}", _principal(f"u{i}"))
+    cache.put("again", _principal("u4"))
+    cache.invalidate_user("u4")
+    assert cache.get("t4") is None and cache.get("again") is None
+    assert len(cache._by_user) <= 3
+
+
+def test_clear_empties_the_cache():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put("a", _principal("u1"))
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_claims_need_an_issue_time_within_the_max_age(clock, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TENANT_CLAIM_MAX_AGE", 3600)
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    assert cache.claims_trusted("u1", clock.now - 10)
+    assert not cache.claims_trusted("u1", None)
+    assert not cache.claims_trusted("u1", clock.now - 3601)
+
+
+def test_invalidation_revokes_claims_issued_up_to_that_second(clock):
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    issued = int(clock.now)
+    clock.now += 0.5
+    cache.invalidate_user("u1")
+    assert not cache.claims_trusted("u1", issued)
+    assert cache.claims_trusted("u2", issued)
+    clock.now += 1
+    assert cache.claims_trusted("u1", int(clock.now))
+
+
+def test_clear_revokes_every_users_claims(clock):
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    issued = int(clock.now)
+    clock.now += 0.5
+    cache.clear()
+    assert not cache.claims_trusted("u1", issued)
+    assert not cache.claims_trusted("u2", issued)
@@ -0,0 +1,30 @@
+import pytest
+
+from src.core.profiling import PROFILE_HEADER, RequestProfiler
+from src.core.settings import settings
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    profiler = RequestProfiler()
+    profiler.available = True
+    return profiler
+
+
+def _scope(value: bytes):
+    return {"type": "http", "headers": [(PROFILE_HEADER, value)]}
+
+
+def test_header_with_token_triggers_profiling(profiler):
+    assert profiler.trigger_for(_scope(b"s3cret")) == "header"
+
+
+def test_wrong_token_is_ignored(profiler):
+    assert profiler.trigger_for(_scope(b"guess")) is None
+
+
+def test_non_ascii_header_is_rejected_not_raised(profiler):
+    assert profiler.trigger_for(_scope("sécret".encode("latin-1"))) is None
+    assert profiler.trigger_for(_scope("s3cret✓".encode())) is None
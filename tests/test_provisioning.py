@@ -0,0 +1,140 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("maim_db")
+pytest.importorskip("aiosqlite")
+
+from src.core import provisioning
+from src.core.settings import settings
+from src.models.provisioning import ProvisioningStatus, TenantProvisioning
+from maim_db.maimconfig_models.models import Tenant
+
+
+@pytest.fixture
+def provisioner(db_session, monkeypatch):
+    """A TenantProvisioner on a throwaway SQLite database and a fake MaimConfig."""
+    async def create_tenant_table():
+        async with db_session() as db:
+            await (await db.connection()).run_sync(Tenant.__table__.create)
+            await db.commit()
+
+    asyncio.run(create_tenant_table())
+    monkeypatch.setattr(provisioning, "db_session", db_session)
+    worker = provisioning.TenantProvisioner()
+    worker.upstream = {"fail": False, "calls": 0}
+
+    async def create_tenant(payload, idempotency_key=None):
+        worker.upstream["calls"] += 1
+        if worker.upstream["fail"]:
+            raise Exception("MaimConfig down")
+        return {"success": True, "data": {"id": f"t_{idempotency_key}"}}
+
+    monkeypatch.setattr(provisioning.maim_config_client, "create_tenant", create_tenant)
+    return worker
+
+
+def _add(db_session, row_id: str, **values) -> None:
+    row = {
+        "id": row_id,
+        "user_id": f"user_{row_id}",
+        "status": ProvisioningStatus.PENDING,
+        "payload": json.dumps({"tenant_name": f"tenant {row_id}"}),
+        "attempts": 0,
+        "next_attempt_at": datetime.utcnow() - timedelta(seconds=1),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        **values,
+    }
+
+    async def add():
+        async with db_session() as db:
+            db.add(TenantProvisioning(**row))
+            await db.commit()
+
+    asyncio.run(add())
+
+
+def _get(db_session, row_id: str) -> TenantProvisioning:
+    async def get():
+        async with db_session() as db:
+            return await db.get(TenantProvisioning, row_id)
+
+    return asyncio.run(get())
+
+
+def test_claims_due_pending_row(provisioner, db_session):
+    _add(db_session, "due")
+    assert asyncio.run(provisioner._claim("due")) is True
+    row = _get(db_session, "due")
+    assert row.status == ProvisioningStatus.IN_PROGRESS
+    assert row.locked_until > datetime.utcnow()
+
+
+@pytest.mark.parametrize("status", [ProvisioningStatus.SUCCEEDED, ProvisioningStatus.FAILED])
+def test_does_not_reclaim_finished_rows(provisioner, db_session, status):
+    _add(db_session, "done", status=status)
+    assert asyncio.run(provisioner._claim("done")) is False
+    assert _get(db_session, "done").status == status
+
+
+def test_does_not_claim_row_still_backing_off(provisioner, db_session):
+    _add(db_session, "later", next_attempt_at=datetime.utcnow() + timedelta(minutes=5))
+    assert asyncio.run(provisioner._claim("later")) is False
+    assert _get(db_session, "later").status == ProvisioningStatus.PENDING
+
+
+def test_does_not_claim_row_leased_by_another_worker(provisioner, db_session):
+    _add(db_session, "leased", status=ProvisioningStatus.IN_PROGRESS,
+         locked_until=datetime.utcnow() + timedelta(minutes=1))
+    assert asyncio.run(provisioner._claim("leased")) is False
+
+
+def test_reclaims_row_whose_lease_expired(provisioner, db_session):
+    _add(db_session, "expired", status=ProvisioningStatus.IN_PROGRESS,
+         locked_until=datetime.utcnow() - timedelta(seconds=1))
+    assert asyncio.run(provisioner._claim("expired")) is True
+
+
+def test_failure_backs_off_then_gives_up(provisioner, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "PROVISIONING_MAX_ATTEMPTS", 2)
+    provisioner.upstream["fail"] = True
+    _add(db_session, "flaky")
+
+    assert asyncio.run(provisioner.run_once()) == 1
+    row = _get(db_session, "flaky")
+    assert (row.status, row.attempts, row.locked_until) == (ProvisioningStatus.PENDING, 1, None)
+    assert row.next_attempt_at > datetime.utcnow()
+    # Backing off: neither a pass nor a direct claim picks it up early
+    assert asyncio.run(provisioner.run_once()) == 0
+    assert asyncio.run(provisioner._claim("flaky")) is False
+
+    async def make_due():
+        async with db_session() as db:
+            (await db.get(TenantProvisioning, "flaky")).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+            await db.commit()
+
+    asyncio.run(make_due())
+    assert asyncio.run(provisioner.run_once()) == 1
+    row = _get(db_session, "flaky")
+    assert (row.status, row.attempts) == (ProvisioningStatus.FAILED, 2)
+    assert asyncio.run(provisioner._claim("flaky")) is False
+    assert provisioner.upstream["calls"] == 2
+
+
+def test_success_mirrors_tenant_and_is_final(provisioner, db_session):
+    _add(db_session, "ok")
+    assert asyncio.run(provisioner.run_once()) == 1
+    row = _get(db_session, "ok")
+    assert (row.status, row.tenant_id, row.attempts) == (ProvisioningStatus.SUCCEEDED, "t_ok", 1)
+
+    async def tenant():
+        async with db_session() as db:
+            return await db.get(Tenant, "t_ok")
+
+    assert asyncio.run(tenant()).owner_id == "user_ok"
+    assert asyncio.run(provisioner.run_once()) == 0
+    assert asyncio.run(provisioner._claim("ok")) is False
+    assert provisioner.upstream["calls"] == 1
@@ -0,0 +1,223 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.core import resilience
+from src.core.maim_config_client import MaimConfigClient
+from src.core.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay
+from src.core.settings import settings
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_cancelled_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.cancel_probe()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_retry_budget_spends_and_exhausts(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+    stats = budget.stats()
+    assert (stats["spent"], stats["exhausted"]) == (3, 1)
+
+
+def test_retry_budget_refills_over_time_up_to_max(clock):
+    budget = RetryBudget(ratio=0.1, min_per_second=1, max_tokens=3)
+    while budget.try_spend():
+        pass
+    clock.now += 1.5
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    clock.now += 100
+    assert budget.stats()["tokens"] == 3
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.1, 1.0) <= min(1.0, 0.1 * 2 ** attempt)
+
+
+def _client(handler) -> MaimConfigClient:
+    client = MaimConfigClient("http://maimconfig.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _run(client: MaimConfigClient, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_retries_stop_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_MAX_ATTEMPTS", 10)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_DEADLINE", 0.5)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_BACKOFF_MAX", 0.05)
+    timeouts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        timeouts.append(request.extensions["timeout"]["read"])
+        await asyncio.sleep(0.2)
+        return httpx.Response(503)
+
+    client = _client(handler)
+    started = time.monotonic()
+    response = _run(client, client._send_resilient("GET", "http://maimconfig.test/system", "/system"))
+    assert response.status_code == 503
+    assert time.monotonic() - started < 0.8
+    assert len(timeouts) < 10
+    assert all(t <= 0.5 for t in timeouts)
+    assert timeouts == sorted(timeouts, reverse=True)
+
+
+def test_attempt_timeout_is_capped_by_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_MAX_ATTEMPTS", 5)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_DEADLINE", 0.3)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_BACKOFF_BASE", 0.01)
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(request.extensions["timeout"]["read"] + 0.01)
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = _client(handler)
+    started = time.monotonic()
+    with pytest.raises(httpx.ReadTimeout):
+        _run(client, client._send_resilient("GET", "http://maimconfig.test/system", "/system"))
+    assert time.monotonic() - started < 0.6
+    assert client._breaker("GET /system").failures == 1
+
+
+def test_unexpected_error_releases_the_half_open_probe(monkeypatch):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        raise RuntimeError("bug in the transport")
+
+    client = _client(handler)
+    breaker = client._breaker("GET /system")
+    breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0.0
+    with pytest.raises(RuntimeError):
+        _run(client, client._send_resilient("GET", "http://maimconfig.test/system", "/system"))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.probe_in_flight
+    breaker.before_call()
+
+
+def test_success_closes_a_half_open_breaker():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"success": True})
+
+    client = _client(handler)
+    breaker = client._breaker("GET /system")
+    breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0.0
+    response = _run(client, client._send_resilient("GET", "http://maimconfig.test/system", "/system"))
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_reports_state_changes(clock):
+    states = []
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, on_state_change=states.append)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_success()
+    breaker.record_success()
+    assert states == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED]
+
+
+def test_breaker_state_gauge_and_attempt_label(monkeypatch):
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(settings, "MAIMCONFIG_BREAKER_FAILURE_THRESHOLD", 1)
+    endpoint = "GET /metrics-probe"
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, {"endpoint": endpoint, **labels}) or 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    client = _client(handler)
+    before = sample("maimconfig_request_duration_seconds_count", attempt="retry")
+    _run(client, client._send_resilient("GET", "http://maimconfig.test/metrics-probe", "/metrics-probe"))
+    assert sample("maimconfig_request_duration_seconds_count", attempt="retry") == before + 1
+    assert sample("maimconfig_circuit_breaker_state") == 2
@@ -0,0 +1,143 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.routes import tenants
+from src.core.maim_config_client import MaimConfigClient, MaimConfigError, MaimConfigUnavailable
+from src.core.responses import passthrough_response
+from src.core.settings import settings
+
+BODY = gzip.compress(b'{"success": true, "data": {"tenant_id": "t_1"}}')
+
+
+class _Chunks(httpx.AsyncByteStream):
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A MockTransport MaimConfig whose responses are set per test."""
+    monkeypatch.setattr(settings, "MAIMCONFIG_RETRY_MAX_ATTEMPTS", 1)
+    state = {"requests": [], "respond": None}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        return state["respond"](request)
+
+    client = MaimConfigClient("http://maimconfig.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    state["client"] = client
+    return state
+
+
+def _run(upstream, coro_fn):
+    async def main():
+        try:
+            return await coro_fn(upstream["client"])
+        finally:
+            await upstream["client"].close()
+    return asyncio.run(main())
+
+
+def test_passthrough_keeps_status_headers_and_raw_body(upstream):
+    stream = _Chunks(BODY[:10], BODY[10:])
+    upstream["respond"] = lambda request: httpx.Response(201, stream=stream, headers={
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+        "ETag": '"v1"',
+        "X-Request-Id": "req-1",
+        "Connection": "keep-alive",
+        "Server": "maimconfig",
+    })
+
+    async def main(client):
+        response = passthrough_response(await client.proxy("POST", "/tenants", json={"name": "x"}))
+        sent = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        return sent
+
+    sent = _run(upstream, main)
+    start, chunks = sent[0], sent[1:]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    assert start["status"] == 201
+    assert headers["content-type"] == "application/json"
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == '"v1"'
+    assert headers["x-request-id"] == "req-1"
+    assert "connection" not in headers and "server" not in headers
+    assert b"".join(m["body"] for m in chunks) == BODY
+    assert stream.closed
+    assert upstream["requests"][0].headers["accept-encoding"] == "identity"
+
+
+def test_unread_passthrough_still_closes_the_upstream(upstream):
+    stream = _Chunks(BODY)
+    upstream["respond"] = lambda request: httpx.Response(200, stream=stream)
+
+    async def main(client):
+        response = passthrough_response(await client.proxy("GET", "/tenants"))
+        await response.background()
+
+    _run(upstream, main)
+    assert stream.closed
+
+
+def test_proxy_raises_upstream_error_status(upstream):
+    stream = _Chunks(b'{"message": "Tenant not found"}')
+    upstream["respond"] = lambda request: httpx.Response(404, stream=stream)
+
+    with pytest.raises(MaimConfigError) as exc:
+        _run(upstream, lambda client: client.proxy("GET", "/tenants/t_1"))
+    assert not isinstance(exc.value, MaimConfigUnavailable)
+    assert exc.value.status_code == 404
+    assert "Tenant not found" in str(exc.value)
+    assert stream.closed
+
+
+def test_proxy_raises_unavailable_on_connection_error(upstream):
+    def respond(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    upstream["respond"] = respond
+
+    with pytest.raises(MaimConfigUnavailable):
+        _run(upstream, lambda client: client.proxy("GET", "/tenants/t_1"))
+
+
+def test_proxied_route_streams_success_and_maps_errors(upstream, monkeypatch):
+    monkeypatch.setattr(tenants, "client", upstream["client"])
+    app = FastAPI()
+    app.include_router(tenants.router, prefix="/tenants")
+
+    def respond(request):
+        if request.url.path == "/tenants/t_1":
+            return httpx.Response(200, stream=_Chunks(b'{"success":', b' true}'), headers={"X-Total": "1"})
+        return httpx.Response(404, json={"message": "Tenant not found"})
+    upstream["respond"] = respond
+
+    async def main(client):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as http:
+            return await http.get("/tenants/t_1"), await http.get("/tenants/t_2")
+
+    found, missing = _run(upstream, main)
+    assert (found.status_code, found.content, found.headers["x-total"]) == (200, b'{"success": true}', "1")
+    assert missing.status_code == 500
+    assert "Tenant not found" in missing.json()["detail"]
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.security import PasswordHasher
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_cancelled_caller_releases_queue_slot():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    ran = []
+
+    async def main():
+        blocker = asyncio.ensure_future(hasher._run(_sleep, 0.3))
+        queued = asyncio.ensure_future(hasher._run(ran.append, "queued"))
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["queue_depth"] == 1
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert hasher.stats()["queue_depth"] == 0
+        await blocker
+        await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(main())
+        assert ran == []
+        stats = hasher.stats()
+        assert (stats["queue_depth"], stats["active"], stats["completed"]) == (0, 0, 1)
+    finally:
+        hasher.shutdown()
+
+
+def test_cancelled_caller_does_not_hold_the_queue_full():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+
+    async def main():
+        blocker = asyncio.ensure_future(hasher._run(_sleep, 0.2))
+        queued = asyncio.ensure_future(hasher._run(_sleep, 0))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert await hasher._run(_sleep, 0) == 0
+        await blocker
+
+    try:
+        asyncio.run(main())
+        assert hasher.stats()["rejected"] == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_rejects_with_429():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+
+    async def main():
+        running = asyncio.ensure_future(hasher._run(_sleep, 0.1))
+        queued = asyncio.ensure_future(hasher._run(_sleep, 0))
+        await asyncio.sleep(0.02)
+        with pytest.raises(HTTPException) as exc:
+            await hasher._run(_sleep, 0)
+        assert exc.value.status_code == 429
+        await asyncio.gather(running, queued)
+
+    try:
+        asyncio.run(main())
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        hasher.shutdown()